@@ -16,6 +16,8 @@ from research_agent.prompts import (
     SUBAGENT_DELEGATION_INSTRUCTIONS,
 )
 from research_agent.tools import tavily_search, think_tool
+from research_agent.cache_usage import PromptCacheUsageMiddleware
+from research_agent.rate_limit import RateLimitMiddleware
 
 # Limits
 max_concurrent_research_units = 3
@@ -42,6 +44,7 @@ research_sub_agent = {
     "description": "Delegate research to the sub-agent researcher. Only give this researcher one topic at a time.",
     "system_prompt": RESEARCHER_INSTRUCTIONS.format(date=current_date),
     "tools": [tavily_search, think_tool],
+    "middleware": [PromptCacheUsageMiddleware("research-agent"), RateLimitMiddleware()],
 }
 
 # Model Gemini 3 
@@ -56,4 +59,7 @@ agent = create_deep_agent(
     tools=[tavily_search, think_tool],
     system_prompt=INSTRUCTIONS,
     subagents=[research_sub_agent],
+    # Prompt-cache breakpoints are added by create_deep_agent; this reports hits.
+    # Model calls queue on the shared rate limiter instead of hitting provider 429s
+    middleware=[PromptCacheUsageMiddleware(), RateLimitMiddleware()],
 )
@@ -4,16 +4,24 @@ This module demonstrates building a research agent using the deepagents package
 with custom tools for web search and strategic thinking.
 """
 
+from research_agent.cache_usage import (
+    PromptCacheUsageMiddleware,
+    get_prompt_cache_totals,
+)
 from research_agent.prompts import (
-    RESEARCHER_INSTRUCTIONS,
     RESEARCH_WORKFLOW_INSTRUCTIONS,
+    RESEARCHER_INSTRUCTIONS,
     SUBAGENT_DELEGATION_INSTRUCTIONS,
 )
+from research_agent.rate_limit import RateLimitMiddleware
 from research_agent.tools import tavily_search, think_tool
 
 __all__ = [
     "tavily_search",
     "think_tool",
+    "PromptCacheUsageMiddleware",
+    "get_prompt_cache_totals",
+    "RateLimitMiddleware",
     "RESEARCHER_INSTRUCTIONS",
     "RESEARCH_WORKFLOW_INSTRUCTIONS",
     "SUBAGENT_DELEGATION_INSTRUCTIONS",
@@ -0,0 +1,78 @@
+"""Prompt Cache Usage Reporting.
+
+`create_deep_agent` already places Anthropic prompt-cache breakpoints on the
+system prompt, tool definitions and conversation prefix. This module adds a
+middleware that reports how many input tokens were read from or written to the
+cache on each model call, so the effect on time-to-first-token can be tracked.
+
+Per-call reports go to the `research_agent.cache_usage` logger at INFO level,
+which Python leaves silent until logging is configured, e.g.:
+
+    logging.basicConfig(level=logging.INFO)
+
+Run totals are available at any time from `get_prompt_cache_totals()`.
+"""
+
+import logging
+import threading
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_totals = {"cache_read": 0, "cache_write": 0, "uncached": 0}
+
+
+class PromptCacheUsageMiddleware(AgentMiddleware):
+    """Logs cache read/write token counts from each model response."""
+
+    def __init__(self, label: str = "orchestrator"):
+        """Initialize the middleware.
+
+        Args:
+            label: Name logged with each report (e.g. the sub-agent name)
+        """
+        super().__init__()
+        self.label = label
+
+    def after_model(self, state, runtime):
+        """Record the usage of the latest model response."""
+        messages = state.get("messages", [])
+        if not messages or not isinstance(messages[-1], AIMessage):
+            return None
+        usage = messages[-1].usage_metadata
+        if not usage:
+            return None
+
+        details = usage.get("input_token_details") or {}
+        read = details.get("cache_read") or 0
+        write = details.get("cache_creation") or 0
+        uncached = max(0, usage.get("input_tokens", 0) - read - write)
+        with _lock:
+            _totals["cache_read"] += read
+            _totals["cache_write"] += write
+            _totals["uncached"] += uncached
+        logger.info(
+            "%s: %d cached, %d written, %d uncached input tokens",
+            self.label,
+            read,
+            write,
+            uncached,
+        )
+        return None
+
+
+def get_prompt_cache_totals() -> dict:
+    """Return the input token totals across all calls, with the cached share.
+
+    Returns:
+        Dictionary with cache_read, cache_write, uncached and read_ratio
+    """
+    with _lock:
+        total = sum(_totals.values())
+        return {
+            **_totals,
+            "read_ratio": _totals["cache_read"] / total if total else 0.0,
+        }
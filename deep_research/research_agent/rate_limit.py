@@ -0,0 +1,284 @@
+"""Cluster-wide Model Rate Limiting.
+
+Every research run (orchestrator plus parallel research sub-agents) calls the
+model provider directly, so concurrent runs can exceed the provider's rate
+limits and turn 429s into retry storms. This module adds a middleware that
+queues each model call instead:
+
+- a per-process FIFO semaphore bounds concurrent model calls;
+- a token bucket shared through Dragonfly/Redis (when `RATE_LIMIT_REDIS_URL`
+  is set and the `redis` package is installed) enforces requests/min and
+  tokens/min across processes, falling back to an in-process bucket otherwise;
+- a provider 429 drains the bucket so every process backs off together, and
+  the call is retried once the bucket refills.
+
+The budget is separate from the memory agent's LLM limiter: the buckets live
+under their own key prefix, so the two never share (or skew) a bucket.
+
+Settings (environment): LLM_RATE_RPM (default 50, 0 = off), LLM_RATE_TPM
+(default 0 = off), LLM_MAX_CONCURRENCY (default 4), LLM_RATE_MAX_WAIT
+(default 300 seconds), LLM_RATE_429_RETRIES (default 3).
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import anthropic
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY_PREFIX = "llmrate:research:"
+BUCKET_TTL_MS = 120000
+
+# Refill both buckets, then take one request if available and the token balance
+# is positive. Returns 0 on success, else the milliseconds to wait.
+ACQUIRE_SCRIPT = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local b = redis.call("HMGET", KEYS[1], "req", "tok", "ts")
+local req = tonumber(b[1]) or rpm
+local tok = tonumber(b[2]) or tpm
+local ts = tonumber(b[3]) or now
+local minutes = math.max(0, now - ts) / 60000.0
+req = math.min(rpm, req + minutes * rpm)
+tok = math.min(tpm, tok + minutes * tpm)
+local wait = 0
+if rpm > 0 and req < 1 then wait = (1 - req) / rpm * 60000 end
+if tpm > 0 and tok <= 0 then wait = math.max(wait, (1 - tok) / tpm * 60000) end
+if wait == 0 then req = req - 1 end
+redis.call("HSET", KEYS[1], "req", req, "tok", tok, "ts", now)
+redis.call("PEXPIRE", KEYS[1], ARGV[3])
+return math.ceil(wait)
+"""
+
+# Debit ARGV[1] tokens (may go negative); ARGV[2] = 1 also empties the request bucket
+DEBIT_SCRIPT = """
+local b = redis.call("HMGET", KEYS[1], "req", "tok")
+local tok = (tonumber(b[2]) or 0) - tonumber(ARGV[1])
+redis.call("HSET", KEYS[1], "tok", tok)
+if ARGV[2] == "1" then redis.call("HSET", KEYS[1], "req", 0) end
+redis.call("PEXPIRE", KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class _FairSemaphore:
+    """Semaphore that hands out slots in arrival order."""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters = deque()
+        self._cond = threading.Condition()
+
+    def acquire(self, abandoned: threading.Event | None = None) -> bool:
+        """Wait for a slot; return False if `abandoned` was set before one was free."""
+        ticket = object()
+        with self._cond:
+            self._waiters.append(ticket)
+            while self._waiters[0] is not ticket or self._value <= 0:
+                if abandoned is not None and abandoned.is_set():
+                    self._waiters.remove(ticket)
+                    self._cond.notify_all()
+                    return False
+                self._cond.wait()
+            self._waiters.popleft()
+            self._value -= 1
+            self._cond.notify_all()
+            return True
+
+    async def acquire_async(self) -> None:
+        """Wait for a slot without blocking the event loop; safe to cancel."""
+        abandoned = threading.Event()
+        waiter = asyncio.ensure_future(asyncio.to_thread(self.acquire, abandoned))
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # Leave the queue; a slot taken in the meantime is handed back
+            with self._cond:
+                abandoned.set()
+                self._cond.notify_all()
+            waiter.add_done_callback(lambda f: f.result() and self.release())
+            raise
+
+    def release(self) -> None:
+        with self._cond:
+            self._value += 1
+            self._cond.notify_all()
+
+
+class _Bucket:
+    """Token bucket in Redis, or in-process when no Redis client is available."""
+
+    def __init__(self, name: str, rpm: float, tpm: float, redis_client=None):
+        self.key = BUCKET_KEY_PREFIX + name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.redis = redis_client
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.time()
+        minutes = (now - self.updated) / 60.0
+        self.requests = min(self.rpm, self.requests + minutes * self.rpm)
+        self.tokens = min(self.tpm, self.tokens + minutes * self.tpm)
+        self.updated = now
+
+    def try_acquire(self) -> float:
+        """Take one request; return 0, or the seconds to wait before retrying."""
+        if self.redis is not None:
+            try:
+                wait_ms = self.redis.eval(
+                    ACQUIRE_SCRIPT, 1, self.key, self.rpm, self.tpm, BUCKET_TTL_MS
+                )
+                return int(wait_ms) / 1000.0
+            except Exception as e:
+                logger.warning("Shared bucket unavailable, using local: %s", e)
+                self.redis = None
+        with self._lock:
+            self._refill()
+            wait = 0.0
+            if self.rpm > 0 and self.requests < 1:
+                wait = (1 - self.requests) / self.rpm * 60.0
+            if self.tpm > 0 and self.tokens <= 0:
+                wait = max(wait, (1 - self.tokens) / self.tpm * 60.0)
+            if wait == 0:
+                self.requests -= 1
+            return wait
+
+    def debit(self, tokens: int, drain: bool = False) -> None:
+        """Charge `tokens` against tokens/min; `drain` also empties the request bucket."""
+        if self.redis is not None:
+            try:
+                self.redis.eval(
+                    DEBIT_SCRIPT, 1, self.key, tokens, "1" if drain else "0", BUCKET_TTL_MS
+                )
+                return
+            except Exception as e:
+                logger.warning("Shared bucket unavailable, using local: %s", e)
+                self.redis = None
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+            if drain:
+                self.requests = 0.0
+
+
+def _redis_client():
+    url = os.environ.get("RATE_LIMIT_REDIS_URL")
+    if not url:
+        return None
+    try:
+        from redis import Redis
+    except ImportError:
+        logger.warning("'redis' not installed, using an in-process bucket.")
+        return None
+    return Redis.from_url(url, socket_timeout=2)
+
+
+_lock = threading.Lock()
+_buckets = {}
+_semaphore = None
+
+
+def _get_bucket(name: str) -> _Bucket:
+    global _semaphore
+    with _lock:
+        if _semaphore is None:
+            _semaphore = _FairSemaphore(int(os.environ.get("LLM_MAX_CONCURRENCY", "4")))
+        if name not in _buckets:
+            _buckets[name] = _Bucket(
+                name,
+                rpm=float(os.environ.get("LLM_RATE_RPM", "50")),
+                tpm=float(os.environ.get("LLM_RATE_TPM", "0")),
+                redis_client=_redis_client(),
+            )
+        return _buckets[name]
+
+
+def _usage_tokens(response) -> int:
+    messages = getattr(response, "result", None) or []
+    return sum(
+        (msg.usage_metadata or {}).get("total_tokens", 0)
+        for msg in messages
+        if isinstance(msg, AIMessage)
+    )
+
+
+class RateLimitMiddleware(AgentMiddleware):
+    """Queues model calls on a shared token bucket and a per-process semaphore."""
+
+    def __init__(self, bucket: str = "anthropic"):
+        """Initialize the middleware.
+
+        Args:
+            bucket: Name of the shared budget (one per provider endpoint)
+        """
+        super().__init__()
+        self.bucket_name = bucket
+        self.max_wait = float(os.environ.get("LLM_RATE_MAX_WAIT", "300"))
+        self.retries = int(os.environ.get("LLM_RATE_429_RETRIES", "3"))
+
+    def _wait_for_capacity(self, bucket: _Bucket) -> None:
+        if bucket.rpm <= 0 and bucket.tpm <= 0:
+            return
+        start = time.time()
+        while True:
+            wait = bucket.try_acquire()
+            if wait <= 0:
+                return
+            waited = time.time() - start
+            if waited + wait > self.max_wait:
+                logger.warning("Queued %.1fs, proceeding anyway.", waited)
+                return
+            # Jitter spreads out waiters that were told the same refill time
+            time.sleep(wait + random.uniform(0, 0.1))
+
+    def wrap_model_call(self, request, handler):
+        """Run the model call once the bucket has capacity."""
+        bucket = _get_bucket(self.bucket_name)
+        for attempt in range(self.retries + 1):
+            _semaphore.acquire()
+            try:
+                self._wait_for_capacity(bucket)
+                response = handler(request)
+            except anthropic.RateLimitError:
+                bucket.debit(0, drain=True)
+                if attempt == self.retries:
+                    raise
+                logger.info("Provider returned 429, requeueing (%d).", attempt + 1)
+                continue
+            finally:
+                _semaphore.release()
+            bucket.debit(_usage_tokens(response))
+            return response
+
+    async def awrap_model_call(self, request, handler):
+        """Async version of `wrap_model_call`."""
+        bucket = _get_bucket(self.bucket_name)
+        for attempt in range(self.retries + 1):
+            await _semaphore.acquire_async()
+            try:
+                await asyncio.to_thread(self._wait_for_capacity, bucket)
+                response = await handler(request)
+            except anthropic.RateLimitError:
+                bucket.debit(0, drain=True)
+                if attempt == self.retries:
+                    raise
+                logger.info("Provider returned 429, requeueing (%d).", attempt + 1)
+                continue
+            finally:
+                _semaphore.release()
+            bucket.debit(_usage_tokens(response))
+            return response
@@ -12,11 +12,11 @@ sys.path.insert(
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from langchain_anthropic import ChatAnthropic
-from langgraph.checkpoint.postgres import PostgresSaver
 
 # Import new tools
 from tools.admin_tools import check_reload_request
 from session_manager import get_session_manager
+from checkpointer import get_checkpointer, get_durability
 
 
 def expand_vars(text):
@@ -88,15 +88,15 @@ def get_postgres_connection_string():
     return db_url
 
 
-from team_structure import build_team_graph
+from graph_factory import get_team_graph
 
 
 def initialize_agent_graph(session_mgr, checkpointer):
     """Initializes the agent graph and tools."""
     print("Initializing Agent Team Graph...")
 
-    # Build the team graph with persistence
-    agent = build_team_graph(checkpointer=checkpointer)
+    # Reuses the compiled team graph unless tools or model config changed
+    agent = get_team_graph(checkpointer=checkpointer)
 
     return agent
 
@@ -120,77 +120,85 @@ def main():
     # SYSTEM LOOP (Handles Reloads)
     while True:
         try:
-            # Initialize Checkpointer Context
-            with PostgresSaver.from_conn_string(db_url) as checkpointer:
-                checkpointer.setup()
-
-                # Initialize Agent
-                agent = initialize_agent_graph(session_mgr, checkpointer)
-
-                # Use the session ID from the manager as the thread ID for persistence
-                thread_id = session_mgr.get_session_id()
-                config = {
-                    "configurable": {"thread_id": thread_id},
-                    "recursion_limit": 2000000,
-                }
-
-                print(f"Deep Agent ready with Enterprise Tools. Session: {thread_id}")
-                print("Type 'quit' to exit.")
-
-                # INTERACTION LOOP
-                while True:
-                    # Check for reload request
-                    if check_reload_request():
-                        print("\n[System] Reloading Agent Configuration...")
-                        break  # Break inner loop to re-initialize
-
-                    user_input = input("User: ")
-                    if user_input.lower() in ["quit", "exit"]:
-                        return  # Exit program
-
-                    # Run the agent
-                    from langchain_core.messages import HumanMessage
-
-                    inputs = {"messages": [HumanMessage(content=user_input)]}
-
-                    # Stream the output
-                    for event in agent.stream(inputs, config=config):
-                        for key, value in event.items():
-                            if key == "agent" or key in [
-                                "Planner",
-                                "Coder",
-                                "Reviewer",
-                            ]:
-                                if "messages" in value and value["messages"]:
-                                    last_msg = value["messages"][-1]
-                                    content = last_msg.content
-                                    agent_name = key if key != "agent" else "Agent"
-                                    # Handle MiniMax list-of-dicts content
-                                    if isinstance(content, list):
-                                        for item in content:
-                                            if isinstance(item, dict):
-                                                if item.get("type") == "text":
-                                                    print(
-                                                        f"[{agent_name}]: {item.get('text')}"
-                                                    )
-                                                elif item.get("type") == "thinking":
-                                                    pass
-                                    else:
-                                        print(f"[{agent_name}]: {content}")
-
-                                    if (
-                                        hasattr(last_msg, "tool_calls")
-                                        and last_msg.tool_calls
-                                    ):
-                                        for tool_call in last_msg.tool_calls:
-                                            print(
-                                                f"  [Calling Tool: {tool_call['name']} with {tool_call['args']}]"
-                                            )
-                            elif key == "tools":
-                                print("Tool execution completed.")
-                                if "messages" in value and value["messages"]:
-                                    for msg in value["messages"]:
-                                        print(f"  [Tool Output]: {msg.content}")
+            # Process-wide checkpointer: the pool and schema survive reloads
+            checkpointer = get_checkpointer(db_url)
+
+            # Initialize Agent
+            agent = initialize_agent_graph(session_mgr, checkpointer)
+
+            # Use the session ID from the manager as the thread ID for persistence
+            thread_id = session_mgr.get_session_id()
+            # The Supervisor's routing guard ends runaway turns well before this;
+            # the recursion limit is only a hard backstop.
+            config = {
+                "configurable": {"thread_id": thread_id},
+                "recursion_limit": int(
+                    os.environ.get("AGENT_RECURSION_LIMIT", "200")
+                ),
+            }
+
+            print(f"Deep Agent ready with Enterprise Tools. Session: {thread_id}")
+            print("Type 'quit' to exit.")
+
+            # INTERACTION LOOP
+            while True:
+                # Check for reload request
+                if check_reload_request():
+                    print("\n[System] Reloading Agent Configuration...")
+                    break  # Break inner loop to re-initialize
+
+                user_input = input("User: ")
+                if user_input.lower() in ["quit", "exit"]:
+                    from reflection_worker import drain_reflections
+
+                    drain_reflections()
+                    return  # Exit program
+
+                # Run the agent
+                from langchain_core.messages import HumanMessage
+
+                inputs = {"messages": [HumanMessage(content=user_input)]}
+
+                # Stream the output; checkpoints are written per CHECKPOINT_DURABILITY
+                for event in agent.stream(
+                    inputs, config=config, durability=get_durability()
+                ):
+                    for key, value in event.items():
+                        if key == "agent" or key in [
+                            "Planner",
+                            "Coder",
+                            "Reviewer",
+                        ]:
+                            if "messages" in value and value["messages"]:
+                                last_msg = value["messages"][-1]
+                                content = last_msg.content
+                                agent_name = key if key != "agent" else "Agent"
+                                # Handle MiniMax list-of-dicts content
+                                if isinstance(content, list):
+                                    for item in content:
+                                        if isinstance(item, dict):
+                                            if item.get("type") == "text":
+                                                print(
+                                                    f"[{agent_name}]: {item.get('text')}"
+                                                )
+                                            elif item.get("type") == "thinking":
+                                                pass
+                                else:
+                                    print(f"[{agent_name}]: {content}")
+
+                                if (
+                                    hasattr(last_msg, "tool_calls")
+                                    and last_msg.tool_calls
+                                ):
+                                    for tool_call in last_msg.tool_calls:
+                                        print(
+                                            f"  [Calling Tool: {tool_call['name']} with {tool_call['args']}]"
+                                        )
+                        elif key == "tools":
+                            print("Tool execution completed.")
+                            if "messages" in value and value["messages"]:
+                                for msg in value["messages"]:
+                                    print(f"  [Tool Output]: {msg.content}")
         except KeyboardInterrupt:
             print("\nExiting...")
             break
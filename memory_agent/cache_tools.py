@@ -1,11 +1,68 @@
+import hashlib
+import json
 import os
-from langchain.globals import set_llm_cache
-from langchain_community.cache import RedisCache
+import threading
+import time
+
+from langchain_core.globals import set_llm_cache
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
 from redis import Redis
 
+# LLM response caching.
+# `init_redis_cache()` installs an exact-match cache in Dragonfly. Entries are
+# namespaced by agent role, carry a TTL per namespace and a version derived from
+# the prompt templates (so edited prompts never serve stale generations), and the
+# cache as a whole is kept under a byte budget by evicting least recently used
+# entries. Hits, misses and bytes are kept in Dragonfly; see `python cache_tools.py
+# stats`.
+#
+# With LLM_SEMANTIC_CACHE=true a semantic tier is put in front of it: prompts are
+# embedded and a cached generation is returned when a previous prompt in the same
+# scope is at least LLM_SEMANTIC_THRESHOLD similar. A scope is one model
+# configuration (model, temperature, role and bound tools, i.e. the cache's
+# `llm_string`) plus the system prompt. Calls that continue a tool loop and
+# responses that contain tool calls are never served or stored semantically.
+#
+# Settings (environment):
+#   LLM_CACHE_TTL                   - seconds a generation is kept (default 86400)
+#   LLM_CACHE_TTL_<NAMESPACE>       - per-namespace TTL, e.g. LLM_CACHE_TTL_REFLECTION
+#   LLM_CACHE_MAX_BYTES             - byte budget for cached generations (default 256MB)
+#   LLM_CACHE_VERSION               - extra version tag mixed into the template version
+#   LLM_SEMANTIC_CACHE              - "true" to enable the semantic tier (default false)
+#   LLM_SEMANTIC_THRESHOLD          - minimum cosine similarity for a hit (default 0.95)
+#   LLM_SEMANTIC_THRESHOLD_<ROLE>   - per-role override (e.g. ..._REFLECTION=0.9)
+#   LLM_SEMANTIC_MAX_ENTRIES        - entries kept per scope (default 500)
 
-def init_redis_cache():
-    """Initialize Redis caching for LLM responses."""
+# Keys of the exact cache, under its key prefix (default "llmcache:"):
+#   gen:<namespace>:<version>:<sha>  - cached generations
+#   lru     - sorted set: entry key -> last access time
+#   expiry  - sorted set: entry key -> time its TTL runs out
+#   sizes   - hash: entry key -> bytes
+#   bytes   - total bytes of all entries
+#   stats   - hash: "<namespace>:hits" / "<namespace>:misses"
+KEY_PREFIX = "llmcache:"
+SEMANTIC_KEY_PREFIX = "llmcache:semantic:"
+
+# Modules whose prompt templates feed the cache version
+PROMPT_SOURCES = (
+    "team_structure.py",
+    "reflection.py",
+    "history_manager.py",
+    "routing_guard.py",
+)
+
+# Entries evicted per round when over the byte budget
+EVICTION_BATCH = 32
+
+# Conversation characters embedded per prompt (most recent part)
+SEMANTIC_TEXT_CHARS = 2000
+
+# How often a scope's entries are re-read from Redis (other processes' updates)
+SEMANTIC_REFRESH_SECONDS = 60
+
+
+def get_redis_url():
     redis_url = os.environ.get("DRAGONFLY_NODE_1_URL")
     if not redis_url:
         # Fallback to constructing from parts if full URL not set
@@ -14,12 +71,457 @@ def init_redis_cache():
         )
         port = os.environ.get("DRAGONFLY_NODE_1_PORT", "18000")
         redis_url = f"redis://:{password}@localhost:{port}"
+    return redis_url
+
+
+def prompt_template_version():
+    """Hash of the modules that define the agents' prompt templates."""
+    digest = hashlib.sha256(os.environ.get("LLM_CACHE_VERSION", "").encode())
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for filename in PROMPT_SOURCES:
+        path = os.path.join(base_dir, filename)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def namespace_ttl(namespace):
+    ttl = os.environ.get(f"LLM_CACHE_TTL_{namespace.upper()}") or os.environ.get(
+        "LLM_CACHE_TTL", "86400"
+    )
+    return int(float(ttl))
+
+
+def _parse_prompt(prompt):
+    """Returns [(message_type, text)] for a serialized chat prompt."""
+    try:
+        serialized = json.loads(prompt)
+    except ValueError:
+        return [("HumanMessage", prompt)]
+    parsed = []
+    for msg in serialized if isinstance(serialized, list) else [serialized]:
+        kwargs = msg.get("kwargs", {}) if isinstance(msg, dict) else {}
+        content = kwargs.get("content", "")
+        if isinstance(content, list):
+            content = " ".join(
+                c.get("text", "") for c in content if isinstance(c, dict)
+            )
+        msg_type = msg.get("id", ["?"])[-1] if isinstance(msg, dict) else "?"
+        parsed.append((msg_type, str(content)))
+    return parsed
+
+
+def _role_from_llm_string(llm_string):
+    # PooledChatAnthropic appends "---role:<Role>" (see llm_clients.py)
+    marker = "---role:"
+    return llm_string.rsplit(marker, 1)[1] if marker in llm_string else ""
+
+
+def namespace_of(llm_string):
+    """Cache namespace of a model configuration: its agent role."""
+    return (_role_from_llm_string(llm_string) or "default").lower()
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class NamespacedRedisCache(BaseCache):
+    """
+    Exact-match LLM cache in Redis/Dragonfly with per-namespace TTLs, a prompt
+    template version in every key, and LRU eviction under a byte budget.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        version=None,
+        max_bytes=256 * 1024 * 1024,
+        key_prefix=KEY_PREFIX,
+    ):
+        self.redis = redis_client
+        self.version = version or prompt_template_version()
+        self.max_bytes = max_bytes
+        self.generation_prefix = f"{key_prefix}gen:"
+        self.lru_key = f"{key_prefix}lru"
+        self.expiry_key = f"{key_prefix}expiry"
+        self.sizes_key = f"{key_prefix}sizes"
+        self.bytes_key = f"{key_prefix}bytes"
+        self.stats_key = f"{key_prefix}stats"
+
+    def _key(self, prompt, llm_string):
+        namespace = namespace_of(llm_string)
+        digest = hashlib.sha256(f"{prompt}\0{llm_string}".encode()).hexdigest()
+        return namespace, f"{self.generation_prefix}{namespace}:{self.version}:{digest}"
+
+    def lookup(self, prompt, llm_string):
+        namespace, key = self._key(prompt, llm_string)
+        raw = self.redis.get(key)
+        pipe = self.redis.pipeline()
+        pipe.hincrby(self.stats_key, f"{namespace}:{'hits' if raw else 'misses'}", 1)
+        if raw:
+            pipe.zadd(self.lru_key, {key: time.time()})
+        pipe.execute()
+        if not raw:
+            return None
+        return [loads(g) for g in json.loads(raw)]
+
+    def peek(self, prompt, llm_string):
+        """`lookup()` without counting a hit or miss or touching the LRU order."""
+        raw = self.redis.get(self._key(prompt, llm_string)[1])
+        return [loads(g) for g in json.loads(raw)] if raw else None
+
+    def update(self, prompt, llm_string, return_val):
+        namespace, key = self._key(prompt, llm_string)
+        payload = json.dumps([dumps(g) for g in return_val])
+        size = len(payload)
+        previous = int(self.redis.hget(self.sizes_key, key) or 0)
+        ttl = namespace_ttl(namespace)
+        now = time.time()
+        pipe = self.redis.pipeline()
+        pipe.set(key, payload, ex=ttl)
+        pipe.zadd(self.lru_key, {key: now})
+        # Lets `expire_stale()` drop the bookkeeping once Redis expires the entry
+        pipe.zadd(self.expiry_key, {key: now + ttl})
+        pipe.hset(self.sizes_key, key, size)
+        pipe.incrby(self.bytes_key, size - previous)
+        pipe.execute()
+        self.evict()
+
+    def _forget(self, keys):
+        """Deletes entries and their LRU/size bookkeeping."""
+        if not keys:
+            return 0
+        sizes = self.redis.hmget(self.sizes_key, keys)
+        freed = sum(int(size or 0) for size in sizes)
+        pipe = self.redis.pipeline()
+        pipe.delete(*keys)
+        pipe.zrem(self.lru_key, *keys)
+        pipe.zrem(self.expiry_key, *keys)
+        pipe.hdel(self.sizes_key, *keys)
+        pipe.decrby(self.bytes_key, freed)
+        pipe.execute()
+        return freed
+
+    def expire_stale(self):
+        """Drops the LRU/size bookkeeping of entries whose TTL has run out."""
+        expired = [
+            _decode(k)
+            for k in self.redis.zrangebyscore(self.expiry_key, "-inf", time.time())
+        ]
+        self._forget(expired)
+        return len(expired)
+
+    def evict(self):
+        """Evicts least recently used entries until the cache fits its byte budget."""
+        self.expire_stale()
+        evicted = 0
+        while True:
+            excess = int(self.redis.get(self.bytes_key) or 0) - self.max_bytes
+            if excess <= 0:
+                break
+            oldest = self.redis.zrange(self.lru_key, 0, EVICTION_BATCH - 1)
+            oldest = [_decode(k) for k in oldest]
+            if not oldest:
+                # Bookkeeping drifted (e.g. manual deletes); start counting afresh
+                self.redis.set(self.bytes_key, 0)
+                break
+            victims, freed = [], 0
+            for key, size in zip(oldest, self.redis.hmget(self.sizes_key, oldest)):
+                victims.append(key)
+                freed += int(size or 0)
+                if freed >= excess:
+                    break
+            evicted += len(victims)
+            self._forget(victims)
+        if evicted:
+            print(f"[LLMCache] Evicted {evicted} least recently used entries.")
+        return evicted
+
+    def _entry_keys(self, namespace=None):
+        pattern = f"{self.generation_prefix}{namespace or '*'}:*"
+        return [_decode(k) for k in self.redis.scan_iter(pattern)]
+
+    def purge_stale_versions(self):
+        """Deletes entries written under other prompt template versions."""
+        stale = [
+            k
+            for k in self._entry_keys()
+            if k[len(self.generation_prefix) :].split(":")[1] != self.version
+        ]
+        self._forget(stale)
+        return len(stale)
+
+    def clear(self, namespace=None, **kwargs):
+        self._forget(self._entry_keys(namespace))
+        if namespace is None:
+            self.redis.delete(self.lru_key, self.expiry_key, self.sizes_key, self.bytes_key)
+
+    def stats(self):
+        """Hits, misses and bytes per namespace, plus totals."""
+        counters = {
+            _decode(k): int(v) for k, v in self.redis.hgetall(self.stats_key).items()
+        }
+        namespaces = {}
+        for field, value in counters.items():
+            namespace, counter = field.rsplit(":", 1)
+            namespaces.setdefault(namespace, {"hits": 0, "misses": 0})[counter] = value
+        for namespace, counts in namespaces.items():
+            total = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = counts["hits"] / total if total else 0.0
+        return {
+            "version": self.version,
+            "entries": self.redis.zcard(self.lru_key),
+            "bytes": int(self.redis.get(self.bytes_key) or 0),
+            "max_bytes": self.max_bytes,
+            "namespaces": namespaces,
+        }
+
+
+class SemanticLLMCache(BaseCache):
+    """Semantic cache tier in front of an exact-match LLM cache."""
+
+    def __init__(
+        self,
+        exact_cache=None,
+        redis_client=None,
+        threshold=0.95,
+        max_entries=500,
+        version="",
+    ):
+        self.exact_cache = exact_cache
+        self.version = version
+        self.redis = redis_client
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._scopes = {}  # scope -> {"loaded_at", "vectors", "generations"}
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    def _threshold(self, role):
+        override = role and os.environ.get(f"LLM_SEMANTIC_THRESHOLD_{role.upper()}")
+        return float(override) if override else self.threshold
+
+    def _embed(self, text):
+        from memory_tools import get_embedding_model
+
+        model = get_embedding_model()
+        if model is None:
+            return None
+        import numpy as np
+
+        vector = np.asarray(model.encode(text), dtype="float32")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _scope_and_text(self, prompt, llm_string):
+        """Returns (scope, text) for a prompt, or (None, None) if it is not eligible."""
+        messages = _parse_prompt(prompt)
+        # A call that continues a tool loop depends on the exact tool results
+        if not messages or messages[-1][0] == "ToolMessage":
+            return None, None
+        system = "\n".join(text for t, text in messages if t == "SystemMessage")
+        digest = hashlib.sha256((llm_string + "\n" + system).encode()).hexdigest()
+        scope = f"{namespace_of(llm_string)}:{self.version}:{digest[:24]}"
+        text = "\n".join(text for t, text in messages if t != "SystemMessage")
+        return scope, text[-SEMANTIC_TEXT_CHARS:]
+
+    def _load_scope(self, scope):
+        import numpy as np
+
+        entry = self._scopes.get(scope)
+        if entry and time.time() - entry["loaded_at"] < SEMANTIC_REFRESH_SECONDS:
+            return entry
+        vectors, generations = [], []
+        if self.redis is not None:
+            try:
+                for raw in self.redis.lrange(SEMANTIC_KEY_PREFIX + scope, 0, -1):
+                    item = json.loads(raw)
+                    vectors.append(np.asarray(item["v"], dtype="float32"))
+                    generations.append(item["g"])
+            except Exception as e:
+                print(f"[LLMCache] Could not load semantic entries: {e}")
+        entry = {
+            "loaded_at": time.time(),
+            "vectors": vectors,
+            "generations": generations,
+        }
+        self._scopes[scope] = entry
+        return entry
+
+    def lookup(self, prompt, llm_string):
+        self.stats["lookups"] += 1
+        if self.exact_cache is not None:
+            exact = self.exact_cache.lookup(prompt, llm_string)
+            if exact:
+                self.stats["exact_hits"] += 1
+                return exact
+
+        scope, text = self._scope_and_text(prompt, llm_string)
+        vector = self._embed(text) if scope else None
+        if vector is not None:
+            import numpy as np
+
+            with self._lock:
+                entry = self._load_scope(scope)
+                if entry["vectors"]:
+                    scores = np.stack(entry["vectors"]) @ vector
+                    best = int(np.argmax(scores))
+                    role = _role_from_llm_string(llm_string)
+                    if scores[best] >= self._threshold(role):
+                        self.stats["semantic_hits"] += 1
+                        print(
+                            f"[LLMCache] Semantic hit ({scores[best]:.3f}) "
+                            f"for {role or 'llm'}"
+                        )
+                        return [loads(g) for g in entry["generations"][best]]
+
+        self.stats["misses"] += 1
+        return None
+
+    def peek(self, prompt, llm_string):
+        """Exact-tier `lookup()` that does not count towards the stats."""
+        if self.exact_cache is None:
+            return None
+        peek = getattr(self.exact_cache, "peek", self.exact_cache.lookup)
+        return peek(prompt, llm_string)
+
+    def update(self, prompt, llm_string, return_val):
+        if self.exact_cache is not None:
+            self.exact_cache.update(prompt, llm_string, return_val)
+
+        # Tool calls carry call ids and depend on live state; never reuse them
+        if any(
+            getattr(getattr(g, "message", None), "tool_calls", None) for g in return_val
+        ):
+            return
+        scope, text = self._scope_and_text(prompt, llm_string)
+        vector = self._embed(text) if scope else None
+        if vector is None:
+            return
+
+        generations = [dumps(g) for g in return_val]
+        with self._lock:
+            entry = self._load_scope(scope)
+            entry["vectors"].append(vector)
+            entry["generations"].append(generations)
+            del entry["vectors"][: -self.max_entries]
+            del entry["generations"][: -self.max_entries]
+        if self.redis is not None:
+            try:
+                key = SEMANTIC_KEY_PREFIX + scope
+                item = json.dumps({"v": vector.tolist(), "g": generations})
+                pipe = self.redis.pipeline()
+                pipe.rpush(key, item)
+                pipe.ltrim(key, -self.max_entries, -1)
+                # The list is bounded by LTRIM and has no LRU/size records of its
+                # own, so expiring it leaves no bookkeeping behind
+                pipe.expire(key, namespace_ttl(namespace_of(llm_string)))
+                pipe.execute()
+            except Exception as e:
+                print(f"[LLMCache] Could not store semantic entry: {e}")
+
+    def clear(self, namespace=None, **kwargs):
+        with self._lock:
+            self._scopes.clear()
+        if self.exact_cache is not None:
+            self.exact_cache.clear(namespace=namespace, **kwargs)
+        if self.redis is not None:
+            pattern = f"{SEMANTIC_KEY_PREFIX}{namespace or '*'}:*"
+            for key in self.redis.scan_iter(pattern):
+                self.redis.delete(key)
+
+    def hit_rates(self):
+        lookups = self.stats["lookups"]
+        return {
+            **self.stats,
+            "exact_hit_rate": self.stats["exact_hits"] / lookups if lookups else 0.0,
+            "semantic_hit_rate": (
+                self.stats["semantic_hits"] / lookups if lookups else 0.0
+            ),
+        }
+
+
+_llm_cache = None
+_redis_client = None
+
+
+def get_cache_redis():
+    """The Dragonfly client of the installed LLM cache (None if not initialized)."""
+    return _redis_client
+
+
+def build_exact_cache(redis_client):
+    return NamespacedRedisCache(
+        redis_client,
+        max_bytes=int(os.environ.get("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    )
+
+
+def get_llm_cache_stats():
+    """Stats of the installed LLM cache: exact tier plus semantic hit rates."""
+    if isinstance(_llm_cache, SemanticLLMCache):
+        return {**_llm_cache.exact_cache.stats(), "semantic": _llm_cache.hit_rates()}
+    if isinstance(_llm_cache, NamespacedRedisCache):
+        return _llm_cache.stats()
+    return {}
+
+
+def init_redis_cache():
+    """Initialize Redis caching for LLM responses."""
+    global _llm_cache, _redis_client
+    redis_url = get_redis_url()
 
     print(f"Initializing Redis Cache at {redis_url.split('@')[-1]}...")
 
     try:
         redis_client = Redis.from_url(redis_url)
-        set_llm_cache(RedisCache(redis_=redis_client))
+        exact_cache = build_exact_cache(redis_client)
+        purged = exact_cache.purge_stale_versions()
+        if purged:
+            print(f"Purged {purged} cached generations from older prompt versions.")
+        _llm_cache = exact_cache
+        semantic = os.environ.get("LLM_SEMANTIC_CACHE", "false").lower()
+        if semantic in ("1", "true", "yes"):
+            _llm_cache = SemanticLLMCache(
+                exact_cache=exact_cache,
+                redis_client=redis_client,
+                threshold=float(os.environ.get("LLM_SEMANTIC_THRESHOLD", "0.95")),
+                max_entries=int(os.environ.get("LLM_SEMANTIC_MAX_ENTRIES", "500")),
+                version=exact_cache.version,
+            )
+            print("Semantic LLM cache tier enabled.")
+        set_llm_cache(_llm_cache)
+        _redis_client = redis_client
         print("✅ Redis Cache initialized successfully.")
     except Exception as e:
         print(f"❌ Failed to initialize Redis Cache: {e}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect and manage the LLM cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show hits, misses and bytes per namespace")
+    clear_parser = sub.add_parser("clear", help="Delete cached generations")
+    clear_parser.add_argument("--namespace", help="Only this namespace (agent role)")
+    sub.add_parser("purge", help="Delete entries from older prompt template versions")
+    sub.add_parser("evict", help="Evict LRU entries until under LLM_CACHE_MAX_BYTES")
+    args = parser.parse_args()
+
+    cache = build_exact_cache(Redis.from_url(get_redis_url()))
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    elif args.command == "clear":
+        cache.clear(namespace=args.namespace and args.namespace.lower())
+        print(f"Cleared {args.namespace or 'all namespaces'}.")
+    elif args.command == "purge":
+        print(f"Purged {cache.purge_stale_versions()} stale entries.")
+    elif args.command == "evict":
+        print(f"Evicted {cache.evict()} entries.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import os
+import random
+import statistics
+import time
+import zlib
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# Compressed checkpoint serialization.
+# Every super-step the Postgres checkpointer stores a new version of the
+# ever-growing `messages` channel, so long threads are slow to load and the
+# checkpoint tables balloon. `CompressedSerializer` encodes values with the
+# binary msgpack format of LangGraph's JsonPlusSerializer and compresses
+# payloads above a size threshold with zstd (zlib when `zstandard` is not
+# installed). The codec is recorded in the blob's type, e.g. "msgpack+zstd", so
+# rows stay self-describing:
+#   - legacy rows ("json", "msgpack", ...) are read unchanged;
+#   - compressed rows are read whatever the current write setting is.
+#
+# Settings (environment):
+#   CHECKPOINT_COMPRESSION            - "zstd" (default), "zlib" or "none"
+#   CHECKPOINT_COMPRESSION_LEVEL      - codec level (default 3)
+#   CHECKPOINT_COMPRESS_MIN_BYTES     - smaller payloads are stored as is (default 512)
+#
+#   python checkpoint_serde.py [--turns 500]  - bytes/checkpoint and load time benchmark
+
+
+class ZlibCodec:
+    name = "zlib"
+
+    def __init__(self, level=3):
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class ZstdCodec:
+    name = "zstd"
+
+    def __init__(self, level=3):
+        import zstandard
+
+        self.level = level
+        self._zstd = zstandard
+
+    def compress(self, data):
+        # The module-level helpers are safe to call from several threads
+        return self._zstd.compress(data, self.level)
+
+    def decompress(self, data):
+        return self._zstd.decompress(data)
+
+
+def make_codec(name, level=3):
+    """Returns the codec called `name`, or None for "none"."""
+    if name == "none":
+        return None
+    if name == "zstd":
+        try:
+            return ZstdCodec(level)
+        except ImportError:
+            print("[CheckpointSerde] 'zstandard' not installed, compressing with zlib.")
+            return ZlibCodec(level)
+    if name == "zlib":
+        return ZlibCodec(level)
+    raise ValueError(f"Unknown checkpoint compression: {name}")
+
+
+class CompressedSerializer(JsonPlusSerializer):
+    """
+    JsonPlusSerializer (msgpack) with transparent compression of large payloads.
+    Being a JsonPlusSerializer, it takes part in LangGraph's msgpack allowlist
+    (`with_msgpack_allowlist`, LANGGRAPH_STRICT_MSGPACK). Other keyword arguments
+    go to JsonPlusSerializer.
+    """
+
+    def __init__(self, codec=None, min_bytes=512, **kwargs):
+        super().__init__(**kwargs)
+        self.codec = codec
+        self.min_bytes = min_bytes
+        self._decoders = {}
+
+    def dumps_typed(self, obj):
+        type_, data = super().dumps_typed(obj)
+        if self.codec is None or type_ == "null" or len(data) < self.min_bytes:
+            return type_, data
+        compressed = self.codec.compress(data)
+        if len(compressed) >= len(data):
+            return type_, data
+        return f"{type_}+{self.codec.name}", compressed
+
+    def _decoder(self, name):
+        decoder = self._decoders.get(name)
+        if decoder is None:
+            decoder = ZstdCodec() if name == "zstd" else ZlibCodec()
+            self._decoders[name] = decoder
+        return decoder
+
+    def loads_typed(self, data):
+        type_, payload = data
+        base, _, codec = type_.rpartition("+")
+        if base and codec in ("zstd", "zlib"):
+            type_, payload = base, self._decoder(codec).decompress(payload)
+        return super().loads_typed((type_, payload))
+
+
+def get_checkpoint_serde():
+    """The serializer for the team graph's checkpointer, configured from the env."""
+    codec = make_codec(
+        os.environ.get("CHECKPOINT_COMPRESSION", "zstd").lower(),
+        int(os.environ.get("CHECKPOINT_COMPRESSION_LEVEL", "3")),
+    )
+    return CompressedSerializer(
+        codec=codec,
+        min_bytes=int(os.environ.get("CHECKPOINT_COMPRESS_MIN_BYTES", "512")),
+    )
+
+
+class LegacyJsonSerializer:
+    """The JSON row format older checkpointers wrote (benchmark baseline only)."""
+
+    def __init__(self):
+        self.inner = JsonPlusSerializer()
+
+    def dumps_typed(self, obj):
+        from langchain_core.load import dumps
+
+        return "json", dumps(obj).encode()
+
+    def loads_typed(self, data):
+        return self.inner.loads_typed(data)
+
+
+def synthetic_turn(rng, turn):
+    """One Planner/Coder style turn: request, tool call, tool output, answer."""
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+    words = (
+        "deploy service config module function cache index query graph memory "
+        "worker retry timeout test build release schema table migration handler "
+        "request response error latency token stream session thread agent"
+    ).split()
+
+    def text(n):
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    call_id = f"call_{turn:04d}"
+    code = "\n".join(
+        f"def {rng.choice(words)}_{i}(x):\n    return x.{rng.choice(words)}()"
+        for i in range(rng.randint(8, 20))
+    )
+    return [
+        HumanMessage(content=text(rng.randint(20, 60))),
+        AIMessage(
+            content=text(rng.randint(30, 80)),
+            tool_calls=[
+                {"name": "read_file", "args": {"file_path": f"src/{turn}.py"}, "id": call_id}
+            ],
+            usage_metadata={
+                "input_tokens": 1200 + turn * 40,
+                "output_tokens": 150,
+                "total_tokens": 1350 + turn * 40,
+            },
+        ),
+        ToolMessage(content=code, tool_call_id=call_id, name="read_file"),
+        AIMessage(content=text(rng.randint(60, 160)), name="Coder"),
+    ]
+
+
+def benchmark(turns=500, seed=7):
+    """
+    Serializes the `messages` channel as it grows over a `turns`-turn thread (one
+    checkpoint per turn) and reports bytes per checkpoint and final load time.
+    """
+    rng = random.Random(seed)
+    messages = []
+    snapshots = []
+    for turn in range(turns):
+        messages = messages + synthetic_turn(rng, turn)
+        snapshots.append(messages)
+
+    serializers = {
+        "json (legacy)": LegacyJsonSerializer(),
+        "msgpack": CompressedSerializer(codec=None),
+        "msgpack+zlib": CompressedSerializer(codec=make_codec("zlib")),
+        "msgpack+zstd": CompressedSerializer(codec=make_codec("zstd")),
+    }
+    results = {}
+    for name, serde in serializers.items():
+        sizes = []
+        start = time.perf_counter()
+        for snapshot in snapshots:
+            sizes.append(len(serde.dumps_typed(snapshot)[1]))
+        dump_seconds = time.perf_counter() - start
+
+        final = serde.dumps_typed(snapshots[-1])
+        load_times = []
+        for _ in range(5):
+            start = time.perf_counter()
+            loaded = serde.loads_typed(final)
+            load_times.append(time.perf_counter() - start)
+        assert len(loaded) == len(messages)
+        results[name] = {
+            "type": final[0],
+            "avg_bytes_per_checkpoint": statistics.mean(sizes),
+            "final_bytes": sizes[-1],
+            "total_bytes": sum(sizes),
+            "dump_ms_per_checkpoint": dump_seconds / turns * 1000,
+            "load_ms_final": statistics.median(load_times) * 1000,
+        }
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Checkpoint serializer benchmark")
+    parser.add_argument("--turns", type=int, default=500)
+    args = parser.parse_args()
+
+    results = benchmark(args.turns)
+    baseline = results["json (legacy)"]["total_bytes"]
+    print(f"{args.turns}-turn thread, one messages checkpoint per turn\n")
+    print(
+        f"{'serializer':<15} {'avg B/ckpt':>12} {'final B':>11} {'total MB':>9} "
+        f"{'ratio':>6} {'dump ms':>8} {'load ms':>8}"
+    )
+    for name, r in results.items():
+        print(
+            f"{name:<15} {r['avg_bytes_per_checkpoint']:>12,.0f} {r['final_bytes']:>11,} "
+            f"{r['total_bytes'] / 1e6:>9.1f} {r['total_bytes'] / baseline:>6.2f} "
+            f"{r['dump_ms_per_checkpoint']:>8.2f} {r['load_ms_final']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import atexit
+import os
+import threading
+import zlib
+
+# Process-scoped Postgres checkpointer.
+# One psycopg connection pool and PostgresSaver per connection string, created on
+# first use and kept for the life of the process: agent.py's reload loop and the
+# Temporal worker's activities all reuse the same warm connections instead of
+# opening (and leaking) a new connection or pool for every reload or turn.
+#
+# Migrations (`setup()`) run at most once per process, and only when the
+# checkpoint_migrations table is behind the saver's MIGRATIONS list. Concurrent
+# processes serialize the migration on a Postgres advisory lock.
+#
+# Checkpoints are written with the compressed msgpack serializer from
+# checkpoint_serde.py (legacy rows remain readable).
+#
+# Durability (when a turn's checkpoints are written, see `get_durability()`):
+#   "turn"  - (default; LangGraph's "exit") one checkpoint when the turn's run
+#             ends, also when it fails, so no node waits on a Postgres write; a
+#             crash mid-turn resumes from the previous turn. NATS reflection jobs
+#             enqueued during the turn wait (retry) until that checkpoint holds
+#             their messages
+#   "async" - (LangGraph's own default) every node's checkpoint is written in the
+#             background while the next node runs; pending writes are flushed
+#             before the turn returns
+#   "sync"  - every node waits for its checkpoint write
+#
+# Settings (environment):
+#   CHECKPOINT_POOL_MIN_SIZE   - connections kept open (default 1)
+#   CHECKPOINT_POOL_MAX_SIZE   - max connections per process (default 10)
+#   CHECKPOINT_DURABILITY      - "turn" (default), "async" or "sync"
+
+# Arbitrary but stable id for the migration advisory lock
+MIGRATION_LOCK_ID = zlib.crc32(b"memory_agent.checkpoint_migrations")
+
+DURABILITY_MODES = {"turn": "exit", "exit": "exit", "async": "async", "sync": "sync"}
+
+_lock = threading.Lock()
+_savers = {}
+
+
+def get_durability():
+    """The LangGraph `durability` to run team turns with."""
+    mode = os.environ.get("CHECKPOINT_DURABILITY", "turn").lower()
+    if mode not in DURABILITY_MODES:
+        print(f"[Checkpointer] Unknown CHECKPOINT_DURABILITY '{mode}', using 'turn'.")
+        mode = "turn"
+    return DURABILITY_MODES[mode]
+
+
+def _schema_version(conn):
+    exists = conn.execute(
+        "SELECT to_regclass('checkpoint_migrations') IS NOT NULL AS present"
+    ).fetchone()
+    if not exists["present"]:
+        return -1
+    row = conn.execute(
+        "SELECT v FROM checkpoint_migrations ORDER BY v DESC LIMIT 1"
+    ).fetchone()
+    return -1 if row is None else row["v"]
+
+
+def schema_version(pool):
+    """Latest applied checkpoint migration, or -1 if the schema does not exist."""
+    with pool.connection() as conn:
+        return _schema_version(conn)
+
+
+def ensure_schema(saver):
+    """Runs `saver.setup()` only if the checkpoint schema is behind this version."""
+    latest = len(saver.MIGRATIONS) - 1
+    if schema_version(saver.conn) >= latest:
+        return False
+    with saver.conn.connection() as conn:
+        conn.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        try:
+            # Another process may have migrated while we waited for the lock. The
+            # check and the migrations use the locked connection: checking out a
+            # second one would deadlock a pool of size 1
+            if _schema_version(conn) < latest:
+                type(saver)(conn, serde=saver.serde).setup()
+                print(f"[Checkpointer] Applied checkpoint migrations up to v{latest}")
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+    return True
+
+
+def get_checkpointer(conn_string):
+    """Returns the process-wide PostgresSaver for `conn_string`, creating it once."""
+    from checkpoint_serde import get_checkpoint_serde
+    from langgraph.checkpoint.postgres import PostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+
+    with _lock:
+        saver = _savers.get(conn_string)
+        if saver is not None:
+            return saver
+
+        pool = ConnectionPool(
+            conninfo=conn_string,
+            min_size=int(os.environ.get("CHECKPOINT_POOL_MIN_SIZE", "1")),
+            max_size=int(os.environ.get("CHECKPOINT_POOL_MAX_SIZE", "10")),
+            # Same connection settings PostgresSaver.from_conn_string uses
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            # Replace connections broken by a database restart before handing them out
+            check=ConnectionPool.check_connection,
+            open=True,
+        )
+        saver = PostgresSaver(pool, serde=get_checkpoint_serde())
+        try:
+            ensure_schema(saver)
+        except Exception:
+            pool.close()
+            raise
+        if not _savers:
+            atexit.register(close_checkpointers)
+        _savers[conn_string] = saver
+        print(f"[Checkpointer] Connection pool ready (max {pool.max_size})")
+        return saver
+
+
+def close_checkpointers():
+    """Closes every checkpointer pool (e.g. before exit)."""
+    with _lock:
+        for saver in _savers.values():
+            saver.conn.close()
+        _savers.clear()
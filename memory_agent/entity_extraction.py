@@ -0,0 +1,134 @@
+import re
+
+# Local (no LLM) entity and relationship extraction for reflection.
+# Entities come from the names already in the knowledge graph plus a few pattern
+# rules; relationships only from explicit phrases such as "X depends on Y".
+
+# Quoted names: 'SpiderBot', "DeepAgents", `requests`
+QUOTED_PATTERN = re.compile(r"""(?<![\w])['"`]([A-Za-z][\w.\- ]{1,39}?)['"`](?![\w])""")
+# CamelCase / mixed-case identifiers: SpiderBot, BeautifulSoup, MongoDB, GitHub
+CAMEL_CASE_PATTERN = re.compile(r"\b([A-Z][a-z0-9]+(?:[A-Z][a-z0-9]*)+|[A-Z][a-z]+[A-Z]{2,})\b")
+
+# A preceding noun hints at the entity type: "project SpiderBot", "the requests library"
+TYPE_HINTS = {
+    "project": "Project",
+    "app": "Project",
+    "service": "Service",
+    "agent": "Agent",
+    "tool": "Tool",
+    "library": "Technology",
+    "package": "Technology",
+    "framework": "Technology",
+    "database": "Database",
+    "db": "Database",
+}
+DEFAULT_ENTITY_TYPE = "Concept"
+
+# Relation phrases between two entities in the same sentence
+RELATION_PATTERNS = [
+    (re.compile(r"\bdepends? on\b|\bdepend on\b|\brequires?\b", re.I), "DEPENDS_ON"),
+    (re.compile(r"\buses?\b|\busing\b", re.I), "USES"),
+    (re.compile(r"\b(?:is )?built (?:with|on)\b", re.I), "BUILT_WITH"),
+    (re.compile(r"\bcalls?\b", re.I), "CALLS"),
+    (re.compile(r"\bextends?\b", re.I), "EXTENDS"),
+    (re.compile(r"\bis part of\b|\bbelongs to\b", re.I), "PART_OF"),
+]
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def load_known_entities():
+    """Returns {name: label} for the canonical entities in the knowledge graph."""
+    from entity_index import get_entity_index
+
+    return get_entity_index().known_entities()
+
+
+def _infer_type(sentence, start):
+    preceding = sentence[:start].lower().split()[-2:]
+    following = sentence[start:].lower().split()[1:3]
+    for word in reversed(preceding):
+        word = word.strip(".,:;'\"`()")
+        if word in TYPE_HINTS:
+            return TYPE_HINTS[word]
+    for word in following:
+        word = word.strip(".,:;'\"`()")
+        if word in TYPE_HINTS:
+            return TYPE_HINTS[word]
+    return DEFAULT_ENTITY_TYPE
+
+
+def _compile_known(known_entities):
+    """Builds one case-insensitive alternation over the known names (longest first)."""
+    if not known_entities:
+        return None, {}
+    by_lower = {name.lower(): (name, label) for name, label in known_entities.items()}
+    names = sorted(by_lower, key=len, reverse=True)
+    pattern = re.compile(
+        r"(?<!\w)(" + "|".join(re.escape(n) for n in names) + r")(?!\w)", re.I
+    )
+    return pattern, by_lower
+
+
+def _find_mentions(sentence, known_pattern, known_by_lower):
+    """Returns [(start, end, name, label)] for entity mentions in one sentence."""
+    mentions = []
+
+    if known_pattern is not None:
+        for match in known_pattern.finditer(sentence):
+            name, label = known_by_lower[match.group(1).lower()]
+            mentions.append((match.start(), match.end(), name, label))
+
+    for pattern in (QUOTED_PATTERN, CAMEL_CASE_PATTERN):
+        for match in pattern.finditer(sentence):
+            name = match.group(1).strip()
+            mentions.append(
+                (match.start(), match.end(), name, _infer_type(sentence, match.start()))
+            )
+
+    # Keep the first (known entities win) of any overlapping mentions
+    mentions.sort(key=lambda m: m[0])
+    kept = []
+    for mention in mentions:
+        if kept and mention[0] < kept[-1][1]:
+            continue
+        kept.append(mention)
+    return kept
+
+
+def extract_entities(text, known_entities=None):
+    """
+    Extracts entities and obvious relationships from `text` without an LLM.
+
+    Returns (entities, relationships) in the same shape the reflection prompt used:
+    [{"name", "type"}] and [{"from", "to", "type"}].
+    """
+    if known_entities is None:
+        known_entities = load_known_entities()
+
+    known_pattern, known_by_lower = _compile_known(known_entities)
+    entities = {}
+    relationships = []
+    seen_relationships = set()
+
+    for sentence in SENTENCE_SPLIT.split(text):
+        mentions = _find_mentions(sentence, known_pattern, known_by_lower)
+        for _, _, name, label in mentions:
+            entities.setdefault(name, label)
+
+        # A relation phrase between two consecutive mentions links them
+        for left, right in zip(mentions, mentions[1:]):
+            between = sentence[left[1] : right[0]]
+            for pattern, relation in RELATION_PATTERNS:
+                if pattern.search(between):
+                    key = (left[2], relation, right[2])
+                    if key not in seen_relationships:
+                        seen_relationships.add(key)
+                        relationships.append(
+                            {"from": left[2], "to": right[2], "type": relation}
+                        )
+                    break
+
+    return (
+        [{"name": name, "type": label} for name, label in entities.items()],
+        relationships,
+    )
@@ -0,0 +1,156 @@
+import difflib
+import os
+import re
+import threading
+import time
+
+# Canonical entity index for the knowledge graph.
+# "SpiderBot", "spiderbot" and "Spider Bot" all normalize to the key "spiderbot" and
+# resolve to one canonical node; near misses ("SpiderBots") are caught by fuzzy
+# matching above ENTITY_MATCH_THRESHOLD. Alternate spellings are kept as aliases.
+
+ENTITY_MATCH_THRESHOLD = float(os.environ.get("ENTITY_MATCH_THRESHOLD", "0.88"))
+ENTITY_INDEX_TTL = float(os.environ.get("ENTITY_INDEX_TTL", "600"))
+# Short keys ("api", "db") are too ambiguous for fuzzy matching
+FUZZY_MIN_KEY_LENGTH = 5
+
+DEFAULT_ENTITY_LABEL = "Concept"
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name):
+    """Normalizes an entity name to its lookup key: casefolded, alphanumerics only."""
+    return _NON_ALNUM.sub("", name.casefold())
+
+
+class EntityIndex:
+    """
+    In-process index of canonical entity names, loaded from Neo4j and kept up to date
+    by `resolve()`. Reloaded from the graph every ENTITY_INDEX_TTL seconds.
+    """
+
+    def __init__(self, threshold=ENTITY_MATCH_THRESHOLD, ttl=ENTITY_INDEX_TTL):
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_key = {}  # normalized key -> canonical name
+        self._labels = {}  # canonical name -> label
+        self._aliases = {}  # canonical name -> set of alias spellings
+        self._loaded_at = 0.0
+
+    def load(self, force=False):
+        """Loads canonical names, labels and aliases from the graph (TTL-cached)."""
+        if not force and time.time() - self._loaded_at < self.ttl:
+            return
+
+        from tools.graph_tools import get_neo4j_driver
+
+        try:
+            driver = get_neo4j_driver()
+            try:
+                with driver.session() as session:
+                    records = list(
+                        session.run(
+                            "MATCH (n) WHERE n.name IS NOT NULL "
+                            "RETURN n.name AS name, head(labels(n)) AS label, "
+                            "n.aliases AS aliases"
+                        )
+                    )
+            finally:
+                driver.close()
+        except Exception as e:
+            print(f"[EntityIndex] Could not load entities from graph: {e}")
+            self._loaded_at = time.time()
+            return
+
+        with self._lock:
+            for record in records:
+                name = record["name"]
+                if not isinstance(name, str):
+                    continue
+                self._register(
+                    name, record["label"] or DEFAULT_ENTITY_LABEL, record["aliases"] or []
+                )
+            self._loaded_at = time.time()
+
+    def _register(self, name, label, aliases=()):
+        key = normalize_name(name)
+        canonical = self._by_key.setdefault(key, name)
+        self._labels.setdefault(canonical, label)
+        for alias in aliases:
+            self._aliases.setdefault(canonical, set()).add(alias)
+            self._by_key.setdefault(normalize_name(alias), canonical)
+        return canonical
+
+    def _match(self, key):
+        if key in self._by_key:
+            return self._by_key[key]
+        if len(key) < FUZZY_MIN_KEY_LENGTH:
+            return None
+        candidates = difflib.get_close_matches(
+            key, self._by_key.keys(), n=1, cutoff=self.threshold
+        )
+        return self._by_key[candidates[0]] if candidates else None
+
+    def lookup(self, name):
+        """Returns the canonical name for `name`, or None if it is not known."""
+        self.load()
+        key = normalize_name(name)
+        if not key:
+            return None
+        with self._lock:
+            return self._match(key)
+
+    def match(self, name, label=None):
+        """
+        Resolves `name` to its canonical entity without changing the index.
+
+        Returns (canonical_name, label, alias) where `alias` is `name` when it is a
+        new spelling of an existing entity, else None. A new entity resolves to
+        itself.
+        """
+        self.load()
+        key = normalize_name(name)
+        if not key:
+            return name, label or DEFAULT_ENTITY_LABEL, None
+
+        with self._lock:
+            canonical = self._match(key)
+            if canonical is None:
+                return name, label or DEFAULT_ENTITY_LABEL, None
+            alias = None
+            if name != canonical and name not in self._aliases.get(canonical, set()):
+                alias = name
+            return canonical, self._labels[canonical], alias
+
+    def register(self, name, label, aliases=()):
+        """Adds an entity (and alias spellings) that was written to the graph."""
+        with self._lock:
+            return self._register(name, label, aliases)
+
+    def resolve(self, name, label=None):
+        """
+        `match()` followed by `register()`. Graph writers should call the two around
+        their write instead, so the index never holds names the graph does not.
+        """
+        canonical, label, alias = self.match(name, label)
+        self.register(canonical, label, [alias] if alias else [])
+        return canonical, label, alias
+
+    def known_entities(self):
+        """Returns {canonical_name: label} for every indexed entity."""
+        self.load()
+        with self._lock:
+            return dict(self._labels)
+
+
+# Global instance
+_entity_index = None
+
+
+def get_entity_index():
+    global _entity_index
+    if _entity_index is None:
+        _entity_index = EntityIndex()
+    return _entity_index
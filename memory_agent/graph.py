@@ -5,7 +5,7 @@ import warnings
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_anthropic import ChatAnthropic
 from memory_tools import save_memory, recall_memory, init_db
-from team_structure import build_team_graph
+from graph_factory import get_team_graph
 from session_manager import get_session_manager
 # import psycopg2
 
@@ -90,5 +90,5 @@ load_secrets()
 checkpointer = MemorySaver()
 
 # Create the agent
-# Using build_team_graph to match agent.py structure
-agent = build_team_graph(checkpointer=checkpointer)
+# Using the graph factory to match agent.py structure
+agent = get_team_graph(checkpointer=checkpointer)
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import threading
+
+# Builds the team graph once per process and reuses it across turns and reloads.
+# Building is expensive (three react agents with all their tools, including the
+# generated ones), so the uncompiled workflow is cached under a key made of a
+# fingerprint of the tool sources, the model configuration and the build-time
+# switches. Only a real change to one of them triggers a rebuild; binding a
+# different checkpointer just recompiles.
+
+TOOLS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools")
+
+# Environment variables that change which model(s) the agents talk to
+MODEL_CONFIG_PREFIXES = ("MiniMax_M2_", "LLM_")
+MODEL_SECRET_VARS = ("MINIMAX_API_KEY", "ANTHROPIC_API_KEY")
+
+# Environment variables read while the workflow is built
+BUILD_CONFIG_VARS = (
+    "PROMPT_CACHE",
+    "TOOL_SELECTION",
+    "TOOL_SELECTION_TOP_K",
+    "MESSAGE_VIEWS",
+    "LAZY_TOOLS",
+)
+
+_lock = threading.Lock()
+_workflow_cache = {}
+_compiled_cache = {}
+
+
+def _tool_source_dirs():
+    from tools.meta_tools import TOOLS_DIR
+
+    return [TOOLS_ROOT, TOOLS_DIR]
+
+
+def tool_fingerprint():
+    """Hashes the source of every tool module, including the generated ones."""
+    digest = hashlib.sha256()
+    for directory in _tool_source_dirs():
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".py"):
+                continue
+            path = os.path.join(directory, filename)
+            digest.update(path.encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def model_config_fingerprint():
+    """Hashes the model configuration (secrets are hashed, never stored)."""
+    digest = hashlib.sha256()
+    for key in sorted(os.environ):
+        if key.startswith(MODEL_CONFIG_PREFIXES) or key in MODEL_SECRET_VARS:
+            digest.update(f"{key}={os.environ[key]}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def build_config_fingerprint():
+    """Hashes the build-time switches (unset and set variables differ)."""
+    digest = hashlib.sha256()
+    for key in BUILD_CONFIG_VARS:
+        digest.update(f"{key}={os.environ.get(key)!r}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def get_graph_key():
+    return (
+        f"tools:{tool_fingerprint()}/model:{model_config_fingerprint()}"
+        f"/build:{build_config_fingerprint()}"
+    )
+
+
+def get_team_graph(checkpointer=None):
+    """
+    Returns the compiled team graph, rebuilding it only when the tool sources, the
+    model configuration or a build-time switch changed since the last build.
+    """
+    from team_structure import build_team_workflow
+
+    key = get_graph_key()
+    with _lock:
+        compiled = _compiled_cache.get(key)
+        if compiled is not None and compiled.checkpointer is checkpointer:
+            print(f"[GraphFactory] Reusing compiled team graph ({key})")
+            return compiled
+
+        workflow = _workflow_cache.get(key)
+        if workflow is None:
+            print(f"[GraphFactory] Building team graph ({key})")
+            # Previous builds are stale now; drop them so their agents can be freed
+            _workflow_cache.clear()
+            _compiled_cache.clear()
+            workflow = build_team_workflow()
+            _workflow_cache[key] = workflow
+
+        compiled = workflow.compile(checkpointer=checkpointer)
+        _compiled_cache[key] = compiled
+        return compiled
+
+
+def clear_graph_cache():
+    """Forces the next `get_team_graph()` call to rebuild."""
+    with _lock:
+        _workflow_cache.clear()
+        _compiled_cache.clear()
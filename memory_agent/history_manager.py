@@ -0,0 +1,95 @@
+import os
+
+from langchain_core.messages import HumanMessage
+
+from message_utils import message_text
+
+# Bounded message history for the sub-agents.
+# `TeamState.messages` stays append-only (reflection and the checkpoint rely on
+# stable indices), but agents are only sent the last HISTORY_KEEP_TURNS user turns
+# verbatim. Everything older is folded into a rolling summary kept in the state
+# (`history_summary`, covering messages[:history_summary_upto]) and sent as one
+# leading message, so per-call prompt size no longer grows with thread age.
+#
+# Folding happens at the start of a turn, in batches of HISTORY_FOLD_BATCH_TURNS
+# turns, so the summarizer LLM is not called on every turn.
+
+SUMMARY_PREFIX = "[SYSTEM: Conversation Summary]"
+
+
+def get_history_config():
+    return {
+        "keep_turns": int(os.environ.get("HISTORY_KEEP_TURNS", "6")),
+        "fold_batch_turns": int(os.environ.get("HISTORY_FOLD_BATCH_TURNS", "3")),
+        "max_summary_chars": int(os.environ.get("HISTORY_SUMMARY_MAX_CHARS", "4000")),
+    }
+
+
+def turn_start_indices(messages):
+    """Indices of the messages that start a real user turn (not injected context)."""
+    return [
+        i
+        for i, msg in enumerate(messages)
+        if isinstance(msg, HumanMessage) and not message_text(msg).startswith("[SYSTEM:")
+    ]
+
+
+def fold_into_summary(previous_summary, messages, max_chars=4000):
+    """Asks the Summarizer model to merge `messages` into the rolling summary."""
+    from reflection import format_conversation
+    from team_structure import get_llm
+
+    prompt = (
+        "You maintain the rolling summary of a long conversation between a user and "
+        "an agent team (Planner, Coder, Reviewer). Update the summary with the new "
+        "messages. Keep decisions, requirements, file names, open issues and results; "
+        f"drop chit-chat. Stay under {max_chars} characters.\n\n"
+        f"Current summary:\n{previous_summary or '(empty)'}\n\n"
+        f"New messages:\n{format_conversation(messages)}\n\n"
+        "Updated summary:"
+    )
+    response = get_llm("Summarizer").invoke(prompt)
+    return message_text(response).strip()[:max_chars]
+
+
+def compact_history(state, summarize=fold_into_summary):
+    """
+    Returns a state update that folds turns older than the last `keep_turns` into
+    the rolling summary, or {} when there is not yet a full batch to fold.
+    """
+    config = get_history_config()
+    messages = state.get("messages", [])
+    upto = state.get("history_summary_upto", 0) or 0
+
+    # The current turn is always kept verbatim
+    keep_turns = max(1, config["keep_turns"])
+    starts = [i for i in turn_start_indices(messages) if i >= upto]
+    if len(starts) < keep_turns + max(1, config["fold_batch_turns"]):
+        return {}
+
+    cut = starts[-keep_turns]
+    to_fold = messages[upto:cut]
+    if not to_fold:
+        return {}
+
+    try:
+        summary = summarize(
+            state.get("history_summary", ""), to_fold, config["max_summary_chars"]
+        )
+    except Exception as e:
+        # Keep sending the full history rather than losing context
+        print(f"[HistoryManager] Summarization failed, keeping history: {e}")
+        return {}
+
+    print(f"[HistoryManager] Folded messages [{upto}:{cut}] into the rolling summary.")
+    return {"history_summary": summary, "history_summary_upto": cut}
+
+
+def history_view(state):
+    """The bounded message list sent to a sub-agent: summary + recent turns."""
+    messages = state.get("messages", [])
+    upto = min(state.get("history_summary_upto", 0) or 0, len(messages))
+    summary = state.get("history_summary")
+    if not upto or not summary:
+        return list(messages)
+    return [HumanMessage(content=f"{SUMMARY_PREFIX}\n{summary}")] + messages[upto:]
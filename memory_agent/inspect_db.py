@@ -1,11 +1,29 @@
 import os
 import sys
+import time
+from datetime import datetime, timedelta, timezone
+
 import psycopg2
 from urllib.parse import urlparse
 
 # Add current directory to sys.path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Checkpoint maintenance CLI.
+#   python inspect_db.py                      - list tables and thread ids
+#   python inspect_db.py threads [--limit N]  - per-thread checkpoint counts and bytes
+#   python inspect_db.py prune --older-than-days N [--keep-last K] [--thread ID]
+#                              [--batch-size B] [--sleep S] [--dry-run] [--no-vacuum]
+#
+# Pruning deletes a thread's checkpoints older than N days, always keeping its
+# latest K (default 1), together with their pending writes and the channel blobs
+# no remaining checkpoint references. Deletes run in short transactions of at
+# most B rows so production writers are never blocked for long, and the affected
+# tables are vacuumed and analyzed afterwards. --dry-run only reports what would
+# be deleted.
+
+CHECKPOINT_TABLES = ("checkpoints", "checkpoint_blobs", "checkpoint_writes")
+
 
 def expand_vars(text):
     """Expands shell-style variables with defaults."""
@@ -89,5 +107,262 @@ def inspect_checkpoints():
         print(f"Error connecting to DB: {e}")
 
 
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def connect():
+    load_secrets()
+    return psycopg2.connect(get_postgres_connection_string())
+
+
+def report_threads(conn, limit=20):
+    """Prints checkpoint, blob and write counts and on-disk bytes per thread."""
+    cur = conn.cursor()
+    for table in CHECKPOINT_TABLES:
+        cur.execute("SELECT pg_total_relation_size(%s)", (table,))
+        print(f"{table:<20} {format_bytes(cur.fetchone()[0]):>10}")
+
+    cur.execute(
+        """
+        WITH c AS (
+            SELECT thread_id, count(*) AS n,
+                   sum(pg_column_size(checkpoint) + pg_column_size(metadata)) AS bytes,
+                   max(checkpoint->>'ts') AS last_ts
+            FROM checkpoints GROUP BY thread_id
+        ), b AS (
+            SELECT thread_id, count(*) AS n, sum(pg_column_size(blob)) AS bytes
+            FROM checkpoint_blobs GROUP BY thread_id
+        ), w AS (
+            SELECT thread_id, count(*) AS n, sum(pg_column_size(blob)) AS bytes
+            FROM checkpoint_writes GROUP BY thread_id
+        )
+        SELECT c.thread_id, c.n, coalesce(b.n, 0), coalesce(w.n, 0),
+               c.bytes + coalesce(b.bytes, 0) + coalesce(w.bytes, 0) AS total,
+               c.last_ts
+        FROM c LEFT JOIN b USING (thread_id) LEFT JOIN w USING (thread_id)
+        ORDER BY total DESC
+        LIMIT %s
+        """,
+        (limit,),
+    )
+    rows = cur.fetchall()
+    print(
+        f"\n{'thread_id':<40} {'ckpts':>7} {'blobs':>7} {'writes':>7} "
+        f"{'bytes':>10}  last checkpoint"
+    )
+    for thread_id, checkpoints, blobs, writes, total, last_ts in rows:
+        print(
+            f"{thread_id[:40]:<40} {checkpoints:>7} {blobs:>7} {writes:>7} "
+            f"{format_bytes(total):>10}  {last_ts}"
+        )
+    return rows
+
+
+def prunable_checkpoints(cur, thread_id, ns, cutoff, keep_last):
+    """Checkpoint ids of (thread_id, ns) older than `cutoff`, minus the latest `keep_last`."""
+    cur.execute(
+        """
+        SELECT checkpoint_id,
+               pg_column_size(checkpoint) + pg_column_size(metadata)
+        FROM (
+            SELECT checkpoint_id, checkpoint, metadata,
+                   row_number() OVER (ORDER BY checkpoint_id DESC) AS rn
+            FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s
+        ) ranked
+        WHERE rn > %s AND (checkpoint->>'ts')::timestamptz < %s
+        ORDER BY checkpoint_id
+        """,
+        (thread_id, ns, keep_last, cutoff),
+    )
+    return cur.fetchall()
+
+
+def orphaned_blobs(cur, thread_id, ns, removed_ids):
+    """
+    Blob keys of (thread_id, ns) no checkpoint outside `removed_ids` references.
+    Only versions older than the latest checkpoint's are considered, so blobs a
+    concurrent writer has stored ahead of its new checkpoint are left alone.
+    """
+    cur.execute(
+        """
+        SELECT b.channel, b.version, pg_column_size(b.blob)
+        FROM checkpoint_blobs b
+        WHERE b.thread_id = %(thread_id)s AND b.checkpoint_ns = %(ns)s
+          AND b.version < (
+              SELECT l.checkpoint->'channel_versions'->>b.channel
+              FROM checkpoints l
+              WHERE l.thread_id = %(thread_id)s AND l.checkpoint_ns = %(ns)s
+              ORDER BY l.checkpoint_id DESC LIMIT 1
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM checkpoints c
+              WHERE c.thread_id = %(thread_id)s AND c.checkpoint_ns = %(ns)s
+                AND c.checkpoint_id <> ALL(%(removed)s)
+                AND c.checkpoint->'channel_versions'->>b.channel = b.version
+          )
+        """,
+        {"thread_id": thread_id, "ns": ns, "removed": list(removed_ids)},
+    )
+    return cur.fetchall()
+
+
+def writes_bytes(cur, thread_id, ns, checkpoint_ids):
+    cur.execute(
+        """
+        SELECT count(*), coalesce(sum(pg_column_size(blob)), 0) FROM checkpoint_writes
+        WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id = ANY(%s)
+        """,
+        (thread_id, ns, list(checkpoint_ids)),
+    )
+    return cur.fetchone()
+
+
+def batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def prune_checkpoints(
+    conn,
+    older_than_days,
+    keep_last=1,
+    thread_id=None,
+    batch_size=500,
+    sleep=0.05,
+    dry_run=False,
+    vacuum=True,
+):
+    """Prunes old intermediate checkpoints; returns the totals deleted (or to delete)."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    keep_last = max(1, keep_last)
+    cur = conn.cursor()
+    if thread_id:
+        cur.execute(
+            "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints WHERE thread_id = %s",
+            (thread_id,),
+        )
+    else:
+        cur.execute("SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints")
+    threads = cur.fetchall()
+    conn.commit()
+
+    totals = {"threads": 0, "checkpoints": 0, "writes": 0, "blobs": 0, "bytes": 0}
+    for tid, ns in threads:
+        candidates = prunable_checkpoints(cur, tid, ns, cutoff, keep_last)
+        if not candidates:
+            conn.commit()
+            continue
+        ids = [row[0] for row in candidates]
+        write_count, write_bytes = writes_bytes(cur, tid, ns, ids)
+        blobs = orphaned_blobs(cur, tid, ns, ids) if dry_run else []
+        conn.commit()
+
+        if not dry_run:
+            for batch in batches(ids, batch_size):
+                cur.execute(
+                    "DELETE FROM checkpoint_writes WHERE thread_id = %s "
+                    "AND checkpoint_ns = %s AND checkpoint_id = ANY(%s)",
+                    (tid, ns, batch),
+                )
+                cur.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = %s "
+                    "AND checkpoint_ns = %s AND checkpoint_id = ANY(%s)",
+                    (tid, ns, batch),
+                )
+                conn.commit()
+                time.sleep(sleep)
+
+            blobs = orphaned_blobs(cur, tid, ns, [])
+            conn.commit()
+            for batch in batches(blobs, batch_size):
+                cur.execute(
+                    """
+                    DELETE FROM checkpoint_blobs
+                    WHERE thread_id = %s AND checkpoint_ns = %s
+                      AND (channel, version) IN (
+                          SELECT * FROM unnest(%s::text[], %s::text[])
+                      )
+                    """,
+                    (tid, ns, [b[0] for b in batch], [b[1] for b in batch]),
+                )
+                conn.commit()
+                time.sleep(sleep)
+
+        freed = sum(row[1] for row in candidates) + write_bytes + sum(b[2] for b in blobs)
+        totals["threads"] += 1
+        totals["checkpoints"] += len(ids)
+        totals["writes"] += write_count
+        totals["blobs"] += len(blobs)
+        totals["bytes"] += freed
+        print(
+            f"{'[dry-run] ' if dry_run else ''}{tid} {ns or '(root)'}: "
+            f"{len(ids)} checkpoints, {write_count} writes, {len(blobs)} blobs, "
+            f"{format_bytes(freed)}"
+        )
+
+    verb = "Would delete" if dry_run else "Deleted"
+    print(
+        f"\n{verb} {totals['checkpoints']} checkpoints, {totals['writes']} writes and "
+        f"{totals['blobs']} blobs ({format_bytes(totals['bytes'])}) "
+        f"from {totals['threads']} threads."
+    )
+
+    if vacuum and not dry_run and totals["checkpoints"]:
+        # VACUUM cannot run inside a transaction block; it does not lock out writers
+        conn.autocommit = True
+        for table in CHECKPOINT_TABLES:
+            print(f"VACUUM (ANALYZE) {table}")
+            cur.execute(f"VACUUM (ANALYZE) {table}")
+        conn.autocommit = False
+    return totals
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Checkpoint inspection and maintenance")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("list", help="List tables and thread ids (default)")
+
+    threads = sub.add_parser("threads", help="Per-thread checkpoint counts and bytes")
+    threads.add_argument("--limit", type=int, default=20)
+
+    prune = sub.add_parser("prune", help="Delete old intermediate checkpoints")
+    prune.add_argument("--older-than-days", type=float, required=True)
+    prune.add_argument("--keep-last", type=int, default=1, help="checkpoints kept per thread")
+    prune.add_argument("--thread", help="only prune this thread_id")
+    prune.add_argument("--batch-size", type=int, default=500)
+    prune.add_argument("--sleep", type=float, default=0.05, help="seconds between batches")
+    prune.add_argument("--dry-run", action="store_true")
+    prune.add_argument("--no-vacuum", action="store_true")
+    args = parser.parse_args()
+
+    if args.command in (None, "list"):
+        inspect_checkpoints()
+        return
+
+    conn = connect()
+    try:
+        if args.command == "threads":
+            report_threads(conn, args.limit)
+        elif args.command == "prune":
+            prune_checkpoints(
+                conn,
+                args.older_than_days,
+                keep_last=args.keep_last,
+                thread_id=args.thread,
+                batch_size=args.batch_size,
+                sleep=args.sleep,
+                dry_run=args.dry_run,
+                vacuum=not args.no_vacuum,
+            )
+    finally:
+        conn.close()
+
+
 if __name__ == "__main__":
-    inspect_checkpoints()
+    main()
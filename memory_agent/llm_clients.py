@@ -0,0 +1,171 @@
+import hashlib
+import os
+import threading
+from functools import cached_property
+from typing import Optional
+
+import anthropic
+from langchain_anthropic import ChatAnthropic
+
+# Shared LLM client registry.
+# Every chat model built through `get_chat_model()` sends its requests through one
+# process-wide, keep-alive httpx pool (HTTP/2 when the `h2` package is installed),
+# so Planner, Coder, Reviewer and Reflection reuse the same sockets to the
+# MiniMax/Anthropic endpoint instead of each opening their own.
+#
+# Pool settings (environment):
+#   LLM_HTTP2                   - "true" (default) to negotiate HTTP/2
+#   LLM_HTTP_MAX_CONNECTIONS    - max open connections (default 20)
+#   LLM_HTTP_MAX_KEEPALIVE      - max idle keep-alive connections (default 10)
+#   LLM_HTTP_KEEPALIVE_EXPIRY   - seconds an idle connection is kept (default 60)
+#   LLM_HTTP_CONNECT_TIMEOUT    - connect timeout in seconds (default 10)
+#   LLM_HTTP_TIMEOUT            - read/write timeout in seconds (default 600)
+
+# The httpx flavour the installed SDK is built on (newer releases ship their own),
+# since the SDK rejects config objects from another one
+Timeout = anthropic.Timeout
+Limits = type(anthropic.DEFAULT_CONNECTION_LIMITS)
+
+_lock = threading.Lock()
+_http_client = None
+_async_http_client = None
+_models = {}
+
+
+def _http2_enabled():
+    if os.environ.get("LLM_HTTP2", "true").lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("[LLMClients] 'h2' not installed, falling back to HTTP/1.1 keep-alive.")
+        return False
+    return True
+
+
+def _pool_kwargs():
+    timeout = float(os.environ.get("LLM_HTTP_TIMEOUT", "600"))
+    return {
+        "http2": _http2_enabled(),
+        "limits": Limits(
+            max_connections=int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(
+                os.environ.get("LLM_HTTP_MAX_KEEPALIVE", "10")
+            ),
+            keepalive_expiry=float(os.environ.get("LLM_HTTP_KEEPALIVE_EXPIRY", "60")),
+        ),
+        "timeout": Timeout(
+            timeout,
+            connect=float(os.environ.get("LLM_HTTP_CONNECT_TIMEOUT", "10")),
+        ),
+    }
+
+
+def get_http_client():
+    """Returns the process-wide pooled httpx client used by all chat models."""
+    global _http_client
+    with _lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = anthropic.DefaultHttpxClient(**_pool_kwargs())
+        return _http_client
+
+
+def get_async_http_client():
+    """Async counterpart of `get_http_client()`."""
+    global _async_http_client
+    with _lock:
+        if _async_http_client is None or _async_http_client.is_closed:
+            _async_http_client = anthropic.DefaultAsyncHttpxClient(**_pool_kwargs())
+        return _async_http_client
+
+
+class PooledChatAnthropic(ChatAnthropic):
+    """ChatAnthropic whose SDK clients use the shared connection pool."""
+
+    # Agent role this model serves; part of the LLM cache key (see cache_tools.py)
+    cache_role: Optional[str] = None
+
+    def _sdk_client_params(self, http_client):
+        params = dict(self._client_params)
+        if self.default_request_timeout is None:
+            # The SDK treats timeout=None as "no timeout" and would ignore the pool's
+            params["timeout"] = http_client.timeout
+        return params
+
+    @cached_property
+    def _client(self) -> anthropic.Client:
+        http_client = get_http_client()
+        return anthropic.Client(
+            **self._sdk_client_params(http_client), http_client=http_client
+        )
+
+    @cached_property
+    def _async_client(self) -> anthropic.AsyncClient:
+        http_client = get_async_http_client()
+        return anthropic.AsyncClient(
+            **self._sdk_client_params(http_client), http_client=http_client
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        # Only reached on an LLM cache miss; concurrent duplicates share one call,
+        # which queues on the cluster-wide rate limiter (see rate_limiter.py)
+        from rate_limiter import governed_call
+        from singleflight import coalesce_llm_call
+
+        return coalesce_llm_call(
+            self,
+            messages,
+            stop,
+            kwargs,
+            lambda: governed_call(
+                self.anthropic_api_url or "default",
+                lambda: super(PooledChatAnthropic, self)._generate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                ),
+            ),
+        )
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        from rate_limiter import agoverned_call
+
+        return await agoverned_call(
+            self.anthropic_api_url or "default",
+            lambda: super(PooledChatAnthropic, self)._agenerate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            ),
+        )
+
+    def _get_llm_string(self, stop=None, **kwargs):
+        llm_string = super()._get_llm_string(stop=stop, **kwargs)
+        return f"{llm_string}---role:{self.cache_role or ''}"
+
+
+def get_chat_model(model, base_url, api_key, temperature=0.7, **kwargs):
+    """
+    Returns a shared chat model for this configuration, creating it on first use.
+    Models with the same settings are the same instance; all of them share sockets.
+    """
+    key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:12]
+    key = (model, base_url, key_hash, temperature, tuple(sorted(kwargs.items())))
+    with _lock:
+        llm = _models.get(key)
+        if llm is None:
+            llm = PooledChatAnthropic(
+                model=model,
+                temperature=temperature,
+                base_url=base_url,
+                api_key=api_key,
+                **kwargs,
+            )
+            _models[key] = llm
+        return llm
+
+
+def close_llm_clients():
+    """Closes the shared sync pool and forgets cached models (e.g. before exit)."""
+    global _http_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+        _models.clear()
@@ -71,6 +71,28 @@ def init_db():
         client.close()
 
 
+_embedding_model = None
+_embedding_model_failed = False
+
+
+def get_embedding_model():
+    """
+    Returns the shared sentence-transformers model, loading it once per process.
+    Returns None (and does not retry) if it cannot be loaded.
+    """
+    global _embedding_model, _embedding_model_failed
+    if _embedding_model is None and not _embedding_model_failed:
+        try:
+            from sentence_transformers import SentenceTransformer
+
+            # Use a small, fast model. 'all-MiniLM-L6-v2' is standard but might need download.
+            _embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+        except Exception as e:
+            print(f"Embedding model unavailable (falling back to keyword only): {e}")
+            _embedding_model_failed = True
+    return _embedding_model
+
+
 @tool
 def save_memory(content: str) -> str:
     """Saves a piece of information to long-term memory using Weaviate.
@@ -88,15 +110,12 @@ def save_memory(content: str) -> str:
 
         # Generate embedding using sentence-transformers
         vector = None
-        try:
-            from sentence_transformers import SentenceTransformer
-
-            # Use a small, fast model. 'all-MiniLM-L6-v2' is standard but might need download.
-            # We'll try to load it, if it fails we fall back to no vector.
-            model = SentenceTransformer("all-MiniLM-L6-v2")
-            vector = model.encode(content).tolist()
-        except Exception as e:
-            print(f"Embedding generation failed (falling back to keyword only): {e}")
+        model = get_embedding_model()
+        if model is not None:
+            try:
+                vector = model.encode(content).tolist()
+            except Exception as e:
+                print(f"Embedding generation failed (falling back to keyword only): {e}")
 
         collection.data.insert(
             properties={
@@ -174,3 +193,8 @@ def recall_memory(query: str) -> str:
         return "\n".join(results)
     except Exception as e:
         return f"Failed to recall memory: {e}"
+
+
+def get_memory_tools():
+    """Returns the semantic memory tools."""
+    return [save_memory, recall_memory]
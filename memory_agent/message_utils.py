@@ -0,0 +1,12 @@
+# Helpers shared by the modules that inspect LangChain messages
+# (history_manager, message_views, reflection_policy, routing_guard, tool_retriever).
+
+
+def message_text(msg):
+    """Plain text of a message; list content is joined from its text parts."""
+    content = msg.content
+    if isinstance(content, list):
+        return " ".join(
+            c.get("text", "") if isinstance(c, dict) else str(c) for c in content
+        )
+    return str(content)
@@ -0,0 +1,61 @@
+import os
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from message_utils import message_text
+
+# Role-scoped message views for the sub-agents.
+# The shared (checkpointed) `messages` list is not changed; each agent is just sent
+# the subset that is relevant to it. Sub-agent outputs are tagged with the agent's
+# name (see team_structure.agent_update), which is what the views filter on.
+#
+# Set MESSAGE_VIEWS=false to send every agent the full history again.
+
+CONTEXT_PREFIX = "[SYSTEM: Automatic Context]"
+
+# Which agents' outputs each role gets to see. "Supervisor" covers the routing
+# guard's turn summaries. Untagged (legacy) agent messages are always kept.
+ROLE_VISIBLE_AUTHORS = {
+    "Planner": {"Planner", "Reviewer", "Supervisor"},
+    "Coder": {"Planner", "Coder", "Reviewer", "Supervisor"},
+    "Reviewer": {"Planner", "Coder", "Reviewer"},
+}
+
+# Whether the role gets the automatically retrieved memory context blocks
+ROLE_SEES_CONTEXT = {"Planner": True, "Coder": True, "Reviewer": False}
+
+
+def _is_tool_chatter(msg):
+    """Tool results and tool-call-only assistant turns."""
+    if isinstance(msg, ToolMessage):
+        return True
+    return (
+        isinstance(msg, AIMessage)
+        and bool(getattr(msg, "tool_calls", None))
+        and not message_text(msg).strip()
+    )
+
+
+def role_view(messages, role):
+    """Returns the messages from `messages` that the `role` agent should see."""
+    if os.environ.get("MESSAGE_VIEWS", "true").lower() not in ("1", "true", "yes"):
+        return list(messages)
+    visible_authors = ROLE_VISIBLE_AUTHORS.get(role)
+    if visible_authors is None:
+        return list(messages)
+
+    view = []
+    for msg in messages:
+        if isinstance(msg, SystemMessage) or _is_tool_chatter(msg):
+            continue
+        if isinstance(msg, HumanMessage):
+            if message_text(msg).startswith(CONTEXT_PREFIX) and not ROLE_SEES_CONTEXT.get(
+                role, True
+            ):
+                continue
+            view.append(msg)
+            continue
+        author = getattr(msg, "name", None)
+        if author is None or author in visible_authors:
+            view.append(msg)
+    return view
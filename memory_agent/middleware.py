@@ -53,8 +53,13 @@ class MemoryMiddleware:
 
         # 2. Graph Search (Neo4j)
         # Extract entities to query the graph
+        from entity_index import get_entity_index
+
+        index = get_entity_index()
         keywords = self._extract_keywords(message)
         for kw in keywords:
+            # Query the canonical spelling so variants find the same node
+            kw = index.lookup(kw) or kw
             # Look for nodes with this name
             cypher = f"MATCH (n {{name: '{kw}'}}) RETURN n"
             graph_result = query_graph.invoke(cypher)
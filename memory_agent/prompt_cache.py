@@ -0,0 +1,119 @@
+import os
+import threading
+
+from langchain_anthropic.chat_models import convert_to_anthropic_tool
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+# Anthropic prompt caching for the sub-agents (opt-in, PROMPT_CACHE=true).
+# The request prefix is tools -> system -> messages. When enabled, cache breakpoints
+# (cache_control: ephemeral) are placed on:
+#   1. the last bound tool definition,
+#   2. the role's system prompt,
+#   3. the newest user/tool message, so each react step reuses the previous prefix.
+# Cache read/write token counts from the responses are logged per role and kept
+# in `get_prompt_cache_stats()`.
+#
+# Dynamic tool selection (tool_retriever.py) changes the tool prefix when the
+# selected set changes, which starts a new cache entry; the core set keeps most
+# steps of a run on the same prefix.
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def prompt_caching_enabled():
+    return os.environ.get("PROMPT_CACHE", "false").lower() in ("1", "true", "yes")
+
+
+def _with_breakpoint(content):
+    """Returns `content` as content blocks with a breakpoint on the last text block."""
+    if isinstance(content, str):
+        return [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}]
+    blocks = [dict(b) if isinstance(b, dict) else b for b in content]
+    for block in reversed(blocks):
+        if isinstance(block, dict) and block.get("type") == "text" and block.get("text"):
+            block["cache_control"] = CACHE_CONTROL
+            break
+    return blocks
+
+
+def _has_text(msg):
+    content = msg.content
+    if isinstance(content, str):
+        return bool(content.strip())
+    return any(isinstance(b, dict) and b.get("text") for b in content)
+
+
+def cached_prompt(system_prompt):
+    """
+    Returns a `create_react_agent` prompt: the plain string when caching is off,
+    otherwise a callable that adds breakpoints to the system prompt and history.
+    """
+    if not prompt_caching_enabled():
+        return system_prompt
+
+    system_message = SystemMessage(content=_with_breakpoint(system_prompt))
+
+    def prompt(state):
+        messages = list(state["messages"] if isinstance(state, dict) else state.messages)
+        # Rolling breakpoint on the newest user/tool message with text
+        for i in range(len(messages) - 1, -1, -1):
+            msg = messages[i]
+            if isinstance(msg, (HumanMessage, ToolMessage)) and _has_text(msg):
+                messages[i] = msg.model_copy(
+                    update={"content": _with_breakpoint(msg.content)}
+                )
+                break
+        return [system_message] + messages
+
+    return prompt
+
+
+def bind_tools_cached(llm, tools):
+    """`llm.bind_tools(tools)` with a cache breakpoint after the last tool definition."""
+    if not prompt_caching_enabled() or not tools:
+        return llm.bind_tools(tools)
+    definitions = [dict(convert_to_anthropic_tool(t)) for t in tools]
+    definitions[-1]["cache_control"] = CACHE_CONTROL
+    return llm.bind_tools(definitions)
+
+
+def record_cache_usage(role, messages):
+    """Logs and accumulates the cache read/write tokens of `role`'s responses."""
+    read = write = uncached = 0
+    for msg in messages:
+        if not isinstance(msg, AIMessage) or not msg.usage_metadata:
+            continue
+        details = msg.usage_metadata.get("input_token_details") or {}
+        cache_read = details.get("cache_read") or 0
+        cache_write = details.get("cache_creation") or 0
+        read += cache_read
+        write += cache_write
+        uncached += msg.usage_metadata.get("input_tokens", 0) - cache_read - cache_write
+    if not (read or write or uncached):
+        return
+
+    with _lock:
+        stats = _stats.setdefault(role, {"cache_read": 0, "cache_write": 0, "uncached": 0})
+        stats["cache_read"] += read
+        stats["cache_write"] += write
+        stats["uncached"] += max(0, uncached)
+    print(
+        f"[PromptCache] {role}: {read} cached, {write} written, "
+        f"{max(0, uncached)} uncached input tokens"
+    )
+
+
+def get_prompt_cache_stats():
+    """Per-role input token totals, with the share served from the cache."""
+    with _lock:
+        report = {}
+        for role, stats in _stats.items():
+            total = stats["cache_read"] + stats["cache_write"] + stats["uncached"]
+            report[role] = {
+                **stats,
+                "read_ratio": stats["cache_read"] / total if total else 0.0,
+            }
+        return report
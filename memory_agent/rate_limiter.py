@@ -0,0 +1,292 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+# Cluster-wide LLM rate limiting and concurrency control.
+# Every agent process and Temporal worker shares one token bucket per endpoint in
+# Dragonfly, tracking requests/min and tokens/min. A call first takes a slot of a
+# per-process FIFO semaphore, then waits until the shared bucket has a request
+# (and a positive token balance) for it. Token usage is debited after each
+# response. A provider 429 drains the bucket so every process backs off together,
+# and the call is retried once the bucket refills instead of failing.
+# If Dragonfly is unreachable, an in-process bucket with the same limits is used.
+#
+# Settings (environment):
+#   LLM_RATE_RPM            - requests per minute per endpoint (default 120, 0 = off)
+#   LLM_RATE_TPM            - tokens per minute per endpoint (default 0 = off)
+#   LLM_MAX_CONCURRENCY     - concurrent LLM calls per process (default 8)
+#   LLM_RATE_MAX_WAIT       - seconds to queue before calling anyway (default 300)
+#   LLM_RATE_429_RETRIES    - retries after a provider 429 (default 3)
+
+BUCKET_KEY_PREFIX = "llmrate:"
+BUCKET_TTL_MS = 120000
+
+# Refills both buckets, then takes one request if available and the token balance
+# is positive. Returns 0 on success, else the milliseconds to wait.
+ACQUIRE_SCRIPT = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local b = redis.call("HMGET", KEYS[1], "req", "tok", "ts")
+local req = tonumber(b[1]) or rpm
+local tok = tonumber(b[2]) or tpm
+local ts = tonumber(b[3]) or now
+local minutes = math.max(0, now - ts) / 60000.0
+req = math.min(rpm, req + minutes * rpm)
+tok = math.min(tpm, tok + minutes * tpm)
+local wait = 0
+if rpm > 0 and req < 1 then wait = (1 - req) / rpm * 60000 end
+if tpm > 0 and tok <= 0 then wait = math.max(wait, (1 - tok) / tpm * 60000) end
+if wait == 0 then req = req - 1 end
+redis.call("HSET", KEYS[1], "req", req, "tok", tok, "ts", now)
+redis.call("PEXPIRE", KEYS[1], ARGV[3])
+return math.ceil(wait)
+"""
+
+# Debits ARGV[1] tokens (may go negative); ARGV[2] = 1 also empties the request bucket
+DEBIT_SCRIPT = """
+local b = redis.call("HMGET", KEYS[1], "req", "tok")
+local tok = (tonumber(b[2]) or 0) - tonumber(ARGV[1])
+redis.call("HSET", KEYS[1], "tok", tok)
+if ARGV[2] == "1" then redis.call("HSET", KEYS[1], "req", 0) end
+redis.call("PEXPIRE", KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class FairSemaphore:
+    """A semaphore that hands out slots in arrival order."""
+
+    def __init__(self, value):
+        self._value = value
+        self._waiters = deque()
+        self._cond = threading.Condition()
+
+    def acquire(self, abandoned=None):
+        """Waits for a slot; returns False if `abandoned` was set before one was free."""
+        ticket = object()
+        with self._cond:
+            self._waiters.append(ticket)
+            while self._waiters[0] is not ticket or self._value <= 0:
+                if abandoned is not None and abandoned.is_set():
+                    self._waiters.remove(ticket)
+                    self._cond.notify_all()
+                    return False
+                self._cond.wait()
+            self._waiters.popleft()
+            self._value -= 1
+            self._cond.notify_all()
+            return True
+
+    async def acquire_async(self):
+        """Waits for a slot without blocking the event loop; safe to cancel."""
+        abandoned = threading.Event()
+        waiter = asyncio.ensure_future(asyncio.to_thread(self.acquire, abandoned))
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # Leave the queue; a slot taken in the meantime is handed back
+            with self._cond:
+                abandoned.set()
+                self._cond.notify_all()
+            waiter.add_done_callback(lambda f: f.result() and self.release())
+            raise
+
+    def release(self):
+        with self._cond:
+            self._value += 1
+            self._cond.notify_all()
+
+
+class LocalTokenBucket:
+    """In-process fallback with the same semantics as ACQUIRE_SCRIPT/DEBIT_SCRIPT."""
+
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.time()
+        minutes = (now - self.updated) / 60.0
+        self.requests = min(self.rpm, self.requests + minutes * self.rpm)
+        self.tokens = min(self.tpm, self.tokens + minutes * self.tpm)
+        self.updated = now
+
+    def try_acquire(self):
+        with self._lock:
+            self._refill()
+            wait = 0.0
+            if self.rpm > 0 and self.requests < 1:
+                wait = (1 - self.requests) / self.rpm * 60.0
+            if self.tpm > 0 and self.tokens <= 0:
+                wait = max(wait, (1 - self.tokens) / self.tpm * 60.0)
+            if wait == 0:
+                self.requests -= 1
+            return wait
+
+    def debit(self, tokens, drain=False):
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+            if drain:
+                self.requests = 0.0
+
+
+class LLMRateLimiter:
+    """Shared token bucket for one endpoint plus the per-process semaphore."""
+
+    def __init__(self, name, rpm, tpm, redis_client=None, max_wait=300.0):
+        self.key = BUCKET_KEY_PREFIX + name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.redis = redis_client
+        self.max_wait = max_wait
+        self.local = LocalTokenBucket(rpm, tpm)
+        self.waited_seconds = 0.0
+
+    @property
+    def enabled(self):
+        return self.rpm > 0 or self.tpm > 0
+
+    def _try_acquire(self):
+        if self.redis is not None:
+            try:
+                wait_ms = self.redis.eval(
+                    ACQUIRE_SCRIPT, 1, self.key, self.rpm, self.tpm, BUCKET_TTL_MS
+                )
+                return int(wait_ms) / 1000.0
+            except Exception as e:
+                print(f"[RateLimiter] Dragonfly bucket unavailable, using local: {e}")
+                self.redis = None
+        return self.local.try_acquire()
+
+    def wait_for_capacity(self):
+        """Blocks until the bucket grants a request (or max_wait has passed)."""
+        if not self.enabled:
+            return
+        start = time.time()
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                break
+            waited = time.time() - start
+            if waited + wait > self.max_wait:
+                print(f"[RateLimiter] Queued {waited:.1f}s, proceeding anyway.")
+                break
+            # Jitter spreads out waiters that were told the same refill time
+            time.sleep(wait + random.uniform(0, 0.1))
+        self.waited_seconds += time.time() - start
+
+    def debit(self, tokens, drain=False):
+        """Charges `tokens` against the tokens/min budget; `drain` empties the bucket."""
+        if not self.enabled or (tokens <= 0 and not drain):
+            return
+        if self.redis is not None:
+            try:
+                self.redis.eval(
+                    DEBIT_SCRIPT, 1, self.key, tokens, "1" if drain else "0", BUCKET_TTL_MS
+                )
+                return
+            except Exception as e:
+                print(f"[RateLimiter] Dragonfly bucket unavailable, using local: {e}")
+                self.redis = None
+        self.local.debit(tokens, drain)
+
+
+def _usage_tokens(result):
+    total = 0
+    for generation in getattr(result, "generations", []):
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage:
+            total += usage.get("total_tokens", 0)
+    return total
+
+
+_lock = threading.Lock()
+_limiters = {}
+_semaphore = None
+
+
+def get_rate_limiter(name):
+    """Returns the shared limiter for endpoint `name` (e.g. its base URL)."""
+    global _semaphore
+    with _lock:
+        if _semaphore is None:
+            _semaphore = FairSemaphore(int(os.environ.get("LLM_MAX_CONCURRENCY", "8")))
+        limiter = _limiters.get(name)
+        if limiter is None:
+            redis_client = None
+            try:
+                from cache_tools import get_redis_url
+                from redis import Redis
+
+                redis_client = Redis.from_url(get_redis_url(), socket_timeout=2)
+            except Exception as e:
+                print(f"[RateLimiter] Using in-process bucket: {e}")
+            limiter = LLMRateLimiter(
+                name,
+                rpm=float(os.environ.get("LLM_RATE_RPM", "120")),
+                tpm=float(os.environ.get("LLM_RATE_TPM", "0")),
+                redis_client=redis_client,
+                max_wait=float(os.environ.get("LLM_RATE_MAX_WAIT", "300")),
+            )
+            _limiters[name] = limiter
+        return limiter
+
+
+def governed_call(name, call):
+    """
+    Runs `call()` (one LLM request) under the process semaphore and the shared
+    bucket for endpoint `name`, retrying after provider 429s.
+    """
+    import anthropic
+
+    limiter = get_rate_limiter(name)
+    retries = int(os.environ.get("LLM_RATE_429_RETRIES", "3"))
+    for attempt in range(retries + 1):
+        _semaphore.acquire()
+        try:
+            limiter.wait_for_capacity()
+            result = call()
+        except anthropic.RateLimitError:
+            # Make every process back off until the bucket refills
+            limiter.debit(0, drain=True)
+            if attempt == retries:
+                raise
+            print(f"[RateLimiter] Provider returned 429, requeueing ({attempt + 1}).")
+            continue
+        finally:
+            _semaphore.release()
+        limiter.debit(_usage_tokens(result))
+        return result
+
+
+async def agoverned_call(name, call):
+    """Async counterpart of `governed_call()`; `call` returns an awaitable."""
+    import anthropic
+
+    limiter = get_rate_limiter(name)
+    retries = int(os.environ.get("LLM_RATE_429_RETRIES", "3"))
+    for attempt in range(retries + 1):
+        await _semaphore.acquire_async()
+        try:
+            await asyncio.to_thread(limiter.wait_for_capacity)
+            result = await call()
+        except anthropic.RateLimitError:
+            limiter.debit(0, drain=True)
+            if attempt == retries:
+                raise
+            print(f"[RateLimiter] Provider returned 429, requeueing ({attempt + 1}).")
+            continue
+        finally:
+            _semaphore.release()
+        limiter.debit(_usage_tokens(result))
+        return result
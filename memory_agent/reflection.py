@@ -1,22 +1,69 @@
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, Field
 from team_structure import get_llm
 from memory_tools import save_memory
 from tools.graph_tools import add_graph_node, add_graph_edge
-import json
+
+
+# Threads checkpointed before the watermark existed only get their tail reflected
+LEGACY_REFLECTION_WINDOW = 10
+
+
+def get_unreflected_messages(state, floor=0):
+    """
+    Returns (start_index, messages) for the part of the conversation that has not
+    been reflected yet, according to the `reflection_watermark` in the state.
+    `floor` lets callers skip a prefix that was reflected out of band (idle flush).
+    """
+    messages = state.get("messages", [])
+    watermark = state.get("reflection_watermark")
+    if watermark is None:
+        watermark = max(0, len(messages) - LEGACY_REFLECTION_WINDOW)
+    watermark = max(watermark, floor)
+    # Guard against a watermark from a different (shorter) history
+    watermark = min(watermark, len(messages))
+
+    # Our own status messages are not conversation content
+    new_messages = [
+        msg for msg in messages[watermark:] if not isinstance(msg, SystemMessage)
+    ]
+    return watermark, new_messages
 
 
 def reflect_on_conversation(state):
     """
     Analyzes the conversation history to extract episodic memories and knowledge graph updates.
+
+    Only messages added since the previous reflection (tracked by `reflection_watermark`)
+    are analyzed, and the LLM is not called at all when there is nothing new.
     """
     messages = state.get("messages", [])
     if not messages:
         return {}
 
-    # Extract text content from messages
+    _, new_messages = get_unreflected_messages(state)
+    if not new_messages:
+        print("[Reflection] Nothing new since last reflection, skipping.")
+        return {"reflection_watermark": len(messages)}
+
+    try:
+        reflect_on_messages(new_messages)
+    except Exception as e:
+        print(f"[Reflection] Error: {e}")
+        return {}
+
+    # The status message below is appended too, so move the watermark past it
+    return {
+        "messages": [SystemMessage(content=f"[System] Episodic memory updated.")],
+        "reflection_watermark": len(messages) + 1,
+    }
+
+
+def format_conversation(messages):
+    """Renders messages as a plain 'User:/Agent:' transcript for the reflection prompt."""
     conversation_text = ""
-    for msg in messages[-10:]:  # Analyze last 10 messages to keep it focused
+    for msg in messages:
         role = "User" if isinstance(msg, HumanMessage) else "Agent"
         content = msg.content
         if isinstance(content, list):
@@ -29,80 +76,123 @@ def reflect_on_conversation(state):
             )
         conversation_text += f"{role}: {content}\n"
 
-    llm = get_llm()
+    return conversation_text
+
+
+class ReflectionSummary(BaseModel):
+    """Summary of a conversation snippet for the agent's semantic memory."""
+
+    summary: str = Field(
+        description="A concise summary of what was achieved or discussed."
+    )
+
 
-    # Prompt for reflection
-    prompt = ChatPromptTemplate.from_template("""
-    You are the "Subconscious Memory" of an AI agent. 
-    Analyze the following conversation snippet and extract:
-    1. A concise summary of what was achieved or discussed (for Semantic Memory).
-    2. Key entities (Projects, Tools, Concepts) and their types (for Knowledge Graph).
-    3. Relationships between these entities (for Knowledge Graph).
+SUMMARY_PROMPT = ChatPromptTemplate.from_template("""
+    You are the "Subconscious Memory" of an AI agent.
+    Write a concise summary of what was achieved or discussed in the following
+    conversation snippet, for long-term Semantic Memory.
 
     Conversation:
     {conversation}
-
-    Output JSON format:
-    {{
-        "summary": "...",
-        "entities": [{{"name": "...", "type": "..."}}],
-        "relationships": [{{"from": "...", "to": "...", "type": "..."}}]
-    }}
     """)
 
-    chain = prompt | llm
 
-    try:
-        response = chain.invoke({"conversation": conversation_text})
-        content = response.content
+def resolve_entities(entities, relationships):
+    """
+    Maps extracted names onto the canonical entities in the index, so that spelling
+    variants within one reflection (and against the existing graph) collapse into
+    a single node. Does not change the index.
+    """
+    from entity_index import get_entity_index
+
+    index = get_entity_index()
+    labels = index.known_entities()
+    canonical_names = {}
+    resolved_entities = []
+    for entity in entities:
+        canonical = index.lookup(entity["name"]) or entity["name"]
+        if canonical not in canonical_names.values():
+            resolved_entities.append(
+                {"name": canonical, "type": labels.get(canonical, entity["type"])}
+            )
+        canonical_names[entity["name"]] = canonical
+
+    resolved_relationships = []
+    for rel in relationships:
+        resolved = {
+            "from": canonical_names.get(rel["from"], rel["from"]),
+            "to": canonical_names.get(rel["to"], rel["to"]),
+            "type": rel["type"],
+        }
+        if resolved["from"] != resolved["to"] and resolved not in resolved_relationships:
+            resolved_relationships.append(resolved)
 
-        # Handle list content (MiniMax/Anthropic sometimes returns list of blocks)
-        if isinstance(content, list):
-            text_content = ""
-            for block in content:
-                if isinstance(block, dict) and block.get("type") == "text":
-                    text_content += block.get("text", "")
-                elif isinstance(block, str):
-                    text_content += block
-            content = text_content
-
-        # Parse JSON (handle potential markdown wrapping)
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-
-        data = json.loads(content)
-
-        # 1. Save Summary to Semantic Memory
-        summary = data.get("summary")
-        if summary:
-            print(f"[Reflection] Saving summary: {summary}")
-            save_memory.invoke({"content": summary})
-
-        # 2. Update Knowledge Graph
-        for entity in data.get("entities", []):
+    return resolved_entities, resolved_relationships
+
+
+def reflect_on_messages(messages, progress=None):
+    """
+    Reflects on `messages` in two tiers and writes the results to the knowledge graph
+    and semantic memory. Raises on failure so that callers can retry.
+
+    1. Entities and relationships are extracted locally (pattern rules plus the
+       entities already known to the graph), without an LLM call.
+    2. The LLM only writes the summary, through schema-constrained structured output.
+
+    `progress` is a dict the caller keeps across retries of the same reflection.
+    Completed stages are recorded in it (graph writes done, the generated summary),
+    so a retry only re-runs the stage that failed.
+    """
+    from entity_extraction import extract_entities
+
+    if progress is None:
+        progress = {}
+    conversation_text = format_conversation(messages)
+
+    # Tier 1: local extraction -> Knowledge Graph
+    entities, relationships = extract_entities(conversation_text)
+
+    if not progress.get("graph_done"):
+        # Each spelling is written as extracted: add_graph_node merges it into its
+        # canonical node, records it as an alias and indexes it once the write succeeded
+        written = set()
+        for entity in entities:
+            if entity["name"] in written:
+                continue
+            written.add(entity["name"])
             print(f"[Reflection] Adding node: {entity}")
-            # Map to correct tool arguments: name, label, properties
             add_graph_node.invoke(
                 {"name": entity["name"], "label": entity["type"], "properties": "{}"}
             )
 
-        for rel in data.get("relationships", []):
+    entities, relationships = resolve_entities(entities, relationships)
+
+    if not progress.get("graph_done"):
+        for rel in relationships:
             print(f"[Reflection] Adding edge: {rel}")
-            # Map to correct tool arguments: from_node, to_node, relation_type
             add_graph_edge.invoke(
-                {
-                    "from_node": rel["from"],
-                    "to_node": rel["to"],
-                    "relation_type": rel["type"],
-                }
+                {"from_name": rel["from"], "relation": rel["type"], "to_name": rel["to"]}
             )
-
-        return {
-            "messages": [SystemMessage(content=f"[System] Episodic memory updated.")]
-        }
-
-    except Exception as e:
-        print(f"[Reflection] Error: {e}")
-        return {}
+        progress["graph_done"] = True
+    else:
+        print("[Reflection] Graph already updated by an earlier attempt.")
+
+    # Tier 2: LLM summary -> Semantic Memory
+    if "summary" in progress:
+        summary = progress["summary"]
+    else:
+        chain = SUMMARY_PROMPT | get_llm("Reflection").with_structured_output(
+            ReflectionSummary
+        )
+        result = chain.invoke({"conversation": conversation_text})
+        summary = result.summary if result else None
+        progress["summary"] = summary
+
+    if summary and not progress.get("summary_saved"):
+        print(f"[Reflection] Saving summary: {summary}")
+        saved = save_memory.invoke({"content": summary})
+        if saved.startswith("Failed"):
+            raise RuntimeError(saved)
+        progress["summary_saved"] = True
+
+    return {"summary": summary, "entities": entities, "relationships": relationships}
@@ -0,0 +1,73 @@
+import os
+from dataclasses import dataclass
+
+from langchain_core.messages import HumanMessage
+
+from message_utils import message_text
+
+# Rough chars-per-token ratio, good enough for a trigger threshold
+CHARS_PER_TOKEN = 4
+
+
+def count_user_turns(messages):
+    """Counts real user turns, ignoring the injected '[SYSTEM: ...]' context blocks."""
+    return sum(
+        1
+        for msg in messages
+        if isinstance(msg, HumanMessage) and not message_text(msg).startswith("[SYSTEM:")
+    )
+
+
+def estimate_tokens(messages):
+    return sum(len(message_text(msg)) for msg in messages) // CHARS_PER_TOKEN
+
+
+@dataclass
+class ReflectionTriggerPolicy:
+    """
+    Decides whether a FINISH should pay for a reflection.
+
+    A reflection fires as soon as any enabled trigger is met; a value of 0 disables
+    the corresponding trigger. Deferred messages stay below the watermark and are
+    picked up by the next reflection, or by the idle flush after `idle_timeout_seconds`.
+    """
+
+    every_n_turns: int = 3
+    min_tokens: int = 1500
+    on_tool_results: bool = True
+    idle_timeout_seconds: float = 300.0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            every_n_turns=int(os.environ.get("REFLECTION_EVERY_N_TURNS", "3")),
+            min_tokens=int(os.environ.get("REFLECTION_MIN_TOKENS", "1500")),
+            on_tool_results=os.environ.get("REFLECTION_ON_TOOL_RESULTS", "true").lower()
+            in ("1", "true", "yes"),
+            idle_timeout_seconds=float(
+                os.environ.get("REFLECTION_IDLE_TIMEOUT", "300")
+            ),
+        )
+
+    def trigger_reason(self, new_messages, tool_results=0):
+        """Returns the name of the first trigger that fires, or None."""
+        if not new_messages:
+            return None
+        if self.every_n_turns and count_user_turns(new_messages) >= self.every_n_turns:
+            return f"{self.every_n_turns} turns"
+        if self.min_tokens and estimate_tokens(new_messages) >= self.min_tokens:
+            return f"{self.min_tokens}+ tokens"
+        if self.on_tool_results and tool_results > 0:
+            return f"{tool_results} new tool result(s)"
+        return None
+
+
+# Global instance
+_policy = None
+
+
+def get_reflection_policy():
+    global _policy
+    if _policy is None:
+        _policy = ReflectionTriggerPolicy.from_env()
+    return _policy
@@ -0,0 +1,420 @@
+import asyncio
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+# Add current directory to sys.path to ensure local modules are found
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# REFLECTION_MODE: "background" (default) enqueues a job and returns immediately,
+# "inline" runs the reflection inside the graph like before.
+# REFLECTION_BACKEND: "local" runs jobs on an in-process worker pool,
+# "nats" publishes them for `python reflection_worker.py` processes to pick up.
+REFLECTION_SUBJECT = os.environ.get("REFLECTION_JOB_SUBJECT", "agent.reflection.jobs")
+REFLECTION_QUEUE_GROUP = "reflection-workers"
+
+
+@dataclass
+class ReflectionJob:
+    """A unit of reflection work: messages [start, end) of one thread."""
+
+    thread_id: str
+    start: int
+    end: int
+    job_id: str = field(default_factory=lambda: f"refl-{uuid.uuid4().hex[:12]}")
+    enqueued_at: float = field(default_factory=time.time)
+    attempts: int = 0
+    # Stages finished by earlier attempts (see reflection.reflect_on_messages)
+    progress: dict = field(default_factory=dict)
+
+    def to_json(self):
+        return json.dumps(
+            {
+                "thread_id": self.thread_id,
+                "start": self.start,
+                "end": self.end,
+                "job_id": self.job_id,
+                "enqueued_at": self.enqueued_at,
+                "attempts": self.attempts,
+                "progress": self.progress,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, payload):
+        return cls(**json.loads(payload))
+
+
+def get_reflection_mode():
+    return os.environ.get("REFLECTION_MODE", "background").lower()
+
+
+def load_thread_messages(checkpointer, thread_id, start, end):
+    """Loads messages [start, end) of a thread from its latest checkpoint."""
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    checkpoint_tuple = checkpointer.get_tuple(config)
+    if checkpoint_tuple is None:
+        raise ValueError(f"No checkpoint found for thread {thread_id}")
+    from langchain_core.messages import SystemMessage
+
+    messages = checkpoint_tuple.checkpoint["channel_values"].get("messages", [])
+    if len(messages) < end:
+        # The turn's checkpoint is not written yet (e.g. CHECKPOINT_DURABILITY=turn
+        # writes it when the run ends); fail so the pool retries the job later
+        raise ValueError(
+            f"Checkpoint of thread {thread_id} has {len(messages)} messages, "
+            f"job needs [{start}:{end}]"
+        )
+    return [msg for msg in messages[start:end] if not isinstance(msg, SystemMessage)]
+
+
+class ReflectionWorkerPool:
+    """
+    In-process worker pool for reflection jobs.
+
+    Failed jobs are retried with exponential backoff up to `max_retries` times,
+    after which they are kept in `dead_letters`. The lag of each job (time between
+    enqueueing and the start of processing) is tracked for `stats()`.
+    """
+
+    def __init__(
+        self, message_loader=None, workers=2, max_retries=3, retry_backoff=2.0
+    ):
+        self.message_loader = message_loader
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letters = []
+
+        self._queue = queue.Queue()
+        self._snapshots = {}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "completed": 0,
+            "retried": 0,
+            "failed": 0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+            "total_lag_seconds": 0.0,
+        }
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(
+                    target=self._run, name=f"reflection-worker-{i}", daemon=True
+                )
+                t.start()
+                self._threads.append(t)
+        print(f"[ReflectionWorker] Started {self.workers} worker(s).")
+
+    def submit(self, job, messages=None):
+        """
+        Queues a job. `messages` is an optional snapshot of the job's message range;
+        without it the worker loads the range through `message_loader`.
+        """
+        self.start()
+        if messages is not None:
+            self._snapshots[job.job_id] = messages
+        with self._lock:
+            self._stats["enqueued"] += 1
+        self._queue.put(job)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        processed = stats["completed"] + stats["failed"]
+        stats["avg_lag_seconds"] = (
+            stats.pop("total_lag_seconds") / processed if processed else 0.0
+        )
+        stats["queue_depth"] = self._queue.qsize()
+        stats["dead_letters"] = len(self.dead_letters)
+        return stats
+
+    def drain(self, timeout=None):
+        """
+        Waits until every queued job (including scheduled retries) is done.
+        Returns False if `timeout` seconds passed first.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            retry_delay = None
+            try:
+                retry_delay = self._process(job)
+            finally:
+                if retry_delay is None:
+                    self._queue.task_done()
+                else:
+                    # The attempt stays outstanding (for join) until the job is re-queued
+                    timer = threading.Timer(retry_delay, self._requeue, args=(job,))
+                    timer.daemon = True
+                    timer.start()
+
+    def _requeue(self, job):
+        self._queue.put(job)
+        self._queue.task_done()
+
+    def _process(self, job):
+        """Runs one attempt of a job. Returns a retry delay if it should be retried."""
+        lag = time.time() - job.enqueued_at
+        with self._lock:
+            self._stats["last_lag_seconds"] = lag
+            self._stats["max_lag_seconds"] = max(self._stats["max_lag_seconds"], lag)
+
+        job.attempts += 1
+        print(
+            f"[ReflectionWorker] Job {job.job_id} ({job.thread_id} [{job.start}:{job.end}]) "
+            f"attempt {job.attempts}, lag {lag:.2f}s"
+        )
+
+        try:
+            messages = self._snapshots.get(job.job_id)
+            if messages is None:
+                if self.message_loader is None:
+                    raise ValueError("No message snapshot or loader for job")
+                messages = self.message_loader(job.thread_id, job.start, job.end)
+            if messages:
+                from reflection import reflect_on_messages
+
+                reflect_on_messages(messages, progress=job.progress)
+        except Exception as e:
+            if job.attempts <= self.max_retries:
+                delay = self.retry_backoff ** job.attempts
+                print(
+                    f"[ReflectionWorker] Job {job.job_id} failed ({e}), retrying in {delay:.1f}s"
+                )
+                with self._lock:
+                    self._stats["retried"] += 1
+                return delay
+
+            print(f"[ReflectionWorker] Job {job.job_id} failed permanently: {e}")
+            self.dead_letters.append({"job": job, "error": str(e)})
+            with self._lock:
+                self._stats["failed"] += 1
+                self._stats["total_lag_seconds"] += lag
+            self._snapshots.pop(job.job_id, None)
+            return
+
+        with self._lock:
+            self._stats["completed"] += 1
+            self._stats["total_lag_seconds"] += lag
+        self._snapshots.pop(job.job_id, None)
+
+
+# Global instance
+_worker_pool = None
+
+
+def get_reflection_pool(message_loader=None):
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = ReflectionWorkerPool(
+            message_loader=message_loader,
+            workers=int(os.environ.get("REFLECTION_WORKERS", "2")),
+            max_retries=int(os.environ.get("REFLECTION_MAX_RETRIES", "3")),
+            retry_backoff=float(os.environ.get("REFLECTION_RETRY_BACKOFF", "2.0")),
+        )
+    elif message_loader is not None and _worker_pool.message_loader is None:
+        _worker_pool.message_loader = message_loader
+    return _worker_pool
+
+
+def drain_reflections(timeout=30):
+    """Gives pending background reflections a chance to finish before shutdown."""
+    if _worker_pool is None:
+        return True
+    return _worker_pool.drain(timeout=timeout)
+
+
+def get_reflection_stats():
+    """Returns worker pool counters, queue depth and job lag (seconds)."""
+    if _worker_pool is None:
+        return {}
+    return _worker_pool.stats()
+
+
+async def _publish_job(job):
+    import nats
+
+    nc = await nats.connect(
+        servers=[os.environ.get("NATS_URL", "nats://localhost:4222")],
+        user=os.environ.get("NATS_USER"),
+        password=os.environ.get("NATS_PASSWORD"),
+        connect_timeout=5,
+    )
+    try:
+        await nc.publish(REFLECTION_SUBJECT, job.to_json().encode())
+        await nc.flush()
+    finally:
+        await nc.close()
+
+
+def _run_coroutine(coro):
+    """Runs a coroutine to completion, even when called from inside an event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def enqueue_reflection(thread_id, start, end, messages=None):
+    """
+    Enqueues reflection of messages [start, end) of `thread_id` and returns the job.
+    The turn does not wait for the reflection itself.
+    """
+    job = ReflectionJob(thread_id=thread_id, start=start, end=end)
+    backend = os.environ.get("REFLECTION_BACKEND", "local").lower()
+
+    if backend == "nats":
+        try:
+            _run_coroutine(_publish_job(job))
+            print(f"[Reflection] Published job {job.job_id} to {REFLECTION_SUBJECT}")
+            return job
+        except Exception as e:
+            print(f"[Reflection] NATS publish failed ({e}), using local worker pool")
+
+    get_reflection_pool().submit(job, messages=messages)
+    return job
+
+
+# Idle flush bookkeeping (per thread, in-process)
+_idle_lock = threading.Lock()
+_idle_timers = {}
+_idle_flushed_upto = {}
+
+
+def schedule_idle_reflection(thread_id, start, end, messages, timeout):
+    """
+    (Re)arms a timer that reflects messages [start, end) if the thread stays idle
+    for `timeout` seconds. A newer turn re-arms the timer with a wider range.
+    """
+    cancel_idle_reflection(thread_id)
+
+    def flush():
+        with _idle_lock:
+            if _idle_timers.get(thread_id) is not timer:
+                return
+            del _idle_timers[thread_id]
+            _idle_flushed_upto[thread_id] = max(
+                end, _idle_flushed_upto.get(thread_id, 0)
+            )
+        print(f"[Reflection] Thread {thread_id} idle, flushing [{start}:{end}]")
+        enqueue_reflection(thread_id, start, end, messages=messages)
+
+    timer = threading.Timer(timeout, flush)
+    timer.daemon = True
+    with _idle_lock:
+        _idle_timers[thread_id] = timer
+    timer.start()
+
+
+def cancel_idle_reflection(thread_id):
+    with _idle_lock:
+        timer = _idle_timers.pop(thread_id, None)
+    if timer is not None:
+        timer.cancel()
+
+
+def schedule_reflection(state, thread_id):
+    """
+    Graph-node entry point for reflection. Applies the trigger policy, then either
+    defers (arming the idle flush), reflects inline, or enqueues a background job.
+    Returns the state update.
+    """
+    from reflection import get_unreflected_messages, reflect_on_conversation
+    from reflection_policy import get_reflection_policy
+
+    messages = state.get("messages", [])
+    with _idle_lock:
+        flushed_upto = _idle_flushed_upto.get(thread_id, 0)
+    start, new_messages = get_unreflected_messages(state, floor=flushed_upto)
+    if not new_messages:
+        return {"reflection_watermark": len(messages)}
+
+    policy = get_reflection_policy()
+    reason = policy.trigger_reason(
+        new_messages, state.get("tool_results_since_reflection", 0)
+    )
+    if reason is None:
+        if policy.idle_timeout_seconds > 0:
+            schedule_idle_reflection(
+                thread_id, start, len(messages), new_messages, policy.idle_timeout_seconds
+            )
+        print("[Reflection] No trigger fired, deferring.")
+        return {}
+
+    cancel_idle_reflection(thread_id)
+    print(f"[Reflection] Triggered by {reason}.")
+
+    if get_reflection_mode() == "inline":
+        update = reflect_on_conversation({**state, "reflection_watermark": start})
+        if update:
+            update["tool_results_since_reflection"] = 0
+        return update
+
+    # Reflection runs on a worker so the turn can reach END immediately
+    job = enqueue_reflection(thread_id, start, len(messages), messages=new_messages)
+    print(f"[Reflection] Enqueued job {job.job_id} for messages [{start}:{len(messages)}]")
+    return {"reflection_watermark": len(messages), "tool_results_since_reflection": 0}
+
+
+async def run_nats_worker():
+    """Consumes reflection jobs from NATS and processes them on a local pool."""
+    import nats
+    from agent import load_secrets, get_postgres_connection_string
+    from checkpointer import get_checkpointer
+
+    load_secrets()
+    saver = get_checkpointer(get_postgres_connection_string())
+    pool = get_reflection_pool(
+        message_loader=lambda thread_id, start, end: load_thread_messages(
+            saver, thread_id, start, end
+        )
+    )
+    pool.start()
+
+    nc = await nats.connect(
+        servers=[os.environ.get("NATS_URL", "nats://localhost:4222")],
+        user=os.environ.get("NATS_USER"),
+        password=os.environ.get("NATS_PASSWORD"),
+        connect_timeout=5,
+    )
+
+    async def handle(msg):
+        pool.submit(ReflectionJob.from_json(msg.data.decode()))
+
+    await nc.subscribe(REFLECTION_SUBJECT, queue=REFLECTION_QUEUE_GROUP, cb=handle)
+    print(f"[ReflectionWorker] Listening on '{REFLECTION_SUBJECT}'")
+
+    try:
+        while True:
+            await asyncio.sleep(60)
+            print(f"[ReflectionWorker] Stats: {pool.stats()}")
+    finally:
+        await nc.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_nats_worker())
@@ -0,0 +1,145 @@
+import difflib
+import os
+import time
+from dataclasses import dataclass
+
+from langchain_core.messages import AIMessage
+
+from message_utils import message_text
+
+# Guards the Supervisor's routing within one user turn. It tracks which agents were
+# visited, stops repeated routing cycles (e.g. Coder -> Reviewer -> Coder -> ...),
+# agents repeating themselves without progress, and enforces an LLM-call and
+# wall-clock budget. When tripped, the turn ends with a summarized FINISH.
+
+# Outputs at least this similar to an earlier output of the same turn count as no progress
+NO_PROGRESS_SIMILARITY = 0.95
+
+
+@dataclass
+class TurnBudget:
+    """Per-turn limits for the Supervisor; a value of 0 disables that limit."""
+
+    max_agent_visits: int = 12
+    max_llm_calls: int = 40
+    max_wall_clock_seconds: float = 600.0
+    max_cycle_repeats: int = 3
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_agent_visits=int(os.environ.get("TURN_MAX_AGENT_VISITS", "12")),
+            max_llm_calls=int(os.environ.get("TURN_MAX_LLM_CALLS", "40")),
+            max_wall_clock_seconds=float(os.environ.get("TURN_MAX_SECONDS", "600")),
+            max_cycle_repeats=int(os.environ.get("TURN_MAX_CYCLE_REPEATS", "3")),
+        )
+
+
+def start_turn(messages):
+    """State update that resets the per-turn bookkeeping at the start of a user turn."""
+    return {
+        "turn_start_index": max(0, len(messages) - 1),
+        "turn_started_at": time.time(),
+        "turn_route_history": [],
+        "turn_llm_calls": 0,
+    }
+
+
+def detect_cycle(route_history, max_repeats, max_period=3):
+    """
+    Returns the repeating routing pattern (e.g. ["Coder", "Reviewer"]) if the tail of
+    `route_history` is that pattern repeated `max_repeats` times, else None.
+    """
+    if max_repeats < 2:
+        return None
+    for period in range(1, max_period + 1):
+        window = period * max_repeats
+        if len(route_history) < window:
+            break
+        tail = route_history[-window:]
+        pattern = tail[:period]
+        if all(tail[i] == pattern[i % period] for i in range(window)):
+            return pattern
+    return None
+
+
+def _text(msg):
+    return " ".join(message_text(msg).lower().split())
+
+
+def detect_no_progress(turn_messages):
+    """True if the latest agent output (nearly) repeats an earlier one from this turn."""
+    outputs = [_text(m) for m in turn_messages if isinstance(m, AIMessage)]
+    if len(outputs) < 2 or not outputs[-1]:
+        return False
+    latest = outputs[-1]
+    for earlier in outputs[:-1]:
+        if earlier == latest:
+            return True
+        matcher = difflib.SequenceMatcher(None, earlier, latest)
+        if (
+            matcher.real_quick_ratio() >= NO_PROGRESS_SIMILARITY
+            and matcher.ratio() >= NO_PROGRESS_SIMILARITY
+        ):
+            return True
+    return False
+
+
+def check_turn(state, next_agent, budget):
+    """
+    Returns a human-readable reason to stop the turn before routing to `next_agent`,
+    or None if routing may continue.
+    """
+    history = list(state.get("turn_route_history") or []) + [next_agent]
+    messages = state.get("messages", [])
+    turn_messages = messages[state.get("turn_start_index", 0) :]
+
+    if budget.max_agent_visits and len(history) > budget.max_agent_visits:
+        return f"agent visit budget of {budget.max_agent_visits} exhausted"
+    if budget.max_llm_calls and state.get("turn_llm_calls", 0) >= budget.max_llm_calls:
+        return f"LLM call budget of {budget.max_llm_calls} exhausted"
+    started_at = state.get("turn_started_at")
+    if (
+        budget.max_wall_clock_seconds
+        and started_at
+        and time.time() - started_at >= budget.max_wall_clock_seconds
+    ):
+        return f"wall-clock budget of {budget.max_wall_clock_seconds:.0f}s exhausted"
+    cycle = detect_cycle(history, budget.max_cycle_repeats)
+    if cycle:
+        return f"routing cycle {' -> '.join(cycle)} repeated {budget.max_cycle_repeats} times"
+    if detect_no_progress(turn_messages):
+        return "agents are repeating themselves without progress"
+    return None
+
+
+def summarize_turn(state, reason):
+    """
+    Builds the closing message for a stopped turn. Uses the Supervisor model when
+    available and falls back to the latest agent output.
+    """
+    messages = state.get("messages", [])
+    turn_messages = messages[state.get("turn_start_index", 0) :]
+    outputs = [message_text(m) for m in turn_messages if isinstance(m, AIMessage)]
+    route = " -> ".join(state.get("turn_route_history") or []) or "none"
+
+    try:
+        from team_structure import get_llm
+
+        response = get_llm("Supervisor").invoke(
+            "The agent team stopped working on this request because the "
+            f"{reason}. Route taken: {route}.\n"
+            "Summarize for the user, in a few sentences, what was accomplished, "
+            "what is still open, and what they could do next.\n\n"
+            "Agent outputs this turn:\n" + "\n---\n".join(o[:1500] for o in outputs[-6:])
+        )
+        summary = message_text(response)
+    except Exception as e:
+        print(f"[RoutingGuard] Summary failed: {e}")
+        last = outputs[-1][:1000] if outputs else "No agent output."
+        summary = f"Last agent output:\n{last}"
+
+    return AIMessage(
+        content=f"[Turn stopped: {reason}. Route: {route}]\n\n{summary}",
+        name="Supervisor",
+    )
@@ -0,0 +1,175 @@
+import copy
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+# Request coalescing ("singleflight").
+# When several sessions issue the same LLM prompt (e.g. the reflection prompt over
+# the same window) or the same cacheable tool call at the same time, they all miss
+# the cache and all pay for the call. Here the first caller for a key runs the
+# call and concurrent duplicates wait for its result:
+#   - in-process, duplicates block on the running call and share its result;
+#   - across processes (LLM calls only), the first caller takes a Dragonfly lock
+#     and the others poll the shared LLM cache (without counting hits/misses)
+#     until the result lands there or the lock disappears, then fall back to
+#     making the call themselves.
+#
+# Settings (environment):
+#   LLM_SINGLEFLIGHT            - "true" (default) to coalesce LLM calls
+#   LLM_SINGLEFLIGHT_LOCK_TTL   - max seconds the Dragonfly lock is held (default 120)
+#   LLM_SINGLEFLIGHT_WAIT       - seconds to wait for another process (default 120)
+
+LOCK_KEY_PREFIX = "llmflight:"
+POLL_INTERVAL_SECONDS = 0.25
+
+# Deletes the lock only if it still holds our token
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.duplicates = 0
+
+
+class SingleFlight:
+    """In-process coalescing of concurrent calls with the same key."""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Runs `fn()` once per key at a time; concurrent callers share its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.duplicates += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.duplicates:
+                print(
+                    f"[SingleFlight] {self.name}: "
+                    f"{call.duplicates} duplicate(s) coalesced"
+                )
+
+
+def distributed_do(redis_client, key, fn, lookup):
+    """
+    Cross-process singleflight: runs `fn()` under a Dragonfly lock, or waits for
+    the lock holder's result via `lookup()` (None until it is available).
+    """
+    lock_key = LOCK_KEY_PREFIX + key
+    token = uuid.uuid4().hex
+    lock_ttl = float(os.environ.get("LLM_SINGLEFLIGHT_LOCK_TTL", "120"))
+    try:
+        acquired = redis_client.set(lock_key, token, nx=True, px=int(lock_ttl * 1000))
+    except Exception as e:
+        print(f"[SingleFlight] Lock unavailable, calling directly: {e}")
+        return fn()
+
+    if acquired:
+        try:
+            return fn()
+        finally:
+            try:
+                redis_client.eval(RELEASE_SCRIPT, 1, lock_key, token)
+            except Exception as e:
+                print(f"[SingleFlight] Could not release lock: {e}")
+
+    deadline = time.time() + float(os.environ.get("LLM_SINGLEFLIGHT_WAIT", "120"))
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL_SECONDS)
+        result = lookup()
+        if result is not None:
+            print("[SingleFlight] Served result of a duplicate call in another process")
+            return result
+        if not redis_client.exists(lock_key):
+            # The holder finished; its result is cached right after the call returns
+            time.sleep(POLL_INTERVAL_SECONDS)
+            result = lookup()
+            if result is not None:
+                return result
+            # It failed or was not cacheable: do the call ourselves
+            break
+    return fn()
+
+
+_llm_flight = SingleFlight("LLM")
+_tool_flight = SingleFlight("Tools")
+
+
+def get_tool_flight():
+    return _tool_flight
+
+
+def coalesce_llm_call(llm, messages, stop, kwargs, generate):
+    """
+    Runs `generate()` (a chat model's uncached generation) with duplicates of the
+    same prompt and model configuration coalesced, in-process and across processes.
+    """
+    if os.environ.get("LLM_SINGLEFLIGHT", "true").lower() not in ("1", "true", "yes"):
+        return generate()
+
+    from langchain_core.globals import get_llm_cache
+    from langchain_core.load import dumps
+    from langchain_core.outputs import ChatResult
+
+    # Same key derivation as the LLM cache (message ids do not count)
+    llm_string = llm._get_llm_string(stop=stop, **kwargs)
+    prompt = dumps(
+        [
+            msg.model_copy(update={"id": None}) if getattr(msg, "id", None) else msg
+            for msg in messages
+        ]
+    )
+    key = hashlib.sha256(f"{prompt}\0{llm_string}".encode()).hexdigest()
+
+    from cache_tools import get_cache_redis
+
+    redis_client = get_cache_redis()
+    llm_cache = get_llm_cache()
+    if redis_client is None or llm_cache is None:
+        return _llm_flight.do(key, generate)
+
+    # Polling must not count as cache misses; caches without `peek` have no stats
+    peek = getattr(llm_cache, "peek", llm_cache.lookup)
+
+    def lookup():
+        generations = peek(prompt, llm_string)
+        return ChatResult(generations=generations) if generations else None
+
+    return _llm_flight.do(
+        key, lambda: distributed_do(redis_client, key, generate, lookup)
+    )
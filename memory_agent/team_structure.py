@@ -2,48 +2,121 @@ import operator
 from typing import Annotated, List, TypedDict
 import os
 
-from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, StateGraph, START
 from langgraph.prebuilt import create_react_agent
 
-from tools.research_tools import get_research_tools
-from tools.code_tools import get_code_tools
-from tools.file_tools import get_file_tools
-from tools.git_tools import get_git_tools
 from tools.meta_tools import get_meta_tools
-from tools.infra_tools import get_infra_tools
-from tools.graph_tools import get_graph_tools
-from tools.mongo_tools import get_mongo_tools
-from memory_tools import save_memory, recall_memory
+from tools.output_tools import get_output_tools
+from tool_registry import get_tools
+from llm_clients import get_chat_model
+from routing_guard import TurnBudget, check_turn, start_turn, summarize_turn
+from history_manager import compact_history, history_view
+from message_views import role_view
+from tool_retriever import with_tool_selection
+from tool_executor import concurrent_tools
+from tool_cache import get_tool_cache
+from prompt_cache import cached_prompt, record_cache_usage
 
 
 # Define the state of the team
 class TeamState(TypedDict):
     messages: Annotated[List[BaseMessage], operator.add]
     next_agent: str
-
-
-def get_llm():
-    model_name = os.environ.get("MiniMax_M2_MODEL", "minimax-m2")
-    base_url = os.environ.get("MiniMax_M2_BASE_URL", "https://api.minimax.io/anthropic")
+    # Index into `messages` up to which the conversation has already been reflected
+    reflection_watermark: int
+    # Tool results produced by sub-agents since the last reflection (trigger policy input)
+    tool_results_since_reflection: int
+    # Per-turn routing guard bookkeeping (reset by ContextRetriever, see routing_guard.py)
+    turn_start_index: int
+    turn_started_at: float
+    turn_route_history: List[str]
+    turn_llm_calls: int
+    # Rolling summary of messages[:history_summary_upto] (see history_manager.py)
+    history_summary: str
+    history_summary_upto: int
+
+
+# Roles that make their own LLM calls. Each can be routed to its own model chain:
+#   LLM_MODEL_<ROLE>        - comma-separated models, primary first, e.g. "m2-lite,minimax-m2"
+#   LLM_BASE_URL_<ROLE>     - endpoint override for that role
+#   LLM_TEMPERATURE_<ROLE>  - temperature override for that role
+#   LLM_FALLBACK_MODELS     - fallbacks appended to every chain
+LLM_ROLES = (
+    "Planner",
+    "Coder",
+    "Reviewer",
+    "Reflection",
+    "Supervisor",
+    "Summarizer",
+)
+
+
+def get_model_chain(role=None):
+    """Returns the model names for `role`, primary first, followed by its fallbacks."""
+    chain = None
+    if role:
+        chain = os.environ.get(f"LLM_MODEL_{role.upper()}")
+    if not chain:
+        chain = os.environ.get("MiniMax_M2_MODEL", "minimax-m2")
+    models = [m.strip() for m in chain.split(",") if m.strip()]
+
+    for fallback in os.environ.get("LLM_FALLBACK_MODELS", "").split(","):
+        fallback = fallback.strip()
+        if fallback and fallback not in models:
+            models.append(fallback)
+    return models
+
+
+def get_llm(role=None):
+    role_key = role.upper() if role else None
+    base_url = (role_key and os.environ.get(f"LLM_BASE_URL_{role_key}")) or os.environ.get(
+        "MiniMax_M2_BASE_URL", "https://api.minimax.io/anthropic"
+    )
+    temperature = float(
+        (role_key and os.environ.get(f"LLM_TEMPERATURE_{role_key}")) or 0.7
+    )
     api_key = os.environ.get("MINIMAX_API_KEY") or os.environ.get("ANTHROPIC_API_KEY")
     if not api_key:
         # Fallback for testing if env not fully loaded
         api_key = "dummy_key_for_test"
-    return ChatAnthropic(
-        model=model_name, temperature=0.7, base_url=base_url, api_key=api_key
-    )
+
+    # Shared instances on a pooled keep-alive transport (see llm_clients.py)
+    models = [
+        get_chat_model(
+            model=model_name,
+            temperature=temperature,
+            base_url=base_url,
+            api_key=api_key,
+            cache_role=role,
+        )
+        for model_name in get_model_chain(role)
+    ]
+    if len(models) == 1:
+        return models[0]
+    return models[0].with_fallbacks(models[1:])
+
+
+# Tools every role always has bound; the rest are picked per call (see tool_retriever.py)
+CORE_TOOLS = {
+    "Planner": ("recall_memory", "save_memory", "query_graph", "read_output"),
+    "Coder": (
+        "read_file",
+        "write_file",
+        "list_directory",
+        "terminal",
+        "Python_REPL",
+        "create_tool",
+        "read_output",
+    ),
+    "Reviewer": ("read_file", "terminal", "query_graph", "read_output"),
+}
 
 
 def create_planner_agent(llm):
-    tools = (
-        get_research_tools()
-        + get_file_tools()
-        + [save_memory, recall_memory]
-        + get_graph_tools()
-        + get_mongo_tools()
-    )
+    # Tool modules are imported on first use (see tool_registry.py)
+    tools = get_tools("research", "file", "memory", "graph", "mongo") + get_output_tools()
     prompt = (
         "You are the Planner Agent. Your job is to break down complex user requests into "
         "detailed, step-by-step technical implementation plans. "
@@ -55,16 +128,17 @@ def create_planner_agent(llm):
         "Always check the Knowledge Graph for existing context before starting a new plan. "
         "Output a clear plan that the Coder Agent can follow."
     )
-    return create_react_agent(llm, tools, prompt=prompt)
+    tools = concurrent_tools(tools)  # bounded shared pool + per-tool timeouts
+    model = with_tool_selection(llm, tools, CORE_TOOLS["Planner"])
+    return create_react_agent(model, tools, prompt=cached_prompt(prompt))
 
 
 def create_coder_agent(llm):
     tools = (
-        get_code_tools()
-        + get_file_tools()
-        + get_git_tools()
+        get_tools("code", "file", "git")
         + get_meta_tools()
-        + get_infra_tools()
+        + get_tools("infra")
+        + get_output_tools()
     )
     prompt = (
         "You are the Coder Agent. Your job is to implement code based on the plan provided. "
@@ -72,13 +146,14 @@ def create_coder_agent(llm):
         "Write clean, efficient, and documented code. "
         "After implementing, verify your work."
     )
-    return create_react_agent(llm, tools, prompt=prompt)
+    tools = concurrent_tools(tools)  # bounded shared pool + per-tool timeouts
+    model = with_tool_selection(llm, tools, CORE_TOOLS["Coder"])
+    return create_react_agent(model, tools, prompt=cached_prompt(prompt))
 
 
 def create_reviewer_agent(llm):
-    tools = (
-        get_file_tools() + get_code_tools() + get_graph_tools()
-    )  # Needs to read files and maybe run tests
+    # Needs to read files and maybe run tests
+    tools = get_tools("file", "code", "graph") + get_output_tools()
     prompt = (
         "You are the Reviewer Agent. Your job is to review the code written by the Coder Agent. "
         "Check for bugs, security vulnerabilities, and adherence to the plan. "
@@ -86,30 +161,76 @@ def create_reviewer_agent(llm):
         "If you find issues, provide specific feedback to the Coder. "
         "If everything looks good, approve the changes."
     )
-    return create_react_agent(llm, tools, prompt=prompt)
+    tools = concurrent_tools(tools)  # bounded shared pool + per-tool timeouts
+    model = with_tool_selection(llm, tools, CORE_TOOLS["Reviewer"])
+    return create_react_agent(model, tools, prompt=cached_prompt(prompt))
+
+
+def agent_update(state, sent_messages, result, role):
+    """State update for a sub-agent run: its final message plus tool/LLM-call bookkeeping."""
+    new_messages = result["messages"][len(sent_messages) :]
+    tool_results = sum(1 for msg in new_messages if isinstance(msg, ToolMessage))
+    llm_calls = sum(1 for msg in new_messages if isinstance(msg, AIMessage))
+    record_cache_usage(role, new_messages)
+    # Tag the output with its author so role-scoped views can filter on it
+    final_message = result["messages"][-1]
+    if isinstance(final_message, AIMessage):
+        final_message = final_message.model_copy(update={"name": role})
+    return {
+        "messages": [final_message],
+        "tool_results_since_reflection": state.get("tool_results_since_reflection", 0)
+        + tool_results,
+        "turn_llm_calls": state.get("turn_llm_calls", 0) + llm_calls,
+    }
 
 
 def build_team_graph(checkpointer=None):
-    llm = get_llm()
+    return build_team_workflow().compile(checkpointer=checkpointer)
 
-    planner = create_planner_agent(llm)
-    coder = create_coder_agent(llm)
-    reviewer = create_reviewer_agent(llm)
+
+def build_team_workflow():
+    """Builds the (uncompiled) team StateGraph: agents, tools and routing."""
+    planner = create_planner_agent(get_llm("Planner"))
+    coder = create_coder_agent(get_llm("Coder"))
+    reviewer = create_reviewer_agent(get_llm("Reviewer"))
 
     # Define nodes
     def planner_node(state: TeamState):
-        result = planner.invoke(state)
-        return {"messages": [result["messages"][-1]]}
+        # Bounded history (rolling summary + recent turns), scoped to this role
+        sent = role_view(history_view(state), "Planner")
+        result = planner.invoke({**state, "messages": sent})
+        return agent_update(state, sent, result, "Planner")
 
     def coder_node(state: TeamState):
-        result = coder.invoke(state)
-        return {"messages": [result["messages"][-1]]}
+        # Bounded history (rolling summary + recent turns), scoped to this role
+        sent = role_view(history_view(state), "Coder")
+        result = coder.invoke({**state, "messages": sent})
+        return agent_update(state, sent, result, "Coder")
 
     def reviewer_node(state: TeamState):
-        result = reviewer.invoke(state)
-        return {"messages": [result["messages"][-1]]}
+        # Bounded history (rolling summary + recent turns), scoped to this role
+        sent = role_view(history_view(state), "Reviewer")
+        result = reviewer.invoke({**state, "messages": sent})
+        return agent_update(state, sent, result, "Reviewer")
 
     def supervisor_node(state: TeamState):
+        next_agent = choose_next_agent(state)
+        if next_agent == "FINISH":
+            return {"next_agent": "FINISH"}
+
+        # Stop loops and runaway turns before handing work to another agent
+        reason = check_turn(state, next_agent, TurnBudget.from_env())
+        if reason:
+            print(f"[Supervisor] Guard tripped ({reason}) -> Routing to FINISH")
+            return {"next_agent": "FINISH", "messages": [summarize_turn(state, reason)]}
+
+        return {
+            "next_agent": next_agent,
+            "turn_route_history": list(state.get("turn_route_history") or [])
+            + [next_agent],
+        }
+
+    def choose_next_agent(state: TeamState):
         messages = state["messages"]
         last_message = messages[-1]
 
@@ -137,26 +258,26 @@ def build_team_graph(checkpointer=None):
             and "implement" not in content
         ):
             print("[Supervisor] Routing to Coder")
-            return {"next_agent": "Coder"}
+            return "Coder"
         elif "implemented" in content or "code" in content:
             print("[Supervisor] Routing to Reviewer")
-            return {"next_agent": "Reviewer"}
+            return "Reviewer"
         elif "issue" in content or "bug" in content:
             print("[Supervisor] Routing to Coder")
-            return {"next_agent": "Coder"}
+            return "Coder"
         elif "approved" in content or "finish" in content:
             print("[Supervisor] Routing to FINISH")
-            return {"next_agent": "FINISH"}
+            return "FINISH"
         else:
             # If it's a user message, start with Planner
             if isinstance(last_message, HumanMessage):
                 print("[Supervisor] User message -> Routing to Planner")
-                return {"next_agent": "Planner"}
+                return "Planner"
             # If it's an agent message and no other condition met, return to user
             print("[Supervisor] No condition met -> Routing to FINISH")
-            return {"next_agent": "FINISH"}
+            return "FINISH"
 
-    def context_retriever_node(state: TeamState):
+    def context_retriever_node(state: TeamState, config: RunnableConfig):
         from middleware import MemoryMiddleware
 
         middleware = MemoryMiddleware()
@@ -174,6 +295,15 @@ def build_team_graph(checkpointer=None):
         if not messages:
             return {}
 
+        # A new user turn starts here: reset the routing guard's per-turn budget
+        # and fold turns that fell out of the verbatim window into the summary
+        turn = {**start_turn(messages), **compact_history(state)}
+        # Memoized tool results only live for one turn
+        tool_cache = get_tool_cache()
+        if tool_cache is not None:
+            thread_id = config.get("configurable", {}).get("thread_id", "default")
+            tool_cache.clear_scope(thread_id)
+
         last_msg = messages[-1]
         if isinstance(last_msg, HumanMessage):
             content = last_msg.content
@@ -188,17 +318,19 @@ def build_team_graph(checkpointer=None):
                 # We return a SystemMessage that will be added to the history
                 # Ideally this should be ephemeral or handled by the agent, but adding it to history works.
                 return {
+                    **turn,
                     "messages": [
                         HumanMessage(content=f"[SYSTEM: Automatic Context]\n{context}")
-                    ]
+                    ],
                 }
 
-        return {}
+        return turn
 
-    def reflection_node(state: TeamState):
-        from reflection import reflect_on_conversation
+    def reflection_node(state: TeamState, config: RunnableConfig):
+        from reflection_worker import schedule_reflection
 
-        return reflect_on_conversation(state)
+        thread_id = config.get("configurable", {}).get("thread_id", "default")
+        return schedule_reflection(state, thread_id)
 
     workflow = StateGraph(TeamState)
 
@@ -232,4 +364,4 @@ def build_team_graph(checkpointer=None):
     # Reflection -> End
     workflow.add_edge("Reflection", END)
 
-    return workflow.compile(checkpointer=checkpointer)
+    return workflow
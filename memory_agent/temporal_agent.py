@@ -39,10 +39,9 @@ async def run_agent_turn_activity(user_input: str, thread_id: str) -> str:
     This is the "Durable" part. If this crashes, Temporal retries it.
     """
     # Imports moved here to avoid Temporal Sandbox violations
-    from team_structure import build_team_graph
+    from checkpointer import get_checkpointer, get_durability
+    from graph_factory import get_team_graph
     from langchain_core.messages import HumanMessage
-    from langgraph.checkpoint.postgres import PostgresSaver
-    from psycopg_pool import ConnectionPool
 
     print(f"\n[Activity] 🤖 Processing turn for thread {thread_id}...")
 
@@ -59,12 +58,11 @@ async def run_agent_turn_activity(user_input: str, thread_id: str) -> str:
     if not DB_URI:
         return "Error: POSTGRES_CLUSTER_URLS not set."
 
-    pool = ConnectionPool(conninfo=DB_URI, max_size=20, kwargs={"autocommit": True})
-    checkpointer = PostgresSaver(pool)
-    checkpointer.setup()
+    # Pool and schema are shared by every activity in this worker process
+    checkpointer = get_checkpointer(DB_URI)
 
-    # Build Graph
-    agent_graph = build_team_graph(checkpointer=checkpointer)
+    # Build Graph (cached per worker process, rebuilt only on tool/config changes)
+    agent_graph = get_team_graph(checkpointer=checkpointer)
 
     # Config
     config = {
@@ -87,7 +85,10 @@ async def run_agent_turn_activity(user_input: str, thread_id: str) -> str:
     # Let's iterate stream to show progress in the worker logs.
 
     try:
-        for event in agent_graph.stream(inputs, config=config):
+        # A worker crash mid-turn leaves the thread at its last turn-end checkpoint
+        for event in agent_graph.stream(
+            inputs, config=config, durability=get_durability()
+        ):
             for key, value in event.items():
                 # Format output similar to agent.py
                 agent_name = key
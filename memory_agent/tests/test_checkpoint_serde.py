@@ -0,0 +1,87 @@
+import sys
+import os
+import random
+from dataclasses import dataclass
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from checkpoint_serde import (
+    CompressedSerializer,
+    LegacyJsonSerializer,
+    make_codec,
+    synthetic_turn,
+)
+
+
+def sample_thread(turns):
+    rng = random.Random(1)
+    messages = []
+    for turn in range(turns):
+        messages += synthetic_turn(rng, turn)
+    return messages
+
+
+def test_round_trip():
+    print("\n--- Testing Compressed Serializer ---")
+    messages = sample_thread(20)
+    for codec in ("zstd", "zlib"):
+        serde = CompressedSerializer(codec=make_codec(codec))
+        type_, data = serde.dumps_typed(messages)
+        assert type_ == f"msgpack+{codec}", type_
+        assert len(data) < len(JsonPlusSerializer().dumps_typed(messages)[1]) / 2
+        assert serde.loads_typed((type_, data)) == messages
+        print(f"✅ {codec}: round trip, {len(data)} bytes")
+
+    serde = CompressedSerializer(codec=make_codec("zstd"), min_bytes=512)
+    assert serde.dumps_typed({"next_agent": "Coder"})[0] == "msgpack"
+    assert serde.dumps_typed(None) == ("null", b"")
+    print("✅ Small payloads are stored uncompressed")
+
+
+def test_legacy_rows():
+    print("\n--- Testing Legacy Rows ---")
+    messages = [HumanMessage(content="hello"), AIMessage(content="hi there")]
+    serde = CompressedSerializer(codec=make_codec("zstd"))
+    assert serde.loads_typed(LegacyJsonSerializer().dumps_typed(messages)) == messages
+    assert serde.loads_typed(JsonPlusSerializer().dumps_typed(messages)) == messages
+    print("✅ JSON and plain msgpack rows are still readable")
+
+    # Compression turned off later still reads compressed rows
+    compressed = serde.dumps_typed(sample_thread(5))
+    assert CompressedSerializer(codec=None).loads_typed(compressed) == sample_thread(5)
+    print("✅ Compressed rows readable with compression disabled")
+
+
+@dataclass
+class Marker:
+    value: str
+
+
+def test_msgpack_allowlist():
+    print("\n--- Testing Strict Msgpack ---")
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    value = [Marker("x" * 2000)]
+    strict = CompressedSerializer(
+        codec=make_codec("zstd"), min_bytes=0, allowed_msgpack_modules=None
+    )
+    row = strict.dumps_typed(value)
+    assert row[0] == "msgpack+zstd"
+    assert strict.loads_typed(row) != value
+    print("✅ Types outside the allowlist are not revived")
+
+    saver = InMemorySaver(serde=strict).with_allowlist([Marker])
+    assert isinstance(saver.serde, CompressedSerializer)
+    assert saver.serde.codec is strict.codec
+    assert saver.serde.loads_typed(row) == value
+    print("✅ with_allowlist extends the compressed serializer's allowlist")
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_legacy_rows()
+    test_msgpack_allowlist()
@@ -0,0 +1,106 @@
+import sys
+import os
+import threading
+import uuid
+from typing import TypedDict
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.graph import END, START, StateGraph
+
+import checkpointer
+from checkpointer import close_checkpointers, get_checkpointer, schema_version
+
+# Needs a running Postgres (same variable as agent.py)
+DB_URL = os.environ.get("POSTGRES_CLUSTER_URLS", "postgresql://localhost:5432/postgres")
+
+
+class CounterState(TypedDict):
+    count: int
+
+
+def build_graph():
+    workflow = StateGraph(CounterState)
+    workflow.add_node("increment", lambda state: {"count": state["count"] + 1})
+    workflow.add_edge(START, "increment")
+    workflow.add_edge("increment", END)
+    return workflow
+
+
+def test_shared_checkpointer():
+    print("\n--- Testing Process-Scoped Checkpointer ---")
+    saver = get_checkpointer(DB_URL)
+    assert get_checkpointer(DB_URL) is saver
+    assert schema_version(saver.conn) == len(saver.MIGRATIONS) - 1
+    print("✅ One saver per process, schema migrated")
+
+    # A second setup is skipped by the version check
+    calls = []
+    original_setup = saver.setup
+    saver.setup = lambda: calls.append(1)
+    try:
+        assert checkpointer.ensure_schema(saver) is False
+    finally:
+        saver.setup = original_setup
+    assert not calls
+    print("✅ setup() skipped when the schema is current")
+
+    # Reloads recompile the graph on the same saver and keep thread state
+    config = {"configurable": {"thread_id": f"test-{uuid.uuid4().hex[:8]}"}}
+    build_graph().compile(checkpointer=saver).invoke({"count": 0}, config)
+    reloaded = build_graph().compile(checkpointer=get_checkpointer(DB_URL))
+    assert reloaded.get_state(config).values["count"] == 1
+    print("✅ State survives a graph reload")
+
+    # Concurrent turns (e.g. Temporal activities) share the pool
+    errors = []
+
+    def turn(i):
+        try:
+            cfg = {"configurable": {"thread_id": f"test-{uuid.uuid4().hex[:8]}-{i}"}}
+            build_graph().compile(checkpointer=get_checkpointer(DB_URL)).invoke(
+                {"count": i}, cfg
+            )
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=turn, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors, errors
+    print(f"✅ 8 concurrent turns on one pool (max {saver.conn.max_size})")
+    close_checkpointers()
+
+
+def test_migrate_on_single_connection_pool():
+    print("\n--- Testing Migrations With One Pooled Connection ---")
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+
+    # A scratch database, so the migrations really run
+    database = f"ckpt_test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(DB_URL, autocommit=True) as admin:
+        admin.execute(f"CREATE DATABASE {database}")
+    previous = os.environ.get("CHECKPOINT_POOL_MAX_SIZE")
+    os.environ["CHECKPOINT_POOL_MAX_SIZE"] = "1"
+    try:
+        saver = get_checkpointer(make_conninfo(DB_URL, dbname=database))
+        assert saver.conn.max_size == 1
+        assert schema_version(saver.conn) == len(saver.MIGRATIONS) - 1
+        print("✅ Schema migrated without a second connection")
+    finally:
+        close_checkpointers()
+        if previous is None:
+            os.environ.pop("CHECKPOINT_POOL_MAX_SIZE", None)
+        else:
+            os.environ["CHECKPOINT_POOL_MAX_SIZE"] = previous
+        with psycopg.connect(DB_URL, autocommit=True) as admin:
+            admin.execute(f"DROP DATABASE {database}")
+
+
+if __name__ == "__main__":
+    test_shared_checkpointer()
+    test_migrate_on_single_connection_pool()
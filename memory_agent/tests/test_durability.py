@@ -0,0 +1,76 @@
+import sys
+import os
+import operator
+from typing import Annotated, List, TypedDict
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+
+from checkpointer import get_durability
+
+
+class CountingSaver(InMemorySaver):
+    def __init__(self):
+        super().__init__()
+        self.puts = 0
+
+    def put(self, *args, **kwargs):
+        self.puts += 1
+        return super().put(*args, **kwargs)
+
+
+class TurnState(TypedDict):
+    log: Annotated[List[str], operator.add]
+
+
+def build_graph(checkpointer):
+    # Stands in for ContextRetriever -> Supervisor -> agent -> Reflection
+    workflow = StateGraph(TurnState)
+    nodes = ["ContextRetriever", "Supervisor", "Coder", "Reflection"]
+    for name in nodes:
+        workflow.add_node(name, lambda state, name=name: {"log": [name]})
+    workflow.add_edge(START, nodes[0])
+    for a, b in zip(nodes, nodes[1:]):
+        workflow.add_edge(a, b)
+    workflow.add_edge(nodes[-1], END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def run_turns(durability, turns=3):
+    saver = CountingSaver()
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "t"}}
+    for turn in range(turns):
+        graph.invoke({"log": [f"user {turn}"]}, config, durability=durability)
+    return saver.puts, graph.get_state(config).values["log"]
+
+
+def test_durability_modes():
+    print("\n--- Testing Checkpoint Durability ---")
+    previous = os.environ.pop("CHECKPOINT_DURABILITY", None)
+    try:
+        assert get_durability() == "exit"
+        os.environ["CHECKPOINT_DURABILITY"] = "async"
+        assert get_durability() == "async"
+        os.environ["CHECKPOINT_DURABILITY"] = "bogus"
+        assert get_durability() == "exit"
+    finally:
+        if previous is None:
+            os.environ.pop("CHECKPOINT_DURABILITY", None)
+        else:
+            os.environ["CHECKPOINT_DURABILITY"] = previous
+    print("✅ Mode parsed from CHECKPOINT_DURABILITY (default: turn)")
+
+    sync_puts, sync_log = run_turns("sync")
+    async_puts, async_log = run_turns("async")
+    turn_puts, turn_log = run_turns("exit")
+    assert sync_log == async_log == turn_log and len(turn_log) == 15
+    assert turn_puts == 3 and sync_puts == async_puts > turn_puts
+    print(f"✅ Same state; checkpoints per 3 turns: sync={sync_puts}, turn={turn_puts}")
+
+
+if __name__ == "__main__":
+    test_durability_modes()
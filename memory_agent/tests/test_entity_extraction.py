@@ -0,0 +1,120 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entity_extraction import extract_entities
+from entity_index import EntityIndex, normalize_name
+
+
+def test_local_entity_extraction():
+    print("\n--- Testing Local Entity Extraction ---")
+    conversation = (
+        "User: I want to build a new Python web scraper called 'SpiderBot'.\n"
+        "Agent: We should use BeautifulSoup and requests.\n"
+        "User: Great. SpiderBot needs to depend on the 'requests' library.\n"
+        "Agent: Noted. The deepagents project uses Weaviate for memory.\n"
+    )
+    known = {"DeepAgents": "Project", "Weaviate": "Database"}
+
+    entities, relationships = extract_entities(conversation, known_entities=known)
+    print(f"Entities: {entities}")
+    print(f"Relationships: {relationships}")
+
+    names = {e["name"]: e["type"] for e in entities}
+    assert "SpiderBot" in names
+    assert "BeautifulSoup" in names
+    assert names["requests"] == "Technology"
+    # Known entities keep their canonical spelling and label from the graph
+    assert names["DeepAgents"] == "Project"
+    assert {"from": "SpiderBot", "to": "requests", "type": "DEPENDS_ON"} in relationships
+    assert {"from": "DeepAgents", "to": "Weaviate", "type": "USES"} in relationships
+    print("✅ Entities and relationships extracted without an LLM")
+
+
+def test_entity_resolution_index():
+    print("\n--- Testing Entity Resolution Index ---")
+    # An infinite TTL keeps the index from loading the live graph
+    index = EntityIndex(threshold=0.88, ttl=float("inf"))
+
+    assert normalize_name("Spider Bot") == normalize_name("spiderbot") == "spiderbot"
+
+    canonical, label, alias = index.resolve("SpiderBot", "Project")
+    assert (canonical, label, alias) == ("SpiderBot", "Project", None)
+
+    for variant in ["spiderbot", "Spider Bot", "SpiderBots"]:
+        canonical, label, alias = index.resolve(variant, "Concept")
+        print(f"{variant!r} -> {canonical} ({label}), alias={alias!r}")
+        assert canonical == "SpiderBot"
+        # The existing label wins, so MERGE hits the same node
+        assert label == "Project"
+        assert alias == variant
+
+    # Known aliases are not reported again
+    assert index.resolve("spiderbot")[2] is None
+    assert index.lookup("SPIDER-BOT") == "SpiderBot"
+    assert index.lookup("Weaviate") is None
+    assert index.known_entities() == {"SpiderBot": "Project"}
+    print("✅ Spelling variants resolve to one canonical entity")
+
+
+class FakeDriver:
+    """Records Cypher writes; fails them while `fail` is set."""
+
+    def __init__(self):
+        self.runs = []
+        self.fail = False
+
+    def session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        if self.fail:
+            raise ConnectionError("neo4j unavailable")
+        self.runs.append((query, params))
+
+    def close(self):
+        pass
+
+
+def test_graph_writes_record_aliases():
+    print("\n--- Testing Alias Writes ---")
+    import entity_index
+    from tools import graph_tools
+
+    driver = FakeDriver()
+    saved = (entity_index._entity_index, graph_tools.get_neo4j_driver)
+    entity_index._entity_index = EntityIndex(ttl=float("inf"))
+    graph_tools.get_neo4j_driver = lambda: driver
+    try:
+        index = entity_index.get_entity_index()
+        args = {"label": "Project", "properties": "{}"}
+
+        driver.fail = True
+        result = graph_tools.add_graph_node.invoke({**args, "name": "SpiderBot"})
+        assert result.startswith("Failed") and index.lookup("SpiderBot") is None
+        print("✅ A failed write leaves the index unchanged")
+
+        driver.fail = False
+        graph_tools.add_graph_node.invoke({**args, "name": "SpiderBot"})
+        graph_tools.add_graph_node.invoke({**args, "name": "Spider Bot"})
+        query, params = driver.runs[-1]
+        assert params["name"] == "SpiderBot" and params["alias"] == ["Spider Bot"]
+        assert "n.aliases" in query
+        assert index.match("Spider Bot")[2] is None
+        print("✅ The alias is written to the canonical node, then indexed")
+    finally:
+        entity_index._entity_index, graph_tools.get_neo4j_driver = saved
+
+
+if __name__ == "__main__":
+    test_local_entity_extraction()
+    test_entity_resolution_index()
+    test_graph_writes_record_aliases()
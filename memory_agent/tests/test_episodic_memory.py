@@ -1,12 +1,12 @@
 import sys
 import os
 import time
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 
 # Ensure we can import from parent directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from reflection import reflect_on_conversation
+from reflection import reflect_on_conversation, get_unreflected_messages
 from memory_tools import recall_memory
 from tools.graph_tools import query_graph
 from agent import load_secrets
@@ -65,5 +65,28 @@ def test_episodic_memory():
         print("❌ Knowledge Graph Verification Failed")
 
 
+def test_reflection_watermark():
+    print("\n--- Testing Reflection Watermark ---")
+    messages = [
+        HumanMessage(content="Build SpiderBot."),
+        AIMessage(content="Plan drafted."),
+        SystemMessage(content="[System] Episodic memory updated."),
+        HumanMessage(content="Add a retry policy."),
+    ]
+
+    start, new_messages = get_unreflected_messages(
+        {"messages": messages, "reflection_watermark": 3}
+    )
+    print(f"Start: {start}, New: {[m.content for m in new_messages]}")
+    assert start == 3
+    assert [m.content for m in new_messages] == ["Add a retry policy."]
+
+    # Nothing new -> no LLM call, watermark is kept at the end of the history
+    result = reflect_on_conversation({"messages": messages, "reflection_watermark": 4})
+    assert result == {"reflection_watermark": 4}
+    print("✅ Reflection watermark skips already reflected messages")
+
+
 if __name__ == "__main__":
+    test_reflection_watermark()
     test_episodic_memory()
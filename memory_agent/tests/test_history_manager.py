@@ -0,0 +1,55 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage, AIMessage
+
+from history_manager import SUMMARY_PREFIX, compact_history, history_view
+
+
+def test_bounded_history():
+    print("\n--- Testing Bounded History ---")
+    os.environ.update({"HISTORY_KEEP_TURNS": "2", "HISTORY_FOLD_BATCH_TURNS": "2"})
+
+    messages = []
+    for i in range(4):
+        messages += [
+            HumanMessage(content=f"Request {i}"),
+            HumanMessage(content=f"[SYSTEM: Automatic Context]\nContext {i}"),
+            AIMessage(content=f"Answer {i}"),
+        ]
+    state = {"messages": messages}
+
+    folded = []
+
+    def fake_summarize(previous, to_fold, max_chars):
+        folded.extend(m.content for m in to_fold)
+        return "Requests 0 and 1 were answered."
+
+    # Test 1: Four turns = 2 kept + a full batch of 2 -> fold the oldest two
+    update = compact_history(state, summarize=fake_summarize)
+    print(f"Update: {update}")
+    assert update == {
+        "history_summary": "Requests 0 and 1 were answered.",
+        "history_summary_upto": 6,
+    }
+    assert folded[0] == "Request 0" and folded[-1] == "Answer 1"
+
+    # Test 2: Agents get the summary plus the last two turns verbatim
+    view = history_view({**state, **update})
+    print(f"View: {[m.content[:30] for m in view]}")
+    assert view[0].content.startswith(SUMMARY_PREFIX)
+    assert [m.content for m in view[1:]] == [m.content for m in messages[6:]]
+
+    # Test 3: Not enough new turns for another batch -> no summarizer call
+    more = messages + [HumanMessage(content="Request 4"), AIMessage(content="Answer 4")]
+    assert compact_history({"messages": more, **update}, summarize=None) == {}
+    print("✅ History is bounded to a rolling summary plus recent turns")
+
+    del os.environ["HISTORY_KEEP_TURNS"], os.environ["HISTORY_FOLD_BATCH_TURNS"]
+
+
+if __name__ == "__main__":
+    test_bounded_history()
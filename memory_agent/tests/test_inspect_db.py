@@ -0,0 +1,80 @@
+import sys
+import os
+import operator
+import uuid
+from typing import Annotated, List, TypedDict
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+
+from checkpointer import get_checkpointer
+from inspect_db import connect, prune_checkpoints, report_threads
+
+# Needs a running Postgres (same variable as agent.py)
+os.environ.setdefault("POSTGRES_CLUSTER_URLS", "postgresql://localhost:5432/postgres")
+
+
+class ChatState(TypedDict):
+    messages: Annotated[List, operator.add]
+
+
+def build_graph():
+    workflow = StateGraph(ChatState)
+    workflow.add_node("reply", lambda state: {"messages": [AIMessage(content="ok " * 300)]})
+    workflow.add_edge(START, "reply")
+    workflow.add_edge("reply", END)
+    return workflow.compile(checkpointer=get_checkpointer(os.environ["POSTGRES_CLUSTER_URLS"]))
+
+
+def count_checkpoints(conn, thread_id):
+    cur = conn.cursor()
+    cur.execute("SELECT count(*) FROM checkpoints WHERE thread_id = %s", (thread_id,))
+    count = cur.fetchone()[0]
+    conn.commit()
+    return count
+
+
+def test_prune():
+    print("\n--- Testing Checkpoint Pruning ---")
+    graph = build_graph()
+    pruned, untouched = (f"test-prune-{uuid.uuid4().hex[:8]}" for _ in range(2))
+    for thread_id in (pruned, untouched):
+        config = {"configurable": {"thread_id": thread_id}}
+        for turn in range(5):
+            graph.invoke({"messages": [HumanMessage(content=f"turn {turn}")]}, config)
+
+    conn = connect()
+    try:
+        rows = report_threads(conn, limit=1000)
+        assert any(row[0] == pruned and row[1] > 1 for row in rows)
+        print("✅ Per-thread report lists the test threads")
+
+        before = count_checkpoints(conn, pruned)
+        totals = prune_checkpoints(conn, 0, thread_id=pruned, dry_run=True, sleep=0)
+        assert totals["checkpoints"] == before - 1 and totals["blobs"] > 0
+        assert count_checkpoints(conn, pruned) == before
+        print("✅ Dry run reports without deleting")
+
+        prune_checkpoints(conn, 0, thread_id=pruned, batch_size=2, sleep=0)
+        assert count_checkpoints(conn, pruned) == 1
+        assert count_checkpoints(conn, untouched) == before
+        print("✅ Only the latest checkpoint of the pruned thread is kept")
+
+        nothing = prune_checkpoints(conn, 30, thread_id=untouched, dry_run=True, sleep=0)
+        assert nothing["checkpoints"] == 0
+        print("✅ Recent checkpoints are not eligible")
+    finally:
+        conn.close()
+
+    config = {"configurable": {"thread_id": pruned}}
+    assert len(graph.get_state(config).values["messages"]) == 10
+    graph.invoke({"messages": [HumanMessage(content="after pruning")]}, config)
+    assert len(graph.get_state(config).values["messages"]) == 12
+    print("✅ Pruned thread keeps its state and continues")
+
+
+if __name__ == "__main__":
+    test_prune()
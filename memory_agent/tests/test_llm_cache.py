@@ -0,0 +1,90 @@
+import sys
+import os
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+from cache_tools import NamespacedRedisCache, get_redis_url
+
+# Own key prefix, so eviction and stats never touch the shared cache's records
+TEST_PREFIX = "llmcache-test:"
+
+
+def redis_for_tests():
+    """In-memory fakeredis when installed, else the configured Dragonfly."""
+    try:
+        import fakeredis
+
+        return fakeredis.FakeRedis()
+    except ImportError:
+        from redis import Redis
+
+        return Redis.from_url(get_redis_url())
+
+
+def test_bounded_llm_cache():
+    print("\n--- Testing Bounded, Namespaced LLM Cache ---")
+    redis_client = redis_for_tests()
+    previous_ttl = os.environ.get("LLM_CACHE_TTL_TESTNS")
+    os.environ["LLM_CACHE_TTL_TESTNS"] = "120"
+    cache = NamespacedRedisCache(
+        redis_client, version="test-v1", max_bytes=10**9, key_prefix=TEST_PREFIX
+    )
+    cache.clear()
+    try:
+        llm_string = "model=m2---role:TestNS"
+        generation = [ChatGeneration(message=AIMessage(content="cached answer " * 20))]
+
+        assert cache.lookup("prompt-0", llm_string) is None
+        cache.update("prompt-0", llm_string, generation)
+        hit = cache.lookup("prompt-0", llm_string)
+        assert hit and hit[0].message.content.startswith("cached answer")
+        ttl = redis_client.ttl(cache._key("prompt-0", llm_string)[1])
+        assert 0 < ttl <= 120
+        print(f"✅ Generation cached in namespace 'testns' with TTL {ttl}s")
+
+        newer = NamespacedRedisCache(
+            redis_client, version="test-v2", max_bytes=10**9, key_prefix=TEST_PREFIX
+        )
+        assert newer.lookup("prompt-0", llm_string) is None
+        assert newer.purge_stale_versions() >= 1
+        print("✅ Prompt template version change invalidates old generations")
+
+        bounded = NamespacedRedisCache(
+            redis_client, version="test-v2", max_bytes=0, key_prefix=TEST_PREFIX
+        )
+        bounded.update("prompt-1", llm_string, generation)
+        assert bounded.lookup("prompt-1", llm_string) is None
+        assert newer.stats()["entries"] == 0 and newer.stats()["bytes"] == 0
+        print("✅ Entries over the byte budget are evicted")
+
+        # An entry whose TTL ran out leaves no LRU/size records behind
+        newer.update("prompt-2", llm_string, generation)
+        key = newer._key("prompt-2", llm_string)[1]
+        redis_client.delete(key)
+        redis_client.zadd(newer.expiry_key, {key: time.time() - 1})
+        assert newer.stats()["bytes"] > 0
+        newer.evict()
+        assert newer.stats()["entries"] == 0 and newer.stats()["bytes"] == 0
+        assert not redis_client.hexists(newer.sizes_key, key)
+        print("✅ Expired entries are dropped from the bookkeeping")
+
+        stats = newer.stats()
+        print(f"Stats: {stats['namespaces'].get('testns')}, bytes={stats['bytes']}")
+        assert stats["namespaces"]["testns"]["hits"] == 1
+        assert not redis_client.exists("llmcache:stats")
+    finally:
+        cache.clear()
+        redis_client.delete(cache.stats_key)
+        if previous_ttl is None:
+            os.environ.pop("LLM_CACHE_TTL_TESTNS", None)
+        else:
+            os.environ["LLM_CACHE_TTL_TESTNS"] = previous_ttl
+
+
+if __name__ == "__main__":
+    test_bounded_llm_cache()
@@ -0,0 +1,50 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anthropic._models import FinalRequestOptions
+
+from llm_clients import Timeout, close_llm_clients, get_chat_model
+
+
+def request_timeout(client):
+    """The timeout on a request as the SDK client builds it."""
+    request = client._build_request(
+        FinalRequestOptions.construct(method="post", url="/v1/messages", json_data={})
+    )
+    return request.extensions["timeout"]
+
+
+def test_pooled_request_timeout():
+    print("\n--- Testing Pooled Client Timeouts ---")
+    saved = {
+        name: os.environ.get(name)
+        for name in ("LLM_HTTP_TIMEOUT", "LLM_HTTP_CONNECT_TIMEOUT")
+    }
+    os.environ["LLM_HTTP_TIMEOUT"] = "42"
+    os.environ["LLM_HTTP_CONNECT_TIMEOUT"] = "3"
+    close_llm_clients()
+    try:
+        llm = get_chat_model("test-model", "http://localhost:1", "test-key")
+        timeout = request_timeout(llm._client)
+        print(f"Request timeout: {timeout}")
+        assert timeout == Timeout(42, connect=3).as_dict()
+        assert request_timeout(llm._async_client) == timeout
+        print("✅ Requests carry the pool's timeout")
+
+        explicit = get_chat_model("test-model", "http://localhost:1", "test-key", timeout=5)
+        assert request_timeout(explicit._client) == Timeout(5).as_dict()
+        print("✅ An explicit model timeout still wins")
+    finally:
+        close_llm_clients()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+if __name__ == "__main__":
+    test_pooled_request_timeout()
@@ -0,0 +1,49 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+
+from message_views import role_view
+
+
+def test_role_scoped_views():
+    print("\n--- Testing Role-Scoped Message Views ---")
+    messages = [
+        HumanMessage(content="Add retries to SpiderBot."),
+        HumanMessage(content="[SYSTEM: Automatic Context]\nSpiderBot uses requests."),
+        AIMessage(content="Plan: wrap fetch() in a retry loop.", name="Planner"),
+        AIMessage(
+            content="",
+            name="Coder",
+            tool_calls=[{"name": "terminal", "args": {"commands": "ls"}, "id": "call_1"}],
+        ),
+        ToolMessage(content="spider.py\nsetup.py", tool_call_id="call_1"),
+        AIMessage(content="Implemented retries in spider.py.", name="Coder"),
+        AIMessage(content="Found an issue: no backoff.", name="Reviewer"),
+    ]
+
+    reviewer = [m.content for m in role_view(messages, "Reviewer")]
+    print(f"Reviewer sees: {reviewer}")
+    assert reviewer == [
+        "Add retries to SpiderBot.",
+        "Plan: wrap fetch() in a retry loop.",
+        "Implemented retries in spider.py.",
+        "Found an issue: no backoff.",
+    ]
+
+    planner = [m.content for m in role_view(messages, "Planner")]
+    print(f"Planner sees: {planner}")
+    assert "Implemented retries in spider.py." not in planner
+    assert any(c.startswith("[SYSTEM: Automatic Context]") for c in planner)
+
+    coder = role_view(messages, "Coder")
+    assert not any(isinstance(m, ToolMessage) for m in coder)
+    assert len(coder) == 5
+    print("✅ Each role gets only the messages relevant to it")
+
+
+if __name__ == "__main__":
+    test_role_scoped_views()
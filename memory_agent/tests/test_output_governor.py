@@ -0,0 +1,68 @@
+import sys
+import os
+import shutil
+import tempfile
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.tools import tool
+
+from tool_executor import concurrent_tools
+from tools.output_tools import read_output
+
+
+@tool
+def big_listing(n: int) -> str:
+    """Returns n numbered lines."""
+    return "".join(f"line {i}\n" for i in range(n))
+
+
+SPILL_SETTINGS = (
+    "OUTPUT_SPILL_BACKEND",
+    "OUTPUT_SPILL_DIR",
+    "OUTPUT_SPILL_THRESHOLD",
+    "OUTPUT_PREVIEW_CHARS",
+)
+
+
+def test_output_spill():
+    print("\n--- Testing Oversized Tool Output Spill ---")
+    previous = {name: os.environ.get(name) for name in SPILL_SETTINGS}
+    spill_dir = tempfile.mkdtemp()
+    os.environ["OUTPUT_SPILL_BACKEND"] = "disk"
+    os.environ["OUTPUT_SPILL_DIR"] = spill_dir
+    os.environ["OUTPUT_SPILL_THRESHOLD"] = "1000"
+    os.environ["OUTPUT_PREVIEW_CHARS"] = "200"
+    try:
+        (listing,) = concurrent_tools([big_listing])
+
+        small = listing.invoke({"n": 10})
+        assert "truncated" not in small
+        print("✅ Small output passed through unchanged")
+
+        full = big_listing.invoke({"n": 5000})
+        governed = listing.invoke({"n": 5000})
+        print(f"Governed output tail: {governed[-160:]}")
+        assert governed.startswith(full[:200]) and len(governed) < 500
+        handle = governed.split("handle '")[1].split("'")[0]
+
+        chunk = read_output.invoke({"handle": handle, "offset": 200, "length": 300})
+        assert chunk.startswith(full[200:500])
+        assert f"of {len(full)}" in chunk
+        print("✅ Oversized output replaced by a preview; ranges readable by handle")
+
+        missing = read_output.invoke({"handle": "out-000000000000"})
+        assert missing.startswith("Error")
+        print("✅ Unknown handle reported")
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_output_spill()
@@ -0,0 +1,114 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anthropic
+import httpx
+
+import rate_limiter
+from rate_limiter import FairSemaphore, LLMRateLimiter, governed_call
+
+
+def test_token_bucket():
+    print("\n--- Testing Token Bucket ---")
+    # 600 rpm = one request per 0.1s once the initial burst is used up
+    limiter = LLMRateLimiter("test", rpm=600, tpm=0)
+    limiter.local.requests = 0.0
+
+    start = time.time()
+    for _ in range(3):
+        limiter.wait_for_capacity()
+    elapsed = time.time() - start
+    assert 0.25 <= elapsed < 1.0, elapsed
+    print(f"✅ 3 requests paced over {elapsed:.2f}s")
+
+    # Token debits push the balance negative and hold back the next request
+    limiter = LLMRateLimiter("test-tokens", rpm=0, tpm=60000)
+    limiter.debit(60000 + 100)
+    assert limiter.local.try_acquire() > 0
+    print("✅ Token budget exhausted by usage blocks further requests")
+
+    limiter = LLMRateLimiter("off", rpm=0, tpm=0)
+    limiter.wait_for_capacity()
+    print("✅ Disabled limiter does not wait")
+
+
+def test_fair_semaphore():
+    print("\n--- Testing Fair Semaphore ---")
+    semaphore = FairSemaphore(1)
+    semaphore.acquire()
+    order = []
+
+    def worker(i):
+        semaphore.acquire()
+        order.append(i)
+        semaphore.release()
+
+    threads = []
+    for i in range(5):
+        t = threading.Thread(target=worker, args=(i,))
+        t.start()
+        threads.append(t)
+        time.sleep(0.05)  # queue in a known order
+    semaphore.release()
+    for t in threads:
+        t.join()
+    assert order == [0, 1, 2, 3, 4], order
+    print("✅ Waiters served in arrival order")
+
+    async def cancel_waiter():
+        semaphore.acquire()
+        waiter = asyncio.ensure_future(semaphore.acquire_async())
+        await asyncio.sleep(0.1)
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        semaphore.release()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(cancel_waiter())
+    assert semaphore._value == 1 and not semaphore._waiters
+    print("✅ A cancelled async waiter does not keep a slot")
+
+
+def test_requeue_after_429():
+    print("\n--- Testing 429 Requeue ---")
+    previous = os.environ.get("LLM_RATE_RPM")
+    os.environ["LLM_RATE_RPM"] = "6000"
+    try:
+        limiter = rate_limiter.get_rate_limiter("test-429")
+    finally:
+        if previous is None:
+            os.environ.pop("LLM_RATE_RPM", None)
+        else:
+            os.environ["LLM_RATE_RPM"] = previous
+    limiter.redis = None
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            request = httpx.Request("POST", "https://example.invalid/v1/messages")
+            raise anthropic.RateLimitError(
+                "rate limited",
+                response=httpx.Response(429, request=request),
+                body=None,
+            )
+        return "ok"
+
+    assert governed_call("test-429", call) == "ok"
+    assert len(attempts) == 3
+    print("✅ Call retried after provider 429s instead of failing")
+
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_fair_semaphore()
+    test_requeue_after_429()
@@ -0,0 +1,158 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage, AIMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import InMemorySaver
+
+from reflection_policy import ReflectionTriggerPolicy
+from reflection_worker import ReflectionJob, ReflectionWorkerPool, load_thread_messages
+
+
+def test_reflection_worker_pool():
+    print("\n--- Testing Background Reflection Worker ---")
+
+    # Test 1: Jobs are serializable for the NATS backend
+    print("\n[Test 1] Job serialization")
+    job = ReflectionJob(thread_id="sess-test", start=4, end=9)
+    restored = ReflectionJob.from_json(job.to_json())
+    assert (restored.thread_id, restored.start, restored.end) == ("sess-test", 4, 9)
+    print("✅ Job round-trips through JSON")
+
+    # Test 2: An empty range completes without calling the LLM
+    print("\n[Test 2] Empty range")
+    pool = ReflectionWorkerPool(workers=1, max_retries=0)
+    pool.submit(ReflectionJob(thread_id="sess-test", start=0, end=0), messages=[])
+    assert pool.drain(timeout=5)
+    stats = pool.stats()
+    print(f"Stats: {stats}")
+    assert stats["completed"] == 1
+
+    # Test 3: Failing jobs are retried, then dead-lettered
+    print("\n[Test 3] Retries")
+
+    def broken_loader(thread_id, start, end):
+        raise ConnectionError("checkpointer unavailable")
+
+    pool = ReflectionWorkerPool(
+        message_loader=broken_loader, workers=1, max_retries=2, retry_backoff=0.01
+    )
+    pool.submit(ReflectionJob(thread_id="sess-test", start=0, end=3))
+    assert pool.drain(timeout=5)
+    stats = pool.stats()
+    print(f"Stats: {stats}")
+    assert stats["retried"] == 2
+    assert stats["failed"] == 1
+    assert len(pool.dead_letters) == 1
+    print("✅ Worker pool retries and reports lag")
+
+    # Test 4: A range the checkpoint does not hold yet is retried, not dropped
+    print("\n[Test 4] Checkpoint behind the job")
+    saver = InMemorySaver()
+    config = {"configurable": {"thread_id": "sess-test", "checkpoint_ns": ""}}
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"]["messages"] = [HumanMessage(content="hi")]
+    checkpoint["channel_versions"]["messages"] = 1
+    saver.put(config, checkpoint, {}, {"messages": 1})
+    try:
+        load_thread_messages(saver, "sess-test", 0, 3)
+        raise AssertionError("expected the short checkpoint to be rejected")
+    except ValueError:
+        pass
+    assert len(load_thread_messages(saver, "sess-test", 0, 1)) == 1
+    print("✅ Loader fails until the turn's checkpoint is written")
+
+
+class Recorder:
+    """Stands in for a tool; fails the first `failures` calls."""
+
+    def __init__(self, failures=0):
+        self.calls = 0
+        self.failures = failures
+
+    def invoke(self, args):
+        self.calls += 1
+        if self.calls <= self.failures:
+            return "Failed to save memory: weaviate unavailable"
+        return "ok"
+
+
+def test_reflection_retry_resumes():
+    print("\n--- Testing Resumable Reflection ---")
+    import reflection
+    from langchain_core.runnables import RunnableLambda
+
+    summaries = []
+
+    class SummaryLLM:
+        def with_structured_output(self, schema):
+            def summarize(prompt):
+                summaries.append(1)
+                return schema(summary="Built SpiderBot")
+
+            return RunnableLambda(summarize)
+
+    nodes, edges, save = Recorder(), Recorder(), Recorder(failures=1)
+    saved = (
+        reflection.add_graph_node,
+        reflection.add_graph_edge,
+        reflection.save_memory,
+        reflection.get_llm,
+        reflection.resolve_entities,
+    )
+    reflection.add_graph_node, reflection.add_graph_edge = nodes, edges
+    reflection.save_memory = save
+    reflection.get_llm = lambda role: SummaryLLM()
+    reflection.resolve_entities = lambda entities, relationships: (
+        entities,
+        relationships,
+    )
+    try:
+        pool = ReflectionWorkerPool(workers=1, max_retries=2, retry_backoff=0.01)
+        messages = [
+            HumanMessage(content="Build a scraper called 'SpiderBot' with requests."),
+            AIMessage(content="SpiderBot depends on the 'requests' library."),
+        ]
+        pool.submit(ReflectionJob(thread_id="sess-test", start=0, end=2), messages)
+        assert pool.drain(timeout=5)
+    finally:
+        (
+            reflection.add_graph_node,
+            reflection.add_graph_edge,
+            reflection.save_memory,
+            reflection.get_llm,
+            reflection.resolve_entities,
+        ) = saved
+
+    stats = pool.stats()
+    print(f"Stats: {stats}, node writes: {nodes.calls}, saves: {save.calls}")
+    assert stats["retried"] == 1 and stats["completed"] == 1
+    assert (nodes.calls, edges.calls) == (2, 1)
+    assert len(summaries) == 1 and save.calls == 2
+    print("✅ A failed save retries only the save, not the graph writes or the LLM")
+
+
+def test_reflection_trigger_policy():
+    print("\n--- Testing Reflection Trigger Policy ---")
+    policy = ReflectionTriggerPolicy(
+        every_n_turns=2, min_tokens=100, on_tool_results=True, idle_timeout_seconds=0
+    )
+    one_liner = [HumanMessage(content="hi"), AIMessage(content="Hello!")]
+    context = [HumanMessage(content="[SYSTEM: Automatic Context]\n...")]
+
+    assert policy.trigger_reason(one_liner) is None
+    # Injected context blocks are not user turns
+    assert policy.trigger_reason(one_liner + context) is None
+    assert policy.trigger_reason(one_liner + one_liner) == "2 turns"
+    assert policy.trigger_reason([AIMessage(content="x" * 400)]) == "100+ tokens"
+    assert policy.trigger_reason(one_liner, tool_results=1) == "1 new tool result(s)"
+    print("✅ Trivial exchanges are deferred, real work triggers reflection")
+
+
+if __name__ == "__main__":
+    test_reflection_trigger_policy()
+    test_reflection_worker_pool()
+    test_reflection_retry_resumes()
@@ -0,0 +1,51 @@
+import sys
+import os
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage, AIMessage
+
+from routing_guard import TurnBudget, check_turn, detect_cycle, start_turn
+
+
+def test_routing_guard():
+    print("\n--- Testing Supervisor Routing Guard ---")
+    budget = TurnBudget(
+        max_agent_visits=10, max_llm_calls=5, max_wall_clock_seconds=60, max_cycle_repeats=3
+    )
+    messages = [HumanMessage(content="Build SpiderBot.")]
+    state = {"messages": messages, **start_turn(messages)}
+
+    # Test 1: A fresh turn may route
+    assert check_turn(state, "Planner", budget) is None
+
+    # Test 2: Coder <-> Reviewer ping-pong is a cycle
+    print("\n[Test 2] Cycle detection")
+    history = ["Planner"] + ["Coder", "Reviewer"] * 3
+    assert detect_cycle(history, 3) == ["Coder", "Reviewer"]
+    assert detect_cycle(history[:-1], 3) is None
+    reason = check_turn({**state, "turn_route_history": history[:-1]}, "Reviewer", budget)
+    print(f"Reason: {reason}")
+    assert "cycle" in reason
+
+    # Test 3: Budgets
+    print("\n[Test 3] Budgets")
+    assert "LLM call" in check_turn({**state, "turn_llm_calls": 5}, "Coder", budget)
+    stale = {**state, "turn_started_at": time.time() - 120}
+    assert "wall-clock" in check_turn(stale, "Coder", budget)
+
+    # Test 4: Repeated output is no progress
+    print("\n[Test 4] No-progress detection")
+    repeated = messages + [
+        AIMessage(content="I found an issue in parser.py, please fix it."),
+        AIMessage(content="Fixed the code."),
+        AIMessage(content="I found an issue in parser.py, please fix it. "),
+    ]
+    assert "progress" in check_turn({**state, "messages": repeated}, "Coder", budget)
+    print("✅ Routing guard stops loops and enforces the turn budget")
+
+
+if __name__ == "__main__":
+    test_routing_guard()
@@ -0,0 +1,84 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from langchain_core.caches import InMemoryCache
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration
+
+import memory_tools
+from cache_tools import SemanticLLMCache
+
+VOCAB = ["spiderbot", "retry", "retries", "add", "backoff", "deploy", "terraform"]
+
+
+class BagOfWordsModel:
+    def encode(self, text):
+        words = text.lower().replace("?", " ").replace(".", " ").split()
+        return np.array([float(words.count(w)) for w in VOCAB] + [0.01])
+
+
+def test_semantic_cache():
+    print("\n--- Testing Semantic LLM Cache ---")
+    get_embedding_model = memory_tools.get_embedding_model
+    memory_tools.get_embedding_model = lambda: BagOfWordsModel()
+    try:
+        cache = SemanticLLMCache(exact_cache=InMemoryCache(), threshold=0.9)
+        llm_string = "model=m2---role:Planner"
+        system = SystemMessage(content="You are the Planner Agent.")
+
+        prompt = dumps([system, HumanMessage(content="Add retries to SpiderBot.")])
+        answer = [ChatGeneration(message=AIMessage(content="Plan: wrap fetch in retry."))]
+        cache.update(prompt, llm_string, answer)
+
+        similar = dumps([system, HumanMessage(content="add retries to spiderbot")])
+        hit = cache.lookup(similar, llm_string)
+        assert hit and hit[0].message.content == "Plan: wrap fetch in retry."
+        print("✅ Near-duplicate prompt served from the semantic tier")
+
+        assert cache.lookup(prompt, llm_string) is not None
+        assert cache.stats["exact_hits"] == 1
+        assert cache.peek(prompt, llm_string) is not None
+        assert cache.stats["lookups"] == 2
+        print("✅ Exact repeat served from the exact tier")
+
+        assert cache.lookup(similar, "model=m2---role:Coder") is None
+        unrelated = dumps([system, HumanMessage(content="Deploy terraform")])
+        assert cache.lookup(unrelated, llm_string) is None
+        print("✅ Other roles and unrelated prompts miss")
+
+        tool_turn = dumps(
+            [
+                system,
+                HumanMessage(content="Add retries to SpiderBot."),
+                AIMessage(
+                    content="",
+                    tool_calls=[{"name": "read_file", "args": {}, "id": "call_1"}],
+                ),
+                ToolMessage(content="def fetch(): ...", tool_call_id="call_1"),
+            ]
+        )
+        assert cache.lookup(tool_turn, llm_string) is None
+        calls = [
+            ChatGeneration(
+                message=AIMessage(
+                    content="",
+                    tool_calls=[{"name": "read_file", "args": {}, "id": "call_2"}],
+                )
+            )
+        ]
+        other = dumps([system, HumanMessage(content="SpiderBot backoff")])
+        cache.update(other, llm_string, calls)
+        again = dumps([system, HumanMessage(content="spiderbot backoff?")])
+        assert cache.lookup(again, llm_string) is None
+        print(f"✅ Tool-calling turns are excluded. Stats: {cache.hit_rates()}")
+    finally:
+        memory_tools.get_embedding_model = get_embedding_model
+
+
+if __name__ == "__main__":
+    test_semantic_cache()
@@ -0,0 +1,133 @@
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.tools import tool
+
+from singleflight import SingleFlight
+from tool_executor import concurrent_tools
+
+calls = []
+
+
+@tool
+def read_document(query: str) -> str:
+    """Searches documents."""
+    calls.append(query)
+    time.sleep(0.5)
+    return f"documents about {query}"
+
+
+def run_concurrently(fn, n):
+    results = [None] * n
+
+    def worker(i):
+        results[i] = fn()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_singleflight():
+    print("\n--- Testing Request Coalescing ---")
+    flight = SingleFlight("test")
+    executions = []
+
+    def slow_call():
+        executions.append(1)
+        time.sleep(0.5)
+        return {"answer": 42}
+
+    results = run_concurrently(lambda: flight.do("same-key", slow_call), 5)
+    assert len(executions) == 1 and all(r == {"answer": 42} for r in results)
+    assert flight.coalesced == 4
+    print("✅ Five concurrent duplicates made one call")
+
+    def failing_call():
+        time.sleep(0.2)
+        raise RuntimeError("upstream failed")
+
+    errors = []
+
+    def call_and_record():
+        try:
+            flight.do("failing-key", failing_call)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    run_concurrently(call_and_record, 3)
+    assert errors == ["upstream failed"] * 3
+    print("✅ The leader's error is shared with waiting duplicates")
+
+    (read_doc,) = concurrent_tools([read_document])
+    config = {"configurable": {"thread_id": "singleflight-test"}}
+    results = run_concurrently(lambda: read_doc.invoke({"query": "SpiderBot"}, config), 4)
+    assert calls == ["SpiderBot"]
+    assert all(r == "documents about SpiderBot" for r in results)
+    print("✅ Concurrent identical tool calls ran once")
+
+    sessions = iter(range(4))
+    results = run_concurrently(
+        lambda: read_doc.invoke(
+            {"query": "Weaviate"},
+            {"configurable": {"thread_id": f"singleflight-test-{next(sessions)}"}},
+        ),
+        4,
+    )
+    assert calls == ["SpiderBot", "Weaviate"]
+    assert all(r == "documents about Weaviate" for r in results)
+    print("✅ Identical calls from different sessions ran once")
+
+
+def test_distributed_poll_skips_stats():
+    print("\n--- Testing Cross-Process Wait ---")
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration
+
+    from cache_tools import NamespacedRedisCache, get_redis_url
+    from singleflight import LOCK_KEY_PREFIX, distributed_do
+
+    try:
+        import fakeredis
+
+        redis_client = fakeredis.FakeRedis()
+    except ImportError:
+        from redis import Redis
+
+        redis_client = Redis.from_url(get_redis_url())
+    cache = NamespacedRedisCache(redis_client, version="test", key_prefix="flight-test:")
+    cache.clear()
+    redis_client.delete(cache.stats_key)
+    llm_string = "model=m---role:Coder"
+    redis_client.set(LOCK_KEY_PREFIX + "flight-test", "other-process")
+
+    def holder_finishes():
+        time.sleep(0.6)
+        generation = ChatGeneration(message=AIMessage(content="shared"))
+        cache.update("prompt", llm_string, [generation])
+        redis_client.delete(LOCK_KEY_PREFIX + "flight-test")
+
+    threading.Thread(target=holder_finishes).start()
+    result = distributed_do(
+        redis_client,
+        "flight-test",
+        lambda: "called",
+        lambda: cache.peek("prompt", llm_string),
+    )
+    assert result[0].message.content == "shared"
+    assert cache.stats()["namespaces"] == {}
+    cache.clear()
+    print("✅ Waiting on another process leaves the hit/miss stats alone")
+
+
+if __name__ == "__main__":
+    test_singleflight()
+    test_distributed_poll_skips_stats()
@@ -0,0 +1,62 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.tools import tool
+
+from tool_cache import get_tool_cache
+from tool_executor import concurrent_tools
+
+calls = []
+
+
+@tool
+def recall_memory(query: str) -> str:
+    """Recalls memories."""
+    calls.append(query)
+    return f"memories about {query}"
+
+
+@tool
+def save_memory(content: str) -> str:
+    """Saves a memory."""
+    return "saved"
+
+
+@tool
+def query_graph(cypher: str) -> str:
+    """Runs a Cypher query."""
+    calls.append(cypher)
+    return "rows"
+
+
+def test_tool_memoization():
+    print("\n--- Testing Tool Result Memoization ---")
+    recall, save, query = concurrent_tools([recall_memory, save_memory, query_graph])
+    config = {"configurable": {"thread_id": "memo-test"}}
+
+    recall.invoke({"query": "SpiderBot"}, config)
+    recall.invoke({"query": "SpiderBot"}, config)
+    assert calls == ["SpiderBot"]
+    print("✅ Duplicate read-only call served from the cache")
+
+    save.invoke({"content": "SpiderBot uses asyncio"}, config)
+    recall.invoke({"query": "SpiderBot"}, config)
+    assert calls == ["SpiderBot", "SpiderBot"]
+    print("✅ Write to the same store invalidated the cached result")
+
+    query.invoke({"cypher": "MERGE (n:Project {name: 'x'})"}, config)
+    query.invoke({"cypher": "MERGE (n:Project {name: 'x'})"}, config)
+    assert len(calls) == 4
+    print("✅ Cypher writes are never memoized")
+
+    get_tool_cache().clear_scope("memo-test")
+    recall.invoke({"query": "SpiderBot"}, config)
+    assert len(calls) == 5
+    print(f"✅ Cache cleared for a new turn. Stats: {get_tool_cache().stats()}")
+
+
+if __name__ == "__main__":
+    test_tool_memoization()
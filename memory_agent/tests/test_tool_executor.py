@@ -0,0 +1,92 @@
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.graph import START, MessagesState, StateGraph
+from langgraph.prebuilt import ToolNode
+
+import tool_executor
+from tool_executor import concurrent_tools
+
+
+@tool
+def slow_lookup(key: str, delay: float) -> str:
+    """Looks up a key after a delay."""
+    time.sleep(delay)
+    return f"value of {key}"
+
+
+@tool
+def socket_lookup(key: str) -> str:
+    """Looks up a key over a socket that times out."""
+    raise TimeoutError("socket read timed out")
+
+
+def test_concurrent_tool_calls():
+    print("\n--- Testing Concurrent Tool Execution ---")
+    previous = os.environ.get("TOOL_TIMEOUT_SLOW_LOOKUP")
+    os.environ["TOOL_TIMEOUT_SLOW_LOOKUP"] = "1"
+    try:
+        graph = StateGraph(MessagesState)
+        graph.add_node("tools", ToolNode(concurrent_tools([slow_lookup])))
+        graph.add_edge(START, "tools")
+        graph = graph.compile()
+
+        delays = [0.5, 0.1, 0.5, 3]
+        calls = [
+            {"name": "slow_lookup", "args": {"key": f"k{i}", "delay": d}, "id": f"call_{i}"}
+            for i, d in enumerate(delays)
+        ]
+        start = time.time()
+        result = graph.invoke({"messages": [AIMessage(content="", tool_calls=calls)]})
+        elapsed = time.time() - start
+        outputs = [m.content for m in result["messages"][1:]]
+        print(f"Results in {elapsed:.2f}s: {outputs}")
+
+        assert [m.tool_call_id for m in result["messages"][1:]] == [c["id"] for c in calls]
+        assert outputs[:3] == ["value of k0", "value of k1", "value of k2"]
+        assert "timed out" in outputs[3]
+        assert elapsed < 2
+        print("✅ Calls ran concurrently, in order, with a per-tool timeout")
+
+        # Queued time is not charged: on one worker the second call starts after
+        # 0.7s and still finishes within its own 1s budget
+        single = ThreadPoolExecutor(max_workers=1)
+        shared, tool_executor._tool_pool = tool_executor._tool_pool, single
+        try:
+            with ThreadPoolExecutor(max_workers=2) as callers:
+                results = list(
+                    callers.map(
+                        lambda key: tool_executor.run_tool(
+                            slow_lookup, {"key": key, "delay": 0.7}
+                        ),
+                        ["q0", "q1"],
+                    )
+                )
+        finally:
+            tool_executor._tool_pool = shared
+            single.shutdown(wait=True)
+        assert results == ["value of q0", "value of q1"], results
+        print("✅ Timeout starts when the call runs, not when it is queued")
+
+        try:
+            tool_executor.run_tool(socket_lookup, {"key": "k"})
+            raise AssertionError("expected the tool's TimeoutError")
+        except TimeoutError as e:
+            assert str(e) == "socket read timed out"
+        print("✅ A tool's own TimeoutError is not reported as an executor timeout")
+    finally:
+        if previous is None:
+            os.environ.pop("TOOL_TIMEOUT_SLOW_LOOKUP", None)
+        else:
+            os.environ["TOOL_TIMEOUT_SLOW_LOOKUP"] = previous
+
+
+if __name__ == "__main__":
+    test_concurrent_tool_calls()
@@ -0,0 +1,90 @@
+import sys
+import os
+import json
+import subprocess
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tool_registry
+from tool_registry import LazyTool, get_manifest, get_tools, load_group, tool_parameters
+
+
+# Runs in a fresh interpreter, so modules imported by earlier tests do not count
+LAZY_BINDING_SCRIPT = """
+import json, sys
+from tool_registry import LazyTool, get_tools
+from tool_executor import concurrent_tools
+from tools.output_tools import get_output_tools
+
+report = {}
+tools = get_tools("git", "graph")
+get_output_tools()
+report["lazy"] = all(isinstance(t, LazyTool) for t in tools)
+report["names"] = sorted(t.name for t in tools)
+report["before"] = [m for m in ("git", "neo4j", "pymongo") if m in sys.modules]
+git_status = {t.name: t for t in concurrent_tools(tools)}["git_status"]
+report["result"] = git_status.invoke({"repo_path": sys.argv[1]})
+report["after"] = [m for m in ("git", "neo4j", "pymongo") if m in sys.modules]
+print(json.dumps(report))
+"""
+
+
+def test_lazy_binding():
+    print("\n--- Testing Lazy Tool Binding ---")
+    module_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    repo_root = os.path.dirname(module_dir)
+    run = subprocess.run(
+        [sys.executable, "-c", LAZY_BINDING_SCRIPT, repo_root],
+        cwd=module_dir,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "LAZY_TOOLS": "true"},
+    )
+    assert run.returncode == 0, run.stderr
+    report = json.loads(run.stdout.strip().splitlines()[-1])
+
+    assert report["lazy"]
+    assert report["names"] == sorted(
+        ["git_clone", "git_status", "add_graph_node", "add_graph_edge", "query_graph"]
+    )
+    assert report["before"] == []
+    print("✅ Tools bound from the manifest without importing their modules")
+
+    assert not report["result"].startswith("Error"), report["result"]
+    assert report["after"] == ["git"]
+    print("✅ First invocation imported only the git tools")
+
+
+def test_manifest_is_current():
+    print("\n--- Testing Manifest Freshness ---")
+    manifest = get_manifest()
+    assert set(manifest) == set(tool_registry.TOOL_GROUPS)
+    for group, entry in manifest.items():
+        assert entry["source"] == tool_registry.source_hash(group), group
+        live = load_group(group)
+        assert [t["name"] for t in entry["tools"]] == list(live), group
+        for spec in entry["tools"]:
+            tool = live[spec["name"]]
+            assert spec["description"] == tool.description, spec["name"]
+            assert spec["parameters"] == tool_parameters(tool), spec["name"]
+    print("✅ Manifest matches the live tool schemas (else run `tool_registry.py refresh`)")
+
+
+def test_stale_manifest_loads_eagerly():
+    print("\n--- Testing Stale Manifest ---")
+    entry = get_manifest()["infra"]
+    source = entry["source"]
+    entry["source"] = "outdated"
+    try:
+        tools = get_tools("infra")
+    finally:
+        entry["source"] = source
+    assert tools and not any(isinstance(t, LazyTool) for t in tools)
+    print("✅ Group with changed source is loaded eagerly")
+
+
+if __name__ == "__main__":
+    test_lazy_binding()
+    test_manifest_is_current()
+    test_stale_manifest_loads_eagerly()
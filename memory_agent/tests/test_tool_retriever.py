@@ -0,0 +1,103 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.tools import tool
+
+from tool_retriever import ToolRetriever, with_tool_selection
+
+
+@tool
+def read_file(path: str) -> str:
+    """Read a file from disk."""
+    return ""
+
+
+@tool
+def git_status(repo: str) -> str:
+    """Show the working tree status of a git repository."""
+    return ""
+
+
+@tool
+def git_clone(url: str) -> str:
+    """Clone a git repository from a URL."""
+    return ""
+
+
+@tool
+def apply_infra(path: str) -> str:
+    """Apply Terraform infrastructure changes."""
+    return ""
+
+
+@tool
+def wikipedia(query: str) -> str:
+    """Look up a topic on Wikipedia."""
+    return ""
+
+
+TOOLS = [read_file, git_status, git_clone, apply_infra, wikipedia]
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.bound = []
+
+    def bind_tools(self, tools):
+        self.bound.append([t.name for t in tools])
+        return self
+
+
+def test_tool_selection():
+    print("\n--- Testing Dynamic Tool Selection ---")
+    retriever = ToolRetriever(TOOLS, core_tool_names=["read_file"], top_k=1)
+    # Keyword matching only, so the test does not need the embedding model
+    retriever._indexed = True
+
+    selected = [t.name for t in retriever.select("what is the git status of the repo")]
+    print(f"Selected: {selected}")
+    assert selected == ["read_file", "git_status"]
+
+    sticky = [t.name for t in retriever.select("apply terraform", ["wikipedia"])]
+    assert sticky == ["read_file", "wikipedia", "apply_infra"]
+    print("✅ Core tools, sticky tools and the best match are bound")
+
+    unmatched = [t.name for t in retriever.select("Build SpiderBot")]
+    assert unmatched == [t.name for t in TOOLS]
+    print("✅ A query that matches no tool binds the full toolset")
+
+    previous_top_k = os.environ.get("TOOL_SELECTION_TOP_K")
+    ensure_index = ToolRetriever._ensure_index
+    os.environ["TOOL_SELECTION_TOP_K"] = "1"
+    ToolRetriever._ensure_index = lambda self: None
+    try:
+        llm = RecordingLLM()
+        select_model = with_tool_selection(llm, TOOLS, ["read_file"])
+        messages = [
+            HumanMessage(content="Clone the repository from the url"),
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "git_clone", "args": {"url": "x"}, "id": "call_1"}],
+            ),
+            ToolMessage(content="done", tool_call_id="call_1"),
+        ]
+        select_model({"messages": messages}, None)
+        select_model({"messages": messages}, None)
+    finally:
+        ToolRetriever._ensure_index = ensure_index
+        if previous_top_k is None:
+            os.environ.pop("TOOL_SELECTION_TOP_K", None)
+        else:
+            os.environ["TOOL_SELECTION_TOP_K"] = previous_top_k
+    print(f"Bound: {llm.bound}")
+    # git_clone was already called this run, so it stays bound
+    assert llm.bound == [["read_file", "git_clone", "git_status"]]
+    print("✅ Bound models are reused for the same tool set")
+
+
+if __name__ == "__main__":
+    test_tool_selection()
@@ -0,0 +1,171 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Memoization of idempotent tool results.
+# Read-only tools (recall_memory, query_graph, read_document, git_status, web
+# search, ...) are often called with the same arguments several times in a turn,
+# including across Planner -> Coder -> Reviewer hand-offs. Their results are cached
+# per thread for a short TTL and dropped at the start of every user turn. Each read
+# tool is declared against the store it reads; any call of a tool that writes that
+# store (save_memory, add_graph_node, write_file, terminal, ...) invalidates it.
+# Tools that are not declared at all (e.g. generated tools) are assumed to write to
+# every local store.
+#
+# Settings (environment):
+#   TOOL_CACHE              - "true" (default) to enable
+#   TOOL_CACHE_TTL          - seconds a result is reused (default 300)
+#   TOOL_CACHE_MAX_ENTRIES  - results kept across all threads (default 512)
+
+# Read-only tools and the store each one reads
+IDEMPOTENT_TOOLS = {
+    "recall_memory": "weaviate",
+    "query_graph": "neo4j",
+    "read_document": "mongo",
+    "git_status": "git",
+    "read_file": "files",
+    "list_directory": "files",
+    "file_search": "files",
+    "wikipedia": "web",
+    "duckduckgo_search": "web",
+    "read_output": "outputs",
+}
+
+# Tools that change a store, and the stores they change
+WRITE_TOOLS = {
+    "save_memory": {"weaviate"},
+    "add_graph_node": {"neo4j"},
+    "add_graph_edge": {"neo4j"},
+    "save_document": {"mongo"},
+    "write_file": {"files", "git"},
+    "copy_file": {"files", "git"},
+    "move_file": {"files", "git"},
+    "file_delete": {"files", "git"},
+    "git_clone": {"files", "git"},
+    "generate_iac": {"files", "git"},
+    "apply_infra": {"files", "git"},
+    "create_tool": {"files", "git"},
+    "terminal": {"files", "git"},
+    "Python_REPL": {"files", "git"},
+}
+
+LOCAL_STORES = {"weaviate", "neo4j", "mongo", "git", "files"}
+
+# query_graph takes raw Cypher; only statements without write clauses are cached
+CYPHER_WRITE_PATTERN = re.compile(
+    r"\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP|LOAD\s+CSV|CALL)\b", re.IGNORECASE
+)
+
+
+def _is_read_only_call(tool_name, args):
+    if tool_name == "query_graph":
+        return not CYPHER_WRITE_PATTERN.search(str(args.get("cypher", "")))
+    return True
+
+
+def written_stores(tool_name, args):
+    """Stores a call of `tool_name` with `args` may change."""
+    if tool_name in IDEMPOTENT_TOOLS:
+        if _is_read_only_call(tool_name, args):
+            return set()
+        return {IDEMPOTENT_TOOLS[tool_name]}
+    return WRITE_TOOLS.get(tool_name, LOCAL_STORES)
+
+
+def _cache_key(tool_name, args):
+    return tool_name + ":" + json.dumps(args, sort_keys=True, default=str)
+
+
+class ToolResultCache:
+    """In-process TTL + LRU cache of idempotent tool results, scoped by thread."""
+
+    MISS = object()
+
+    def __init__(self, ttl=300.0, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (scope, key) -> (stored_at, store, result)
+        self._generations = {}  # store -> number of writes seen
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def cacheable(self, tool_name, args):
+        return tool_name in IDEMPOTENT_TOOLS and _is_read_only_call(tool_name, args)
+
+    def get(self, scope, tool_name, args):
+        entry_key = (scope, _cache_key(tool_name, args))
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self._entries.pop(entry_key, None)
+                self.misses += 1
+                return self.MISS
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return entry[2]
+
+    def generation(self, tool_name):
+        """Write count of the store `tool_name` reads; pass it back to `put()`."""
+        with self._lock:
+            return self._generations.get(IDEMPOTENT_TOOLS[tool_name], 0)
+
+    def put(self, scope, tool_name, args, result, generation):
+        """Caches `result` unless its store was written since `generation` was taken."""
+        entry_key = (scope, _cache_key(tool_name, args))
+        with self._lock:
+            if self._generations.get(IDEMPOTENT_TOOLS[tool_name], 0) != generation:
+                return
+            self._entries[entry_key] = (time.time(), IDEMPOTENT_TOOLS[tool_name], result)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_stores(self, stores):
+        """Drops cached results read from any of `stores`, in every thread."""
+        if not stores:
+            return
+        with self._lock:
+            for store in stores:
+                self._generations[store] = self._generations.get(store, 0) + 1
+            stale = [k for k, entry in self._entries.items() if entry[1] in stores]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += len(stale)
+
+    def clear_scope(self, scope):
+        """Drops all cached results of one thread (called at the start of a turn)."""
+        with self._lock:
+            for k in [k for k in self._entries if k[0] == scope]:
+                del self._entries[k]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+_tool_cache = None
+
+
+def get_tool_cache():
+    """Returns the process-wide tool result cache, or None when disabled."""
+    global _tool_cache
+    if os.environ.get("TOOL_CACHE", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _tool_cache is None:
+        _tool_cache = ToolResultCache(
+            ttl=float(os.environ.get("TOOL_CACHE_TTL", "300")),
+            max_entries=int(os.environ.get("TOOL_CACHE_MAX_ENTRIES", "512")),
+        )
+    return _tool_cache
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool
+
+from singleflight import get_tool_flight
+from tool_cache import get_tool_cache, written_stores
+from tools.output_tools import govern_output
+
+# Concurrent tool execution for the react sub-agents.
+# When a model emits several tool calls in one AI message, the agent's ToolNode fans
+# them out and returns the results in call order. The tools wrapped here run in one
+# process-wide bounded pool, so independent blocking I/O calls (recall_memory,
+# query_graph, read_document, ...) overlap without an unbounded number of threads,
+# and each call gets a timeout. The timeout counts from when the call starts
+# running on a worker, so time spent waiting for a free worker is not charged to
+# it. A timed-out call returns an error result to the model; a call that is
+# already running cannot be cancelled, so its thread finishes in the background.
+#
+# Settings (environment):
+#   TOOL_MAX_WORKERS              - tool calls running at once, process-wide (default 8)
+#   TOOL_TIMEOUT_SECONDS          - default per-call timeout (default 120, 0 = none)
+#   TOOL_TIMEOUT_<TOOL_NAME>      - per-tool override, e.g. TOOL_TIMEOUT_GIT_CLONE=600
+
+# Default timeouts for tools that are expected to run long
+DEFAULT_TOOL_TIMEOUTS = {
+    "terminal": 300,
+    "Python_REPL": 300,
+    "git_clone": 600,
+    "apply_infra": 1800,
+    "create_tool": 600,
+}
+
+_lock = threading.Lock()
+_tool_pool = None
+
+
+def get_tool_pool():
+    """Returns the process-wide bounded pool that runs tool calls."""
+    global _tool_pool
+    with _lock:
+        if _tool_pool is None:
+            _tool_pool = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("TOOL_MAX_WORKERS", "8")),
+                thread_name_prefix="tool",
+            )
+        return _tool_pool
+
+
+def get_tool_timeout(name):
+    """Timeout in seconds for one call of tool `name` (None = no timeout)."""
+    override = os.environ.get(f"TOOL_TIMEOUT_{name.upper()}")
+    if override is not None:
+        timeout = float(override)
+    elif name in DEFAULT_TOOL_TIMEOUTS:
+        timeout = float(DEFAULT_TOOL_TIMEOUTS[name])
+    else:
+        timeout = float(os.environ.get("TOOL_TIMEOUT_SECONDS", "120"))
+    return timeout if timeout > 0 else None
+
+
+def _submit(tool, args, config):
+    timeout = get_tool_timeout(tool.name)
+    started = threading.Event()
+
+    def call():
+        started.set()
+        return tool.invoke(args, config)
+
+    future = get_tool_pool().submit(call)
+    # Start the clock once a worker picks the call up
+    while not started.wait(0.05) and not future.done():
+        pass
+    try:
+        result = future.result(timeout=timeout)
+    except FutureTimeoutError:
+        # On Python 3.11+ this is the built-in TimeoutError, so it may also be the
+        # tool's own (e.g. a socket timeout): only an unfinished call timed out here
+        if future.done():
+            raise
+        # No-op for a running call (threads cannot be interrupted); it only
+        # drops a call that never got to run
+        future.cancel()
+        print(f"[ToolExecutor] {tool.name} timed out after {timeout:.0f}s")
+        return f"Error: tool '{tool.name}' timed out after {timeout:.0f} seconds."
+    # Oversized results are spilled and replaced by a preview + handle
+    return govern_output(tool.name, result)
+
+
+def run_tool(tool, args, config=None):
+    """
+    Runs `tool` with `args` in the shared pool, returning an error string on timeout.
+    Idempotent calls are answered from the per-thread tool cache (see tool_cache.py).
+    """
+    cache = get_tool_cache()
+    if cache is None:
+        return _submit(tool, args, config)
+
+    scope = (config or {}).get("configurable", {}).get("thread_id", "default")
+    cacheable = cache.cacheable(tool.name, args)
+    if cacheable:
+        result = cache.get(scope, tool.name, args)
+        if result is not cache.MISS:
+            print(f"[ToolCache] Hit for {tool.name}")
+            return result
+        generation = cache.generation(tool.name)
+
+    if cacheable:
+        # Identical calls already running are shared, also across sessions: the
+        # cacheable tools are read-only and none of them depends on the session
+        key = (tool.name, json.dumps(args, sort_keys=True, default=str))
+        result = get_tool_flight().do(key, lambda: _submit(tool, args, config))
+    else:
+        result = _submit(tool, args, config)
+    cache.invalidate_stores(written_stores(tool.name, args))
+
+    if cacheable and not (isinstance(result, str) and result.startswith("Error")):
+        cache.put(scope, tool.name, args, result, generation)
+    return result
+
+
+def concurrent_tool(tool):
+    """Wraps `tool` so its calls run in the shared pool with a per-tool timeout."""
+
+    def run(config: RunnableConfig = None, **kwargs):
+        return run_tool(tool, kwargs, config)
+
+    return StructuredTool.from_function(
+        func=run,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema or tool.get_input_schema(),
+        return_direct=tool.return_direct,
+    )
+
+
+def concurrent_tools(tools):
+    return [concurrent_tool(t) for t in tools]
+
+
+def shutdown_tool_pool():
+    """Stops the shared pool without waiting for running (e.g. timed-out) calls."""
+    global _tool_pool
+    with _lock:
+        if _tool_pool is not None:
+            _tool_pool.shutdown(wait=False, cancel_futures=True)
+            _tool_pool = None
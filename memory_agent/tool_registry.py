@@ -0,0 +1,232 @@
+import hashlib
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+
+# Lazy tool registry.
+# Importing the tool modules pulls in weaviate, neo4j, pymongo, GitPython and the
+# langchain_community/experimental toolkits, although most sessions use only a few
+# of those tools. The agents are instead built from light metadata kept in
+# tool_manifest.json (name, description, JSON argument schema per tool), and a
+# tool group's module is imported the first time one of its tools is invoked.
+#
+# A group missing from the manifest, or whose source file changed since the
+# manifest was written, is loaded eagerly so a stale manifest never binds an
+# outdated schema. Regenerate the manifest after changing a tool:
+#
+#   python tool_registry.py refresh     - rewrite tool_manifest.json
+#   python tool_registry.py profile     - `-X importtime` startup profile,
+#                                         lazy vs eager (the startup benchmark)
+#
+# Settings (environment):
+#   LAZY_TOOLS  - "true" (default) to defer tool module imports
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.path.join(BASE_DIR, "tool_manifest.json")
+
+# group -> (module, getter returning the group's tools)
+TOOL_GROUPS = {
+    "research": ("tools.research_tools", "get_research_tools"),
+    "file": ("tools.file_tools", "get_file_tools"),
+    "code": ("tools.code_tools", "get_code_tools"),
+    "git": ("tools.git_tools", "get_git_tools"),
+    "infra": ("tools.infra_tools", "get_infra_tools"),
+    "graph": ("tools.graph_tools", "get_graph_tools"),
+    "mongo": ("tools.mongo_tools", "get_mongo_tools"),
+    "memory": ("memory_tools", "get_memory_tools"),
+}
+
+_lock = threading.Lock()
+_loaded = {}
+_manifest = None
+
+
+def lazy_tools_enabled():
+    return os.environ.get("LAZY_TOOLS", "true").lower() in ("1", "true", "yes")
+
+
+def source_hash(group):
+    module, _ = TOOL_GROUPS[group]
+    path = os.path.join(BASE_DIR, *module.split(".")) + ".py"
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def load_group(group):
+    """Imports `group`'s module once and returns its tools by name."""
+    with _lock:
+        tools = _loaded.get(group)
+        if tools is None:
+            module, getter = TOOL_GROUPS[group]
+            start = time.time()
+            tools = {t.name: t for t in getattr(importlib.import_module(module), getter)()}
+            _loaded[group] = tools
+            print(f"[ToolRegistry] Loaded {group} tools in {time.time() - start:.2f}s")
+        return tools
+
+
+class LazyTool(BaseTool):
+    """Tool bound from manifest metadata; imports its module on first invocation."""
+
+    group: str
+
+    def _run(self, *args: Any, config: RunnableConfig, **kwargs: Any) -> Any:
+        try:
+            tool = load_group(self.group)[self.name]
+        except Exception as e:
+            print(f"[ToolRegistry] Could not load {self.name}: {e}")
+            return f"Error: tool '{self.name}' is unavailable: {e}"
+        return tool.invoke(kwargs, config)
+
+
+def get_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[ToolRegistry] No usable manifest ({e}), loading tools eagerly.")
+            _manifest = {}
+    return _manifest
+
+
+def get_tools(*groups):
+    """Returns the tools of `groups`, as lazy stand-ins where the manifest is current."""
+    tools = []
+    for group in groups:
+        entry = get_manifest().get(group)
+        if not lazy_tools_enabled() or entry is None:
+            tools.extend(load_group(group).values())
+        elif entry["source"] != source_hash(group):
+            print(
+                f"[ToolRegistry] Manifest is stale for '{group}', loading it eagerly "
+                "(run `python tool_registry.py refresh`)."
+            )
+            tools.extend(load_group(group).values())
+        else:
+            tools.extend(
+                LazyTool(
+                    name=spec["name"],
+                    description=spec["description"],
+                    args_schema=spec["parameters"],
+                    group=group,
+                )
+                for spec in entry["tools"]
+            )
+    return tools
+
+
+def tool_parameters(tool):
+    """The JSON schema of the arguments the model sees for `tool`."""
+    schema = tool.tool_call_schema
+    if isinstance(schema, dict):
+        schema = dict(schema)
+    else:
+        schema = schema.model_json_schema()
+    schema.pop("title", None)
+    schema.pop("description", None)
+    return schema
+
+
+def build_manifest():
+    manifest = {}
+    for group in TOOL_GROUPS:
+        manifest[group] = {
+            "source": source_hash(group),
+            "tools": [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": tool_parameters(tool),
+                }
+                for tool in load_group(group).values()
+            ],
+        }
+    return manifest
+
+
+def import_profile(lazy=True, top=15):
+    """
+    Runs `-X importtime` on the agent startup path (importing team_structure and
+    building the team graph) in a fresh interpreter and summarizes it.
+    """
+    code = "from team_structure import build_team_workflow; build_team_workflow()"
+    env = {**os.environ, "LAZY_TOOLS": "true" if lazy else "false"}
+    start = time.time()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.time() - start
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if match:
+            depth = len(match.group(3)) // 2
+            modules.append((int(match.group(2)), depth, match.group(4)))
+    return {
+        "wall_seconds": wall,
+        "import_seconds": sum(cum for cum, depth, _ in modules if depth == 0) / 1e6,
+        "modules": len(modules),
+        "top": sorted(modules, reverse=True)[:top],
+        "returncode": proc.returncode,
+    }
+
+
+def print_profile():
+    results = {}
+    for lazy in (False, True):
+        label = "lazy" if lazy else "eager"
+        report = import_profile(lazy=lazy)
+        results[label] = report
+        print(f"\n=== Startup ({label} tools) ===")
+        if report["returncode"] != 0:
+            print(f"Startup failed with exit code {report['returncode']}")
+            continue
+        print(
+            f"Wall: {report['wall_seconds']:.2f}s  Imports: "
+            f"{report['import_seconds']:.2f}s  Modules: {report['modules']}"
+        )
+        for cum, depth, name in report["top"]:
+            print(f"  {cum / 1e6:7.3f}s  {'  ' * depth}{name}")
+    if "eager" in results and "lazy" in results:
+        saved = results["eager"]["import_seconds"] - results["lazy"]["import_seconds"]
+        print(f"\nLazy tools save {saved:.2f}s of import time at startup.")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lazy tool registry")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("refresh", help="Regenerate tool_manifest.json")
+    sub.add_parser("profile", help="Import-time startup profile, lazy vs eager")
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        manifest = build_manifest()
+        with open(MANIFEST_PATH, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+            f.write("\n")
+        count = sum(len(entry["tools"]) for entry in manifest.values())
+        print(f"Wrote {count} tools in {len(manifest)} groups to {MANIFEST_PATH}")
+    elif args.command == "profile":
+        print_profile()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import math
+import os
+import re
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from message_utils import message_text
+from prompt_cache import bind_tools_cached, prompt_caching_enabled
+
+# Dynamic tool selection for the react sub-agents.
+# Instead of sending every tool schema (including everything in tools/generated) on
+# every LLM call, each call is bound to an always-on core set per role plus the
+# top-k tools whose name/description best match the current step. Tools the agent
+# already called in the current run stay bound so follow-up calls keep working.
+# Every tool is still registered with the agent's ToolNode, so any call the model
+# makes is executed.
+#
+# Settings (environment):
+#   TOOL_SELECTION        - "true" (default) to enable, "false" to bind all tools
+#   TOOL_SELECTION_TOP_K  - retrieved tools per call on top of the core set (default 6)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Characters of conversation used to build the retrieval query
+QUERY_MAX_CHARS = 2000
+
+# Bound models kept per agent, keyed by the selected tool set
+MAX_BOUND_MODELS = 64
+
+
+def _tokens(text):
+    # Split snake_case / camelCase tool names into words as well
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text).replace("_", " ")
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def get_tool_selection_config():
+    return {
+        "enabled": os.environ.get("TOOL_SELECTION", "true").lower()
+        in ("1", "true", "yes"),
+        "top_k": int(os.environ.get("TOOL_SELECTION_TOP_K", "6")),
+    }
+
+
+def build_query(messages):
+    """Retrieval query for the next step: the latest user request plus recent agent text."""
+    parts = []
+    for msg in reversed(messages):
+        if isinstance(msg, ToolMessage):
+            continue
+        text = message_text(msg).strip()
+        if text:
+            parts.append(text)
+        if isinstance(msg, HumanMessage) and not text.startswith("[SYSTEM:"):
+            break
+    return "\n".join(reversed(parts))[-QUERY_MAX_CHARS:]
+
+
+def called_tool_names(messages):
+    """Names of the tools called since the latest user message."""
+    names = set()
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break
+        if isinstance(msg, AIMessage):
+            names.update(call["name"] for call in msg.tool_calls or [])
+    return names
+
+
+class ToolRetriever:
+    """
+    Ranks tools by relevance to a query using an embedding index over the tool
+    names and descriptions, falling back to keyword overlap when no embedding
+    model is available.
+    """
+
+    def __init__(self, tools, core_tool_names=(), top_k=6):
+        self.tools = list(tools)
+        self.top_k = top_k
+        self.core_tool_names = {t.name for t in self.tools} & set(core_tool_names)
+        self._documents = [f"{t.name}: {t.description}" for t in self.tools]
+        self._token_index = [_tokens(doc) for doc in self._documents]
+        self._vectors = None
+        self._model = None
+        self._indexed = False
+
+    def _ensure_index(self):
+        if self._indexed:
+            return
+        self._indexed = True
+        from memory_tools import get_embedding_model
+
+        self._model = get_embedding_model()
+        if self._model is None:
+            return
+        try:
+            self._vectors = [v.tolist() for v in self._model.encode(self._documents)]
+        except Exception as e:
+            print(f"[ToolRetriever] Indexing failed, using keyword match: {e}")
+            self._model = None
+
+    def _scores(self, query):
+        self._ensure_index()
+        if self._model is not None and self._vectors is not None:
+            try:
+                query_vector = self._model.encode(query).tolist()
+                return [_cosine(query_vector, v) for v in self._vectors]
+            except Exception as e:
+                print(f"[ToolRetriever] Query embedding failed, using keyword match: {e}")
+        query_tokens = _tokens(query)
+        return [
+            len(query_tokens & doc_tokens) / math.sqrt(len(doc_tokens) or 1)
+            for doc_tokens in self._token_index
+        ]
+
+    def select(self, query, sticky_names=()):
+        """
+        Returns the core tools, the `sticky_names` tools and the top-k matches for
+        `query`. When no tool matches the query at all (typical for keyword matching
+        without an embedding model), every tool is returned.
+        """
+        keep = self.core_tool_names | set(sticky_names)
+        selected = [t for t in self.tools if t.name in keep]
+        if self.top_k > 0 and query.strip():
+            ranked = sorted(
+                (
+                    (score, i)
+                    for i, score in enumerate(self._scores(query))
+                    if self.tools[i].name not in keep
+                ),
+                reverse=True,
+            )
+            if ranked and ranked[0][0] <= 0:
+                return list(self.tools)
+            selected += [self.tools[i] for _, i in ranked[: self.top_k]]
+        return selected
+
+
+def with_tool_selection(llm, tools, core_tool_names=()):
+    """
+    Returns a dynamic model for `create_react_agent` that binds only the selected
+    tools on each call, or `llm` itself when selection is disabled or would not
+    drop any tools (and prompt caching is off).
+    """
+    config = get_tool_selection_config()
+    if not config["enabled"] or len(tools) <= len(set(core_tool_names)) + config["top_k"]:
+        if not prompt_caching_enabled():
+            return llm
+        # All tools, bound once with the prompt-cache breakpoint on their definitions
+        bound = bind_tools_cached(llm, tools)
+        return lambda state, runtime: bound
+
+    retriever = ToolRetriever(tools, core_tool_names, config["top_k"])
+    bound_models = {}
+
+    def select_model(state, runtime):
+        messages = state["messages"] if isinstance(state, dict) else state.messages
+        selected = retriever.select(build_query(messages), called_tool_names(messages))
+        key = frozenset(t.name for t in selected)
+        model = bound_models.get(key)
+        if model is None:
+            if len(bound_models) >= MAX_BOUND_MODELS:
+                bound_models.clear()
+            model = bind_tools_cached(llm, selected)
+            bound_models[key] = model
+        return model
+
+    return select_model
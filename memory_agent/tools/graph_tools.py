@@ -33,19 +33,32 @@ def add_graph_node(label: str, name: str, properties: str = "{}") -> str:
         properties: A JSON string of additional properties (e.g., '{"status": "active"}').
     """
     import json
+    from entity_index import get_entity_index, normalize_name
 
     try:
         props = json.loads(properties)
-        props["name"] = name
     except:
         return "Error: Properties must be a valid JSON string."
 
+    # Resolve against the canonical entity index so spelling variants share one node
+    index = get_entity_index()
+    canonical, label, alias = index.match(name, label)
+    props["name"] = canonical
+    props["canonical_key"] = normalize_name(canonical)
+
     driver = get_neo4j_driver()
-    query = f"MERGE (n:{label} {{name: $name}}) SET n += $props RETURN n"
+    query = f"MERGE (n:{label} {{name: $name}}) SET n += $props"
+    if alias:
+        query += " SET n.aliases = coalesce(n.aliases, []) + $alias"
+    query += " RETURN n"
 
     try:
         with driver.session() as session:
-            session.run(query, name=name, props=props)
+            session.run(query, name=canonical, props=props, alias=[alias])
+        # Only names that reached the graph are indexed
+        index.register(canonical, label, [alias] if alias else [])
+        if canonical != name:
+            return f"Successfully added/updated node: {label} ({canonical}, resolved from '{name}')"
         return f"Successfully added/updated node: {label} ({name})"
     except Exception as e:
         return f"Failed to add node: {e}"
@@ -62,6 +75,12 @@ def add_graph_edge(from_name: str, relation: str, to_name: str) -> str:
         relation: The type of relationship (e.g., 'DEPENDS_ON', 'CREATED_BY').
         to_name: The name of the target node.
     """
+    from entity_index import get_entity_index
+
+    index = get_entity_index()
+    from_name = index.lookup(from_name) or from_name
+    to_name = index.lookup(to_name) or to_name
+
     driver = get_neo4j_driver()
     # Cypher query to match nodes and create relationship
     query = """
@@ -0,0 +1,144 @@
+import os
+import uuid
+from datetime import datetime
+
+from langchain_core.tools import tool
+
+# Output governor for tool results.
+# Shell, Python REPL, file reads and query_graph can return megabytes. Any result
+# longer than OUTPUT_SPILL_THRESHOLD characters is stored in MongoDB (or on local
+# disk if MongoDB is unavailable) and replaced in the conversation by a preview and
+# a handle. `read_output(handle, offset, length)` fetches further ranges on demand.
+#
+# Settings (environment):
+#   OUTPUT_SPILL_THRESHOLD  - characters above which a result is spilled (default 8000)
+#   OUTPUT_PREVIEW_CHARS    - characters kept inline as the preview (default 2000)
+#   OUTPUT_SPILL_BACKEND    - "mongo" (default) or "disk"
+#   OUTPUT_SPILL_DIR        - directory for disk spills (default /tmp/agent_tool_outputs)
+#   OUTPUT_SPILL_TTL_DAYS   - days MongoDB keeps spilled outputs (default 7)
+
+MONGO_URI = os.environ.get("MONGODB_URL", "mongodb://localhost:18070")
+DB_NAME = os.environ.get("MONGODB_DATABASE", "teamadapt")
+COLLECTION_NAME = "agent_tool_outputs"
+
+# Stay well below MongoDB's 16MB document limit
+MONGO_MAX_BYTES = 15 * 1024 * 1024
+
+# Upper bound for one read_output range
+READ_MAX_LENGTH = 20000
+
+_client = None
+_indexed = False
+
+
+def get_output_collection():
+    global _client, _indexed
+    if _client is None:
+        # Imported on first spill, so building the graph does not load pymongo
+        from pymongo import MongoClient
+
+        _client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
+    collection = _client[DB_NAME][COLLECTION_NAME]
+    if not _indexed:
+        ttl_days = float(os.environ.get("OUTPUT_SPILL_TTL_DAYS", "7"))
+        collection.create_index("handle", unique=True)
+        collection.create_index("created_at", expireAfterSeconds=int(ttl_days * 86400))
+        _indexed = True
+    return collection
+
+
+def _spill_dir():
+    path = os.environ.get("OUTPUT_SPILL_DIR", "/tmp/agent_tool_outputs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _disk_path(handle):
+    return os.path.join(_spill_dir(), f"{handle}.txt")
+
+
+def store_output(tool_name, content):
+    """Stores a full tool output and returns its handle."""
+    handle = f"out-{uuid.uuid4().hex[:12]}"
+    backend = os.environ.get("OUTPUT_SPILL_BACKEND", "mongo")
+    if backend == "mongo" and len(content.encode("utf-8")) <= MONGO_MAX_BYTES:
+        try:
+            get_output_collection().insert_one(
+                {
+                    "handle": handle,
+                    "tool": tool_name,
+                    "content": content,
+                    "length": len(content),
+                    "created_at": datetime.utcnow(),
+                }
+            )
+            return handle
+        except Exception as e:
+            print(f"[OutputGovernor] MongoDB spill failed, writing to disk: {e}")
+
+    with open(_disk_path(handle), "w", encoding="utf-8") as f:
+        f.write(content)
+    return handle
+
+
+def load_output(handle):
+    """Returns the full stored output for `handle`, or None if it is unknown."""
+    path = _disk_path(os.path.basename(handle))
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    try:
+        doc = get_output_collection().find_one({"handle": handle})
+    except Exception as e:
+        print(f"[OutputGovernor] MongoDB lookup failed: {e}")
+        return None
+    return doc["content"] if doc else None
+
+
+def govern_output(tool_name, result):
+    """Replaces an oversized string result by a preview and a `read_output` handle."""
+    threshold = int(os.environ.get("OUTPUT_SPILL_THRESHOLD", "8000"))
+    if tool_name == "read_output" or not isinstance(result, str):
+        return result
+    if len(result) <= threshold:
+        return result
+
+    preview_chars = min(int(os.environ.get("OUTPUT_PREVIEW_CHARS", "2000")), threshold)
+    try:
+        handle = store_output(tool_name, result)
+    except Exception as e:
+        print(f"[OutputGovernor] Could not store output of {tool_name}: {e}")
+        return result[:threshold] + f"\n\n[Output truncated: {len(result)} chars total.]"
+
+    print(f"[OutputGovernor] Spilled {len(result)} chars from {tool_name} as {handle}")
+    return (
+        result[:preview_chars]
+        + f"\n\n[Output truncated: {len(result)} chars total, stored as handle "
+        f"'{handle}'. Call read_output(handle='{handle}', offset={preview_chars}, "
+        "length=4000) to read more.]"
+    )
+
+
+@tool
+def read_output(handle: str, offset: int = 0, length: int = 4000) -> str:
+    """
+    Reads a range of a large tool output that was stored under a handle.
+
+    Args:
+        handle: The handle from the truncated output (e.g. 'out-1a2b3c4d5e6f').
+        offset: Character offset to start reading from.
+        length: Number of characters to read (max 20000).
+    """
+    content = load_output(handle)
+    if content is None:
+        return f"Error: no stored output with handle '{handle}'."
+    offset = max(0, offset)
+    end = min(len(content), offset + max(0, min(length, READ_MAX_LENGTH)))
+    remaining = len(content) - end
+    footer = f"\n\n[Characters {offset}-{end} of {len(content)}"
+    footer += f"; {remaining} remaining.]" if remaining else "; end of output.]"
+    return content[offset:end] + footer
+
+
+def get_output_tools():
+    return [read_output]